@@ -10,9 +10,73 @@ import threading
 import logging
 import queue
 import logging.handlers
+import importlib
+import os
+import sys
+import time
+from contextlib import contextmanager
 from pathlib import Path
 
-from admin_check import is_admin, request_admin_elevation
+from run_events import RunEvent, RunEventBus, RunEventKind, RunStatus
+from cancellation import CancelToken, RunCancelled
+
+# Orchestrator (psutil / robco_ini_generate などを含む) はウィンドウ表示後にバックグラウンドで読み込む。
+# --profile-startup (または環境変数 AUTOPATCHER_PROFILE_STARTUP=1) で起動フェーズの計測結果をログに出す。
+
+LOG_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+# ログ表示の更新間隔 (約 60fps) と、1 回の更新でキューの処理に使ってよい時間
+LOG_POLL_INTERVAL_MS = 16
+LOG_POLL_BUDGET_SEC = 0.008
+# ログ表示に保持する最大行数 (古い行から捨てる。全ログは patcher.log に残る)
+LOG_MAX_LINES = 5000
+
+class StartupProfiler:
+    """起動フェーズの所要時間と、重いモジュールの import 時間を記録する。"""
+
+    def __init__(self, enabled: bool):
+        self.enabled = enabled
+        self.origin = time.perf_counter()
+        self.phases = []
+        self.imports = []
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def phase(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.mark(name, start)
+
+    def mark(self, name: str, start: float | None = None):
+        """フェーズを記録する。start を省略すると起動からの経過時刻のみを記録する。"""
+        now = time.perf_counter()
+        start = now if start is None else start
+        with self._lock:
+            self.phases.append((name, start - self.origin, now - start, threading.current_thread().name))
+
+    def import_module(self, name: str):
+        """モジュールを import し、所要時間と新たに読み込まれたモジュール数を記録する。"""
+        before = len(sys.modules)
+        start = time.perf_counter()
+        module = importlib.import_module(name)
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            self.imports.append((name, elapsed, len(sys.modules) - before))
+        return module
+
+    def report(self):
+        if not self.enabled:
+            return
+        lines = ["[Startup] 起動プロファイル (起動からの時刻 / 所要時間 / フェーズ / スレッド)"]
+        for name, offset, elapsed, thread_name in sorted(self.phases, key=lambda p: p[1]):
+            lines.append(f"  {offset * 1000:9.1f} ms  {elapsed * 1000:8.1f} ms  {name}  [{thread_name}]")
+        # python -X importtime と同じ列構成 (self 列の代わりに新規読み込みモジュール数)
+        lines.append("[Startup] import time: cumulative [us] | new modules | imported package")
+        for name, elapsed, new_modules in self.imports:
+            lines.append(f"  import time: {int(elapsed * 1e6):>10} | {new_modules:>11} | {name}")
+        for line in lines:
+            logging.info(line)
 
 class QueueHandler(logging.Handler):
     def __init__(self, log_queue):
@@ -24,6 +88,7 @@ class QueueHandler(logging.Handler):
 
 class Application(tk.Frame):
     def __init__(self, master, config_manager, orchestrator, log_queue):
+        """orchestrator は None でもよい。その場合は load_orchestrator_async で後から読み込む。"""
         super().__init__(master)
         self.master = master
         self.master.title("Munitions 自動統合フレームワーク v2.5")
@@ -33,11 +98,16 @@ class Application(tk.Frame):
         self.orchestrator = orchestrator
         self.is_running = False
         self.log_queue = log_queue
+        self.log_formatter = logging.Formatter(LOG_FORMAT)
+        # Orchestrator からの RunEvent はこのキューで受け取り、メインスレッドで反映する
+        self.run_event_queue = queue.Queue()
+        self.run_status = RunStatus()
+        self.cancel_token: CancelToken | None = None
         
         self.create_widgets()
         self.load_settings()
 
-        self.after(100, self.poll_log_queue)
+        self.after(LOG_POLL_INTERVAL_MS, self.poll_log_queue)
 
     def create_widgets(self):
         settings_frame = ttk.LabelFrame(self, text="環境設定")
@@ -109,7 +179,14 @@ class Application(tk.Frame):
         self.simplify_ini_check = ttk.Checkbutton(run_frame, text="Robco INI の出力をシンプルにする (推奨: 変更対象の武器のみ記録)", variable=self.simplify_ini_var)
         self.simplify_ini_check.grid(row=1, column=0, columnspan=2, sticky="w", padx=5, pady=(0, 10))
 
-        log_frame = ttk.LabelFrame(self, text="ログ")
+        self.progress_bar = ttk.Progressbar(run_frame, mode="determinate", maximum=1)
+        self.progress_bar.grid(row=2, column=0, columnspan=2, sticky="ew", padx=5)
+        self.status_var = tk.StringVar(value="待機中")
+        ttk.Label(run_frame, textvariable=self.status_var).grid(row=3, column=0, sticky="w", padx=5, pady=(2, 10))
+        self.cancel_button = ttk.Button(run_frame, text="中止", command=self.cancel_process, state="disabled")
+        self.cancel_button.grid(row=3, column=1, sticky="e", padx=5, pady=(2, 10))
+
+        log_frame = ttk.LabelFrame(self, text=f"ログ (最新 {LOG_MAX_LINES} 行まで表示。全ログは patcher.log)")
         log_frame.pack(fill="both", expand=True, pady=5)
         log_frame.grid_propagate(False)
         log_frame.config(width=800, height=300)
@@ -177,6 +254,40 @@ class Application(tk.Frame):
         for child in self.mo2_settings_frame.winfo_children():
             child.configure(state=state)
 
+    def load_orchestrator_async(self, loader, on_loaded=None):
+        """
+        loader() をバックグラウンドスレッドで実行して Orchestrator を読み込む。
+        読み込み中は実行ボタンを無効化し、完了はメインスレッドでポーリングして反映する。
+        """
+        result = {}
+
+        def worker():
+            try:
+                result["orchestrator"] = loader()
+            except Exception as e:
+                logging.critical("Orchestrator の読み込み中に致命的なエラーが発生しました。", exc_info=True)
+                result["error"] = e
+
+        self.run_button.config(state="disabled")
+        self.strategy_button.config(state="disabled")
+        thread = threading.Thread(target=worker, name="orchestrator-loader", daemon=True)
+        thread.start()
+
+        def poll():
+            if thread.is_alive():
+                self.after(50, poll)
+                return
+            if "error" in result:
+                messagebox.showerror("致命的なエラー", f"処理モジュールの読み込みに失敗しました:\n{result['error']}")
+                return
+            self.orchestrator = result["orchestrator"]
+            self.run_button.config(state="normal")
+            self.strategy_button.config(state="normal")
+            if on_loaded:
+                on_loaded()
+
+        self.after(50, poll)
+
     def load_settings(self):
         try:
             self.use_mo2_var.set(self.config_manager.get_boolean('Environment', 'use_mo2'))
@@ -195,16 +306,28 @@ class Application(tk.Frame):
     
     def save_settings(self):
         try:
-            self.config_manager.save_setting('Environment', 'use_mo2', str(self.use_mo2_var.get()))
-            self.config_manager.save_setting('Environment', 'mo2_executable_path', self.mo2_executable_var.get())
-            self.config_manager.save_setting('Environment', 'xedit_profile_name', self.xedit_profile_var.get())
-            self.config_manager.save_setting('Environment', 'mo2_xedit_entry_name', self.mo2_entry_name_var.get())
-            self.config_manager.save_setting('Environment', 'mo2_overwrite_dir', self.mo2_overwrite_dir_var.get())
-            self.config_manager.save_setting('Environment', 'mo2_shortcut_format', self.mo2_shortcut_format_var.get())
-            self.config_manager.save_setting('Environment', 'mo2_instance_name', self.mo2_instance_name_var.get())
-            self.config_manager.save_setting('Parameters', 'simplify_robco_ammo_ini', str(self.simplify_ini_var.get()))
-            self.config_manager.save_setting('Paths', 'xedit_executable', self.xedit_executable_var.get())
-            logging.info("設定が config.ini に正常に保存されました。")
+            # 全項目をまとめて 1 回だけアトミックに書き込む (変更がなければ書き込まない)
+            changed = self.config_manager.save_settings({
+                'Environment': {
+                    'use_mo2': str(self.use_mo2_var.get()),
+                    'mo2_executable_path': self.mo2_executable_var.get(),
+                    'xedit_profile_name': self.xedit_profile_var.get(),
+                    'mo2_xedit_entry_name': self.mo2_entry_name_var.get(),
+                    'mo2_overwrite_dir': self.mo2_overwrite_dir_var.get(),
+                    'mo2_shortcut_format': self.mo2_shortcut_format_var.get(),
+                    'mo2_instance_name': self.mo2_instance_name_var.get(),
+                },
+                'Parameters': {
+                    'simplify_robco_ammo_ini': str(self.simplify_ini_var.get()),
+                },
+                'Paths': {
+                    'xedit_executable': self.xedit_executable_var.get(),
+                },
+            })
+            if changed:
+                logging.info("設定が config.ini に正常に保存されました。")
+            else:
+                logging.info("設定に変更はありません (config.ini は更新しません)。")
             return True
         except Exception as e:
             messagebox.showerror("設定保存エラー", f"設定の保存中にエラーが発生しました。\n{e}")
@@ -212,30 +335,115 @@ class Application(tk.Frame):
             return False
     
     def poll_log_queue(self):
-        while True:
+        """
+        キューに溜まったログを時間予算内でまとめて取り出し、1 回の insert で表示に追加する。
+        表示は LOG_MAX_LINES 行を上限に古い行から捨てる。
+        """
+        deadline = time.perf_counter() + LOG_POLL_BUDGET_SEC
+        segments = []
+        while time.perf_counter() < deadline:
             try:
                 record = self.log_queue.get_nowait()
             except queue.Empty:
                 break
-            else:
-                msg = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s').format(record)
-                self.log_text.config(state="normal")
-                self.log_text.insert(tk.END, msg + '\n', record.levelname)
-                self.log_text.config(state="disabled")
+            segments.append(self.log_formatter.format(record) + '\n')
+            segments.append(record.levelname)
+
+        if segments:
+            # 末尾を表示中のときだけ自動スクロールする (遡って読んでいる間は位置を保つ)
+            follow = self.log_text.yview()[1] >= 0.999
+            self.log_text.config(state="normal")
+            self.log_text.insert(tk.END, *segments)
+            excess = int(self.log_text.index("end-1c").split('.')[0]) - LOG_MAX_LINES
+            if excess > 0:
+                self.log_text.delete("1.0", f"{excess + 1}.0")
+            self.log_text.config(state="disabled")
+            if follow:
                 self.log_text.see(tk.END)
-        self.after(100, self.poll_log_queue)
+
+        while True:
+            try:
+                event = self.run_event_queue.get_nowait()
+            except queue.Empty:
+                break
+            self.on_run_event(event)
+        self.after(LOG_POLL_INTERVAL_MS, self.poll_log_queue)
+
+    def on_run_event(self, event: RunEvent):
+        """RunEvent を集計し、ステータス表示・進捗バーに反映する。RUN_END で完了処理を行う。"""
+        status = self.run_status
+        status.apply(event)
+        if event.kind is RunEventKind.RUN_START:
+            self.progress_bar.config(value=0, maximum=event.total or 1)
+            self.status_var.set(f"{event.name} 実行中...")
+        elif event.kind is RunEventKind.STAGE_START:
+            if event.total:
+                self.progress_bar.config(maximum=event.total)
+            step = f"ステップ {event.index}/{event.total}: " if event.index and event.total else ""
+            self.status_var.set(f"{step}{event.name} 実行中...")
+        elif event.kind is RunEventKind.STAGE_END:
+            self.progress_bar.config(value=status.completed_stages)
+        elif event.kind in (RunEventKind.WARNING, RunEventKind.ERROR):
+            if status.current_stage:
+                self.status_var.set(f"{status.current_stage} 実行中... (警告 {status.warning_count} / エラー {status.error_count})")
+        elif event.kind is RunEventKind.RUN_END:
+            self.on_run_finished(status)
+
+    def on_run_finished(self, status: RunStatus):
+        self.is_running = False
+        self.run_button.config(state="normal")
+        self.strategy_button.config(state="normal")
+        self.cancel_button.config(state="disabled")
+        cancelled = self.cancel_token is not None and self.cancel_token.cancelled
+
+        result = "中止" if cancelled else "完了" if status.succeeded else "失敗"
+        self.status_var.set(f"{status.name} {result} ({status.elapsed or 0:.1f}秒, 警告 {status.warning_count} / エラー {status.error_count})")
+        for name, elapsed, ok in status.stage_timings:
+            logging.info(f"  ステージ {name}: {elapsed:.2f}秒 ({'成功' if ok else '失敗'})")
+        logging.info(f"{ '='*20} {status.name}が終了しました {'='*20}")
+
+        if cancelled:
+            messagebox.showinfo("中止", f"{status.name}を中止しました。")
+        elif status.succeeded:
+            messagebox.showinfo("完了", f"{status.name}が正常に完了しました！")
+        else:
+            messagebox.showerror("エラー", f"{status.name}中にエラーが発生しました。\n詳細はログを確認してください。")
 
     def start_process(self, process_func):
         if self.is_running:
             messagebox.showwarning("実行中", "プロセスは既に実行中です。")
             return
+        if self.orchestrator is None:
+            messagebox.showwarning("初期化中", "処理モジュールを読み込み中です。しばらくお待ちください。")
+            return
         if not self.save_settings():
             return
-        
+
+        self.is_running = True
+        # 実行ごとに新しいトークンを渡す (前回の中止要求を持ち越さない)
+        self.cancel_token = CancelToken()
+        self.orchestrator.cancel_token = self.cancel_token
+        self.run_button.config(state="disabled")
+        self.strategy_button.config(state="disabled")
+        self.cancel_button.config(state="normal")
+        self.log_text.config(state="normal")
+        self.log_text.delete('1.0', tk.END)
+        self.log_text.config(state="disabled")
+        self.progress_bar.config(value=0)
+
         thread = threading.Thread(target=process_func)
         thread.daemon = True
         thread.start()
 
+    def cancel_process(self):
+        """実行中の処理に中止を要求する。xEdit/MO2 のプロセスは終了され、後始末は実行される。"""
+        if not self.is_running or self.cancel_token is None or self.cancel_token.cancelled:
+            return
+        logging.warning("ユーザーが処理の中止を要求しました。実行中のプロセスを停止しています...")
+        self.cancel_token.cancel()
+        self.cancel_button.config(state="disabled")
+        self.status_var.set("中止しています...")
+
     def start_strategy_generation(self):
         self.start_process(self.run_strategy_generation_in_thread)
 
@@ -243,34 +451,17 @@ class Application(tk.Frame):
         self.start_process(self.run_full_process_in_thread)
 
     def run_process_wrapper(self, target_func, process_name):
-        self.is_running = True
-        self.run_button.config(state="disabled")
-        self.strategy_button.config(state="disabled")
-        
-        self.log_text.config(state="normal")
-        self.log_text.delete('1.0', tk.END)
-        self.log_text.config(state="disabled")
-        
-        was_successful = True
-        try:
-            target_func()
-            final_log = self.log_text.get("1.0", tk.END)
-            if "プロセス失敗" in final_log or "CRITICAL" in final_log:
-                 was_successful = False
-        except Exception:
-            logging.critical("プロセスの実行中にキャッチされない例外が発生しました。", exc_info=True)
-            was_successful = False
-        finally:
-            self.is_running = False
-            self.run_button.config(state="normal")
-            self.strategy_button.config(state="normal")
-            
-            logging.info(f"{ '='*20} {process_name}が終了しました {'='*20}")
-
-            if was_successful:
-                messagebox.showinfo("完了", f"{process_name}が正常に完了しました！")
-            else:
-                messagebox.showerror("エラー", f"{process_name}中にエラーが発生しました。\n詳細はログを確認してください。")
+        """
+        ワーカースレッドで target_func を実行する。成否と完了処理は RUN_END イベント経由で
+        メインスレッドの on_run_finished が扱う (例外で抜けた場合も RUN_END は必ず発行される)。
+        """
+        with self.orchestrator.events.run(process_name) as run:
+            try:
+                run.ok = bool(target_func())
+            except RunCancelled:
+                logging.warning(f"{process_name}は中止されました。")
+            except Exception:
+                logging.critical("プロセスの実行中にキャッチされない例外が発生しました。", exc_info=True)
 
     def run_strategy_generation_in_thread(self):
         self.run_process_wrapper(self.orchestrator.run_strategy_generation, "戦略ファイル生成処理")
@@ -279,8 +470,7 @@ class Application(tk.Frame):
         self.run_process_wrapper(self.orchestrator.run_full_process, "全自動処理")
 
 def setup_logging(log_queue):
-    log_format = '%(asctime)s - %(levelname)s - %(message)s'
-    formatter = logging.Formatter(log_format)
+    formatter = logging.Formatter(LOG_FORMAT)
     
     file_handler = logging.FileHandler("patcher.log", mode='w', encoding='utf-8')
     file_handler.setFormatter(formatter)
@@ -294,29 +484,44 @@ def setup_logging(log_queue):
     logging.basicConfig(level=logging.INFO, handlers=[file_handler, stream_handler, queue_handler])
 
 if __name__ == '__main__':
-    if not is_admin():
-        if messagebox.askyesno("管理者権限の確認", "このアプリケーションは管理者権限で実行されていません。\nファイルの移動やコピーが失敗する可能性があります。\n\n管理者権限で再起動しますか？"): # Changed from to \n
-            if not request_admin_elevation():
-                messagebox.showerror("エラー", "管理者権限での再起動に失敗しました。\n手動で「管理者として実行」を選択して起動してください。")
-        else:
-            logging.warning("[警告] 管理者権限なしで続行します")
-    
+    profile_startup = "--profile-startup" in sys.argv[1:] or os.environ.get("AUTOPATCHER_PROFILE_STARTUP") == "1"
+    profiler = StartupProfiler(profile_startup)
+
+    with profiler.phase("admin check"):
+        admin_check = profiler.import_module("admin_check")
+        if not admin_check.is_admin():
+            if messagebox.askyesno("管理者権限の確認", "このアプリケーションは管理者権限で実行されていません。\nファイルの移動やコピーが失敗する可能性があります。\n\n管理者権限で再起動しますか？"):
+                if not admin_check.request_admin_elevation():
+                    messagebox.showerror("エラー", "管理者権限での再起動に失敗しました。\n手動で「管理者として実行」を選択して起動してください。")
+            else:
+                logging.warning("[警告] 管理者権限なしで続行します")
+
     gui_log_queue = queue.Queue()
     setup_logging(gui_log_queue)
-    
+
     root = tk.Tk()
     app = None
     try:
-        from config_manager import ConfigManager
-        from Orchestrator import Orchestrator
-
-        config_mgr = ConfigManager('config.ini')
-        orchestrator_instance = Orchestrator(config_mgr)
-        app = Application(master=root, config_manager=config_mgr, orchestrator=orchestrator_instance, log_queue=gui_log_queue)
+        with profiler.phase("config load"):
+            ConfigManager = profiler.import_module("config_manager").ConfigManager
+            config_mgr = ConfigManager('config.ini')
+        with profiler.phase("window build"):
+            app = Application(master=root, config_manager=config_mgr, orchestrator=None, log_queue=gui_log_queue)
+        root.after_idle(lambda: profiler.mark("window shown (first idle)"))
+
+        def load_orchestrator():
+            with profiler.phase("orchestrator import"):
+                Orchestrator = profiler.import_module("Orchestrator").Orchestrator
+            with profiler.phase("orchestrator init"):
+                # 管理者権限は起動時に確認済み
+                return Orchestrator(config_mgr, check_admin=False, events=RunEventBus(app.run_event_queue))
+
+        app.load_orchestrator_async(load_orchestrator, on_loaded=profiler.report)
     except Exception as e:
         logging.critical("アプリケーションの初期化中に致命的なエラーが発生しました。", exc_info=True)
         messagebox.showerror("致命的なエラー", f"アプリケーションの起動に失敗しました:\n{e}")
         root.destroy()
-    
+        app = None
+
     if app:
-        app.mainloop()
\ No newline at end of file
+        app.mainloop()
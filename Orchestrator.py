@@ -11,37 +11,99 @@ import locale
 import psutil
 import shlex
 import uuid
-from typing import Sequence, Optional, Callable
+from typing import Iterator, Sequence, Optional
+from contextlib import contextmanager
 
 from robco_ini_generate import run as generate_robco_inis
 from admin_check import is_admin, check_directory_access
-from utils import read_text_utf8_fallback
+from utils import read_text_auto, atomic_write_text
+from ammo_classifier import AmmoClassifier
+from run_events import RunEventBus
+from cancellation import CancelToken, RunCancelled
+from artifact_store import ArtifactStore, ArtifactRun, link_file, remove_file
+import consistency_check
+import profiling
+from profiling import span
+
+def kill_process_tree(pid: int):
+    """pid のプロセスとその子孫をすべて終了させる。"""
+    try:
+        parent = psutil.Process(pid)
+        procs = parent.children(recursive=True) + [parent]
+    except psutil.NoSuchProcess:
+        return
+    for proc in procs:
+        try:
+            proc.kill()
+        except (psutil.NoSuchProcess, psutil.AccessDenied):
+            continue
+    psutil.wait_procs(procs, timeout=5)
+
+def wait_process(proc, timeout: Optional[float], cancel_token: CancelToken, poll_interval: float = 0.2) -> int:
+    """
+    proc (subprocess.Popen / psutil.Process) の終了を待って終了コードを返す。
+    キャンセルされたらプロセスツリーを終了させて RunCancelled を、timeout を超えたら
+    proc の種類に応じた TimeoutExpired を送出する (Popen の場合は subprocess.run と同様に kill する)。
+    """
+    deadline = None if timeout is None else time.monotonic() + timeout
+    while True:
+        try:
+            return proc.wait(timeout=poll_interval)
+        except (subprocess.TimeoutExpired, psutil.TimeoutExpired):
+            pass
+        if cancel_token.cancelled:
+            logging.warning(f"[XEditRunner] キャンセル要求によりプロセスツリーを終了します (pid={proc.pid})")
+            kill_process_tree(proc.pid)
+            raise RunCancelled(cancel_token.reason)
+        if deadline is not None and time.monotonic() >= deadline:
+            if isinstance(proc, subprocess.Popen):
+                proc.kill()
+                proc.wait()
+                raise subprocess.TimeoutExpired(proc.args, timeout)
+            raise psutil.TimeoutExpired(timeout, pid=proc.pid)
+
+def open_artifact_store(settings) -> ArtifactStore:
+    """設定の保持ポリシーで output_dir/artifacts の成果物ストアを開く。"""
+    params = settings.parameters
+    return ArtifactStore(
+        settings.paths.output_dir / 'artifacts',
+        max_bytes=params.artifact_retention_mb * 1024 * 1024,
+        max_age_seconds=params.artifact_retention_days * 86400,
+        keep_runs=params.artifact_keep_runs,
+    )
 
 class XEditRunner:
     """xEditの実行に関するすべてのロジックをカプセル化するクラス。"""
 
-    def __init__(self, config_manager, script_key: str, success_message: str, expected_outputs: Optional[list[str]] = None):
+    def __init__(self, config_manager, script_key: str, success_message: str, expected_outputs: Optional[list[str]] = None,
+                 cancel_token: Optional[CancelToken] = None):
         self.config = config_manager
+        self.cancel_token = cancel_token or CancelToken()
         self.script_key = script_key
         self.success_message = success_message
         self.expected_outputs = expected_outputs
 
+        # 検証済みの設定スナップショット (パスは解決済み、数値は型変換済み)
+        self.settings = self.config.snapshot
+
         # --- パスの設定 ---
-        self.output_dir = self.config.get_path('Paths', 'output_dir')
+        self.output_dir = self.settings.paths.output_dir
         self.logs_dir = self.output_dir / 'logs'
         self.intermediate_dir = self.output_dir / 'intermediate'
+        # デバッグ用のコピーや収集した成果物の履歴は内容アドレス型ストアに保存する
+        self.artifacts = open_artifact_store(self.settings)
 
-        self.xedit_executable_path = self.config.get_path('Paths', 'xedit_executable')
+        self.xedit_executable_path = self.settings.paths.xedit_executable
         self.xedit_dir = self.xedit_executable_path.parent
         self.edit_scripts_dir = self.xedit_dir / "Edit Scripts"
-        self.pas_scripts_dir = self.config.get_path('Paths', 'pas_scripts_dir')
-        self.game_data_path = self.config.get_path('Paths', 'game_data_path')
+        self.pas_scripts_dir = self.settings.paths.pas_scripts_dir
+        self.game_data_path = self.settings.paths.game_data_path
         
-        self.env_settings = self.env_settings = self.config.get_env_settings()
-        self.use_mo2 = self.env_settings.get('use_mo2', False)
-        self.timeout_seconds = self._get_numeric('Parameters', 'xedit_timeout_seconds', 600, int)
-        self.log_verification_timeout = self._get_numeric('Parameters', 'log_verification_timeout_seconds', 10, int)
-        self.poll_interval = self._get_numeric('Parameters', 'log_poll_interval_seconds', 0.5, float)
+        self.env_settings = self.config.get_env_settings()
+        self.use_mo2 = self.settings.environment.use_mo2
+        self.timeout_seconds = self.settings.parameters.xedit_timeout_seconds
+        self.log_verification_timeout = self.settings.parameters.log_verification_timeout_seconds
+        self.poll_interval = self.settings.parameters.log_poll_interval_seconds
         
         # --- 実行中の状態 ---
         self.source_script_path: Path | None = None
@@ -49,18 +111,27 @@ class XEditRunner:
         self.session_log_path: Path | None = None
         self.lib_backup_dir: Path | None = None
         self.xedit_lib_backup: Path | None = None
+        self.artifact_run: ArtifactRun | None = None
 
     def run(self) -> bool:
         """xEdit実行のメインフローを制御する。"""
         try:
-            if not self._prepare_environment(): return False
-            command_list = self._build_command()
+            with span("xedit.prepare"):
+                if not self._prepare_environment(): return False
+            with span("xedit.build_command"):
+                command_list = self._build_command()
             if not command_list: return False
             exit_code = self._execute_and_monitor(command_list)
-            if not self._verify_execution(exit_code): return False
-            if self.expected_outputs and not self._collect_artifacts():
-                logging.warning("[XEditRunner] 成果物の収集に失敗しましたが、処理を続行します。")
+            with span("xedit.verify"):
+                if not self._verify_execution(exit_code): return False
+            if self.expected_outputs:
+                with span("xedit.collect"):
+                    if not self._collect_artifacts():
+                        logging.warning("[XEditRunner] 成果物の収集に失敗しましたが、処理を続行します。")
             return True
+        except RunCancelled:
+            logging.warning("[XEditRunner] キャンセルされました。環境を元に戻します。")
+            raise
         except (subprocess.TimeoutExpired, psutil.TimeoutExpired):
             logging.error(f"[XEditRunner] タイムアウト ({self.timeout_seconds}s 超過)")
             if self.expected_outputs: self._collect_artifacts()
@@ -69,7 +140,8 @@ class XEditRunner:
             logging.critical(f"[XEditRunner] 例外発生: {e}", exc_info=True)
             return False
         finally:
-            self._cleanup_environment()
+            with span("xedit.cleanup"):
+                self._cleanup_environment()
 
     def _prepare_environment(self) -> bool:
         """xEdit実行前のファイル準備を行う。"""
@@ -90,7 +162,12 @@ class XEditRunner:
         print(f"TEMP_SCRIPT:{temp_script_filename}")
 
         self.session_log_path = self.logs_dir / f"xEdit_session_{int(time.time())}.log"
-        self._write_debug_files()
+        try:
+            self.artifact_run = self.artifacts.begin_run(self.script_key)
+            self._write_debug_files()
+            self.artifacts.enforce_retention()
+        except Exception as e:
+            logging.warning(f"[XEditRunner] 成果物ストアへの記録・整理に失敗: {e}")
         self._backup_and_copy_libs()
         self._copy_pas_units()
         return True
@@ -210,8 +287,16 @@ class XEditRunner:
                 break
             except Exception as e:
                 logging.debug(f"[XEditRunner] 子プロセス走査中の例外: {e}")
+            # MO2 が (起動中のインスタンスへ引き継いで) 終了していれば子孫からは見つからない。
+            # Popen を wait していないので NoSuchProcess にはならず、ゾンビとして残る点に注意
+            try:
+                if not parent.is_running() or parent.status() == psutil.STATUS_ZOMBIE:
+                    logging.debug(f"[XEditRunner] MO2(pid={mo2_pid}) は終了済みです。子プロセスの待機を打ち切ります")
+                    break
+            except (psutil.NoSuchProcess, psutil.AccessDenied):
+                break
 
-            time.sleep(0.5)
+            self.cancel_token.sleep(0.5)
 
         logging.debug(f"[XEditRunner] MO2(pid={mo2_pid}) の子から xEdit を検出できませんでした (timeout={timeout})")
         return None
@@ -228,7 +313,7 @@ class XEditRunner:
                 with open(path, 'rb'):
                     return True
             except Exception:
-                time.sleep(poll_interval)
+                self.cancel_token.sleep(poll_interval)
         return False
     
     def _execute_and_monitor(self, command_list: list[str]) -> Optional[int]:
@@ -258,40 +343,60 @@ class XEditRunner:
 
         with open(self.session_log_path, 'a', encoding='utf-8', errors='replace') as lf:
                 if self.use_mo2:
-                    mo2_process = subprocess.Popen(command_list, stdout=lf, stderr=lf)
-                    # MO2 を起動した直後に追加
-                    logging.info(f"[DEBUG] Started MO2 pid={mo2_process.pid}")
-                    # 少し待って子を探す
-                    time.sleep(1)
-                    for p in psutil.process_iter(['pid','name','cmdline']):
-                        try:
-                            if p.info['pid'] == mo2_process.pid:
-                                logging.info(f"[DEBUG] MO2 process found: {p.info}")
-                                for child in p.children(recursive=True):
-                                    logging.info(f"[DEBUG] MO2 child: pid={child.pid} name={child.name()} cmdline={child.cmdline()}")
-                        except Exception:
-                            continue
-                    # 1) MO2 の子プロセスとして起動される xEdit を待つ（より robust）
-                    xedit_ps = self._wait_for_xedit_from_mo2(mo2_process.pid, timeout=self.timeout_seconds)
-                    if xedit_ps:
-                        try:
-                            # xEdit プロセスが終了するのを待つ
-                            return xedit_ps.wait(timeout=self.timeout_seconds)
-                        except psutil.TimeoutExpired:
-                            logging.error(f"[XEditRunner] xEdit プロセスの待機中にタイムアウト ({self.timeout_seconds}s)")
-                            return None
-                    # 2) フォールバック: グローバル検索
-                    logging.debug("[XEditRunner] MO2 経由での子プロセス検出に失敗。グローバル検索へフォールバックします。")
-                    xedit_ps = self._find_xedit_process()
-                    if xedit_ps:
-                        try:
-                            return xedit_ps.wait(timeout=self.timeout_seconds)
-                        except psutil.TimeoutExpired:
-                            logging.error(f"[XEditRunner] xEdit プロセスの待機中にタイムアウト ({self.timeout_seconds}s)")
-                            return None
-                    return None
+                    with span("xedit.launch"):
+                        mo2_process = subprocess.Popen(command_list, stdout=lf, stderr=lf)
+                    try:
+                        return self._monitor_mo2(mo2_process)
+                    except RunCancelled:
+                        kill_process_tree(mo2_process.pid)
+                        raise
                 else:
-                    return subprocess.run(command_list, stdout=lf, stderr=lf, timeout=self.timeout_seconds).returncode
+                    with span("xedit.launch"):
+                        process = subprocess.Popen(command_list, stdout=lf, stderr=lf)
+                    with span("xedit.wait"):
+                        return wait_process(process, self.timeout_seconds, self.cancel_token)
+
+    def _monitor_mo2(self, mo2_process: subprocess.Popen) -> Optional[int]:
+        """MO2 経由で起動された xEdit を見つけ、その終了を待つ。"""
+        # MO2 を起動した直後に追加
+        logging.info(f"[DEBUG] Started MO2 pid={mo2_process.pid}")
+        with span("xedit.detect"):
+            xedit_ps = self._detect_xedit_from_mo2(mo2_process)
+        if not xedit_ps:
+            return None
+        try:
+            # xEdit プロセスが終了するのを待つ
+            with span("xedit.wait"):
+                exit_code = wait_process(xedit_ps, self.timeout_seconds, self.cancel_token)
+        except psutil.TimeoutExpired:
+            logging.error(f"[XEditRunner] xEdit プロセスの待機中にタイムアウト ({self.timeout_seconds}s)")
+            return None
+        if exit_code is None:
+            # 自プロセスの子でないプロセスの終了コードは (Windows 以外では) 取得できない。
+            # 成否はログと成果物の検査に任せる
+            logging.info(f"[XEditRunner] xEdit(pid={xedit_ps.pid}) の終了コードを取得できません。ログで成否を判定します")
+            return 0
+        return exit_code
+
+    def _detect_xedit_from_mo2(self, mo2_process: subprocess.Popen) -> Optional[psutil.Process]:
+        """MO2 の起動後、その子プロセス (見つからなければ全プロセス) から xEdit を探す。"""
+        # 少し待って子を探す
+        self.cancel_token.sleep(1)
+        for p in psutil.process_iter(['pid','name','cmdline']):
+            try:
+                if p.info['pid'] == mo2_process.pid:
+                    logging.info(f"[DEBUG] MO2 process found: {p.info}")
+                    for child in p.children(recursive=True):
+                        logging.info(f"[DEBUG] MO2 child: pid={child.pid} name={child.name()} cmdline={child.cmdline()}")
+            except Exception:
+                continue
+        # 1) MO2 の子プロセスとして起動される xEdit を待つ（より robust）
+        xedit_ps = self._wait_for_xedit_from_mo2(mo2_process.pid, timeout=self.timeout_seconds)
+        if not xedit_ps:
+            # 2) フォールバック: グローバル検索
+            logging.debug("[XEditRunner] MO2 経由での子プロセス検出に失敗。グローバル検索へフォールバックします。")
+            xedit_ps = self._find_xedit_process()
+        return xedit_ps
 
     def _verify_execution(self, exit_code: Optional[int]) -> bool:
         """実行の成否を判定する。"""
@@ -352,15 +457,11 @@ class XEditRunner:
 
     def _cleanup_environment(self):
         """一時ファイルやバックアップをクリーンアップする。"""
-        if str(self.config.get_string('Environment', 'keep_temp_scripts', 'false')).lower() not in ('1', 'true', 'yes'):
+        if not self.settings.environment.keep_temp_scripts:
             if self.temp_script_path and self.temp_script_path.exists(): self.temp_script_path.unlink()
         if self.lib_backup_dir and self.lib_backup_dir.exists(): shutil.move(str(self.lib_backup_dir), str(self.edit_scripts_dir / 'lib'))
         if self.xedit_lib_backup and self.xedit_lib_backup.exists(): shutil.move(str(self.xedit_lib_backup), str(self.xedit_dir / 'lib'))
 
-    def _get_numeric(self, section: str, option: str, default, cast: Callable):
-        try: return cast(self.config.get_string(section, option)) or default
-        except: return default
-
     def _validate_data_path(self, path: Path) -> bool:
         if not path.is_dir() or not (path / "Fallout4.esm").is_file():
             logging.error(f"[XEditRunner] DataパスまたはFallout4.esmが見つかりません: {path}")
@@ -386,6 +487,7 @@ class XEditRunner:
 
         all_found = True
         for filename in filenames:
+            self.cancel_token.raise_if_cancelled()
             # 集められた候補のうち該当ファイルが存在するパス一覧を作る
             paths = []
             for c in candidates:
@@ -422,9 +524,16 @@ class XEditRunner:
                     all_found = False
                     continue
 
-                # コピー実行（dest が存在していれば上書き）
+                # 成果物ストアに保存できたら dest はその blob へのハードリンクにする (読み取り専用になる)。
+                # ストアが使えなければ従来どおりコピーする
                 try:
-                    shutil.copy2(src, dest)
+                    stored = self._store_artifact(filename, src)
+                    if stored is not None:
+                        link_file(stored, dest)
+                    else:
+                        # 前回の実行でリンクした読み取り専用の dest も上書きできるよう先に消す
+                        remove_file(dest)
+                        shutil.copy2(src, dest)
                     logging.info(f"[XEditRunner] 成果物コピー完了: {src} -> {dest}")
                 except Exception as e:
                     logging.error(f"[XEditRunner] 成果物のコピーに失敗: {filename}: {e}")
@@ -439,8 +548,8 @@ class XEditRunner:
 
     def _candidate_output_dirs(self) -> list[Path]:
         dirs = [self.output_dir, self.intermediate_dir, self.xedit_dir / 'Edit Scripts' / 'Output']
-        try: dirs.append(self.config.get_path('Paths', 'overwrite_path') / 'Edit Scripts' / 'Output')
-        except: pass
+        if self.settings.paths.overwrite_path:
+            dirs.append(self.settings.paths.overwrite_path / 'Edit Scripts' / 'Output')
         seen = set()
         return [d for d in dirs if d and d.exists() and (k := str(d.resolve()).lower()) not in seen and not seen.add(k)]
 
@@ -468,7 +577,7 @@ class XEditRunner:
 
         for p in locations:
             try:
-                txt = p.read_text(encoding='utf-8', errors='replace')
+                txt = read_text_auto(p)
                 for pat in patterns:
                     if pat in txt:
                         logging.debug(f"[XEditRunner] Found fallback pattern '{pat}' in {p}")
@@ -497,8 +606,10 @@ class XEditRunner:
         for p in candidates:
             try:
                 if p and p.exists():
-                    dest = self.logs_dir / f"collected_manual_debug_{p.name}"
-                    shutil.copy2(p, dest)
+                    dest = self._store_artifact(f"collected_manual_debug_{p.name}", p)
+                    if dest is None:
+                        dest = self.logs_dir / f"collected_manual_debug_{p.name}"
+                        shutil.copy2(p, dest)
                     logging.info(f"[XEditRunner] Collected manual debug log: {p} -> {dest}")
                     return True
             except Exception as e:
@@ -515,7 +626,7 @@ class XEditRunner:
                     if p.info['name'].lower() == name and p.info['create_time'] > (time.time() - 10):
                         return psutil.Process(p.info['pid'])
                 except (psutil.NoSuchProcess, psutil.AccessDenied): continue
-            time.sleep(0.5)
+            self.cancel_token.sleep(0.5)
         return None
 
     def _find_success_in_logs(self) -> bool:
@@ -559,7 +670,7 @@ class XEditRunner:
                     continue
                 scanned.add(key)
                 try:
-                    txt = p.read_text(encoding='utf-8', errors='replace')
+                    txt = read_text_auto(p)
                     logging.debug(f"[XEditRunner] Scanning log file for success_message: {p}")
                     if self.success_message in txt:
                         logging.info(f"[XEditRunner] success_message found in log: {p}")
@@ -568,7 +679,7 @@ class XEditRunner:
                     logging.debug(f"[XEditRunner] Failed reading log {p}: {e}")
                     continue
 
-            time.sleep(self.poll_interval)
+            self.cancel_token.sleep(self.poll_interval)
 
         return False
     
@@ -594,39 +705,44 @@ class XEditRunner:
                 logging.warning(f"  [✗] 未発見: {fn}")
         return found_count
 
-    def _write_debug_files(self):
-        # Write out a few debug artifacts safely. Keep this robust so failures here
-        # don't break the runner flow. We prefer to write a cp932-encoded copy for
-        # Japanese Windows/xEdit, but fall back to utf-8 on failure.
+    def _store_artifact(self, name: str, src: Path) -> Optional[Path]:
+        """src を今回の実行の成果物としてストアに保存する。失敗しても処理は止めない。"""
+        if self.artifact_run is None:
+            return None
         try:
-            # Primary simple copy for raw byte-for-byte reference
-            shutil.copy2(self.temp_script_path, self.intermediate_dir / f"copied_temp_{self.temp_script_path.name}")
+            return self.artifact_run.put_file(name, src)
         except Exception as e:
-            logging.warning(f"[XEditRunner] copied_temp の作成に失敗: {e}")
+            logging.warning(f"[XEditRunner] 成果物ストアへの保存に失敗: {name}: {e}")
+            return None
+
+    def _write_debug_files(self):
+        # Record a few debug artifacts for this run in the artifact store. Identical
+        # contents across runs are stored once and hard-linked into each run folder.
+        # Failures here must not break the runner flow.
+        run = self.artifact_run
+        self._store_artifact("copied_temp.pas", self.temp_script_path)
 
         try:
-            inspect_txt = f"source={self.source_script_path}\nexists={self.source_script_path.exists()}"
-            (self.intermediate_dir / f"temp_inspect_{self.temp_script_path.name}.txt").write_text(inspect_txt, encoding='utf-8')
+            inspect_txt = (f"source={self.source_script_path}\nexists={self.source_script_path.exists()}\n"
+                           f"temp={self.temp_script_path.name}")
+            run.put_text("temp_inspect.txt", inspect_txt)
         except Exception as e:
             logging.warning(f"[XEditRunner] temp_inspect の書き出しに失敗: {e}")
 
-        # Try to create a readable debug copy: prefer cp932, then utf-8 as fallback.
+        # Readable debug copy: prefer cp932 (Japanese Windows / xEdit), then utf-8.
         try:
             txt = self.temp_script_path.read_text(encoding='utf-8', errors='replace')
         except Exception as e:
             logging.warning(f"[XEditRunner] TEMPスクリプトの読み取りに失敗: {e}")
             txt = ''
-
-        debug_copy_path = self.intermediate_dir / f"copied_temp_readable_{self.temp_script_path.name}.pas"
         try:
-            # First attempt: cp932 (Windows ANSI / Japanese)
-            debug_copy_path.write_text(txt, encoding='cp932')
-        except Exception:
             try:
-                # Fall back to utf-8
-                debug_copy_path.write_text(txt, encoding='utf-8')
-            except Exception as e:
-                logging.warning(f"[XEditRunner] デバッグコピー書き込みに失敗: {e}")
+                data = txt.encode('cp932')
+            except UnicodeEncodeError:
+                data = txt.encode('utf-8')
+            run.put_bytes("copied_temp_readable.pas", data, source=str(self.temp_script_path))
+        except Exception as e:
+            logging.warning(f"[XEditRunner] デバッグコピー書き込みに失敗: {e}")
 
     def _copy_pas_units(self):
         # Copy top-level pas units
@@ -667,22 +783,79 @@ class XEditRunner:
 class Orchestrator:
     """全自動パッチ処理のオーケストレータ。"""
 
-    def __init__(self, config_manager):
+    def __init__(self, config_manager, check_admin: bool = True, events: Optional[RunEventBus] = None,
+                 cancel_token: Optional[CancelToken] = None):
         self.config = config_manager
-        if not is_admin():
+        # 呼び出し元は実行ごとに新しい CancelToken を設定し、cancel() で中止を要求できる
+        self.cancel_token = cancel_token or CancelToken()
+        # 実行状況は events (RunEventBus) に構造化イベントとして流す
+        self.events = events or RunEventBus()
+        # GUI のように起動時に確認済みの呼び出し元は check_admin=False で二重確認を省ける
+        if check_admin and not is_admin():
             logging.warning("管理者権限で実行されていません。ファイルの移動やコピーが失敗する可能性があります。")
 
+    @contextmanager
+    def _profiled(self, label: str) -> Iterator[None]:
+        """
+        実行全体を計測し、終了時に run_profile.json と run_trace.json を成果物ストアに保存する。
+        既に計測中 (全自動処理の中から呼ばれた場合など) なら 1 つの区間として記録するだけにする。
+        """
+        try:
+            params = self.config.snapshot.parameters
+        except Exception as e:
+            logging.debug(f"[Profile] 設定を読めないため計測しません: {e}")
+            params = None
+        if profiling.active() is not None or params is None or not params.profiling:
+            with span(label):
+                yield
+            return
+        profiler = profiling.Profiler(label, trace_memory=params.profiling_trace_memory)
+        try:
+            with profiler.activate():
+                yield
+        finally:
+            self._save_profile(profiler)
+
+    def _save_profile(self, profiler: "profiling.Profiler"):
+        try:
+            run = open_artifact_store(self.config.snapshot).begin_run(f"profile_{profiler.label}", retain=False)
+            run.put_text(profiling.TRACE_FILE, profiling.dumps_trace(profiler))
+            path = run.put_text(profiling.PROFILE_FILE, profiling.dumps_profile(profiler))
+            profiler.log_summary()
+            logging.info(f"[Profile] 実行プロファイルを保存しました: {path}")
+        except Exception as e:
+            logging.warning(f"[Profile] 実行プロファイルの保存に失敗: {e}")
+
     def run_xedit_script(self, script_key: str, success_message: str, expected_outputs: Optional[list[str]] = None) -> bool:
         try:
-            runner = XEditRunner(self.config, script_key, success_message, expected_outputs)
-            return runner.run()
+            with self._profiled(f"xEdit {script_key}"):
+                runner = XEditRunner(self.config, script_key, success_message, expected_outputs, cancel_token=self.cancel_token)
+                return runner.run()
         except Exception as e:
             logging.critical(f"[Orchestrator] XEditRunnerの初期化または実行中に致命的なエラー: {e}", exc_info=True)
             return False
 
-    def run_strategy_generation(self) -> bool:
+    def run_strategy_generation(self, incremental: Optional[bool] = None) -> bool:
+        """
+        munitions_ammo_ids.ini の弾薬を分類し、strategy.json の ammo_classification を更新する。
+        incremental モード (既定) では、既に分類済みの FormID には手を触れず (手動調整を保持)、
+        追加された FormID のみを分類し、エクスポートから消えた FormID のみを削除する。
+        """
+        with self.events.run("戦略ファイル生成処理", total_stages=1) as run, self._profiled("戦略ファイル生成処理"):
+            try:
+                self.cancel_token.raise_if_cancelled()
+                with self.events.stage("戦略ファイル更新", 1, 1) as stage, span("stage.strategy"):
+                    stage.ok = self._generate_strategy(incremental)
+                run.ok = stage.ok
+            except RunCancelled:
+                logging.warning("[Main] 戦略ファイル生成処理はキャンセルされました。")
+        return run.ok
+
+    def _generate_strategy(self, incremental: Optional[bool]) -> bool:
         logging.info("戦略ファイル生成処理開始")
         try:
+            if incremental is None:
+                incremental = self.config.get_boolean('Parameters', 'strategy_incremental', fallback=True)
             output_dir = self.config.get_path('Paths', 'output_dir')
             intermediate_dir = output_dir / 'intermediate'
             categories_file = self.config.get_path('Paths', 'ammo_categories_file')
@@ -693,22 +866,52 @@ class Orchestrator:
                 logging.error("[Strategy] 戦略生成に必要なファイルが不足しています。")
                 return False
 
-            rules = json.loads(read_text_utf8_fallback(categories_file)).get("classification_rules", [])
             parser = configparser.ConfigParser()
-            parser.read(munitions_id_file, encoding='utf-8')
-
-            ammo_classification = {}
+            parser.read_string(read_text_auto(munitions_id_file))
+            munitions_ammo = {}
             if parser.has_section('MunitionsAmmo'):
-                for form_id, editor_id in parser.items('MunitionsAmmo'):
-                    eid_lower = editor_id.lower()
-                    for rule in rules:
-                        if any(kw.lower() in eid_lower for kw in rule["keywords"]):
-                            ammo_classification[form_id.upper()] = {"Category": rule["Category"], "Power": rule["Power"]}
-                            break
-            
-            strategy_data = json.loads(read_text_utf8_fallback(strategy_file))
+                munitions_ammo = {form_id.upper(): editor_id for form_id, editor_id in parser.items('MunitionsAmmo')}
+
+            strategy_data = json.loads(read_text_auto(strategy_file))
+            existing = strategy_data.get("ammo_classification") or {}
+            if incremental:
+                added = [fid for fid in munitions_ammo if fid not in existing]
+                removed = [fid for fid in existing if fid not in munitions_ammo]
+                ammo_classification = {fid: info for fid, info in existing.items() if fid in munitions_ammo}
+            else:
+                added = list(munitions_ammo)
+                removed = [fid for fid in existing if fid not in munitions_ammo]
+                ammo_classification = {}
+
+            unclassified = []
+            if added:
+                # ルールは1本の正規表現にコンパイルし、ルールファイルのハッシュ単位でキャッシュする
+                classifier = AmmoClassifier.from_rules_file(categories_file, cache_dir=intermediate_dir / 'cache')
+                for fid, result in zip(added, classifier.classify_many([munitions_ammo[fid] for fid in added])):
+                    if result:
+                        ammo_classification[fid] = result
+                    else:
+                        unclassified.append(fid)
+
+            mode = "差分" if incremental else "全件"
+            logging.info(
+                f"[Strategy] {mode}更新: 追加 {len(added) - len(unclassified)}件 / 未分類 {len(unclassified)}件 / "
+                f"削除 {len(removed)}件 / 維持 {len(ammo_classification) - len(added) + len(unclassified)}件"
+            )
+            for fid in added[:20]:
+                if fid not in unclassified:
+                    logging.info(f"[Strategy]   + {fid} {munitions_ammo[fid]} -> {ammo_classification[fid]['Category']}")
+            for fid in unclassified[:20]:
+                logging.warning(f"[Strategy]   ? {fid} {munitions_ammo[fid]} (一致する分類ルールなし)")
+            for fid in removed[:20]:
+                logging.info(f"[Strategy]   - {fid}")
+
+            if ammo_classification == existing:
+                logging.info(f"[Strategy] 変更がないため {strategy_file.name} の書き込みをスキップします。")
+                return True
+
             strategy_data["ammo_classification"] = ammo_classification
-            strategy_file.write_text(json.dumps(strategy_data, indent=2, ensure_ascii=False), encoding='utf-8')
+            atomic_write_text(strategy_file, json.dumps(strategy_data, indent=2, ensure_ascii=False))
             logging.info(f"[Strategy] 更新完了: {strategy_file.name}")
             return True
         except Exception as e:
@@ -717,25 +920,83 @@ class Orchestrator:
 
     def _generate_robco_ini(self) -> bool:
         return generate_robco_inis(self.config)
+
+    def _check_consistency(self) -> bool:
+        """
+        INI 生成前にファイル間の整合性を検査する。
+        consistency_gate が有効なら ERROR があった時点で False を返し、無効なら報告だけする。
+        gate が有効なときは、検査自体が失敗した場合も生成を止める (素通りさせない)。
+        """
+        try:
+            gate = self.config.snapshot.parameters.consistency_gate
+        except Exception as e:
+            logging.error(f"[Consistency] 設定を読めないため consistency_gate を有効として扱います: {e}")
+            gate = True
+        try:
+            with span("consistency"):
+                report = consistency_check.run(self.config)
+        except Exception as e:
+            logging.error(f"[Consistency] 整合性検査に失敗しました: {e}", exc_info=True)
+            if gate:
+                logging.critical("[Main] 整合性検査を実行できなかったため INI 生成を中止します "
+                                 "(consistency_gate = False で検査なしに続行できます)")
+            return not gate
+        if report.ok or not gate:
+            return True
+        logging.critical(f"[Main] 整合性検査で ERROR が見つかったため INI 生成を中止します "
+                         f"(詳細: {consistency_check.REPORT_FILE})")
+        return False
     
     def run_full_process(self) -> bool:
         """全自動フローを実行。"""
+        with self.events.run("全自動処理", total_stages=4) as run, self._profiled("全自動処理"):
+            try:
+                run.ok = self._run_full_process_stages()
+            except RunCancelled:
+                logging.warning("[Main] 全自動処理はキャンセルされました。")
+        return run.ok
+
+    def _run_full_process_stages(self) -> bool:
         logging.info("全自動処理開始")
 
         logging.info("ステップ1: xEdit 抽出")
-        if not self.run_xedit_script('all_extractors', '[AutoPatcher] All extractions complete.', [
-            'weapon_omod_map.json', 'weapon_ammo_map.json', 'unique_ammo_for_mapping.ini',
-            'WeaponLeveledLists_Export.csv', 'munitions_ammo_ids.ini'
-        ]):
+        self.cancel_token.raise_if_cancelled()
+        with self.events.stage("xEdit 抽出", 1, 4) as stage, span("stage.xedit"):
+            stage.ok = self.run_xedit_script('all_extractors', '[AutoPatcher] All extractions complete.', [
+                'weapon_omod_map.json', 'weapon_ammo_map.json', 'unique_ammo_for_mapping.ini',
+                'WeaponLeveledLists_Export.csv', 'munitions_ammo_ids.ini'
+            ])
+        if not stage.ok:
             logging.critical("[Main] xEditによるデータ抽出に失敗しました。")
             return False
 
         logging.info("ステップ2: 戦略ファイル更新")
-        if not self.run_strategy_generation():
+        self.cancel_token.raise_if_cancelled()
+        with self.events.stage("戦略ファイル更新", 2, 4) as stage, span("stage.strategy"):
+            stage.ok = self._generate_strategy(None)
+        if not stage.ok:
             logging.critical("[Main] 戦略ファイル更新失敗")
             return False
 
         logging.info("ステップ3: マッピングツール起動")
+        self.cancel_token.raise_if_cancelled()
+        with self.events.stage("マッピングツール", 3, 4) as stage, span("stage.mapper"):
+            stage.ok = self._run_mapper()
+        if not stage.ok:
+            return False
+
+        logging.info("ステップ4: 最終INI生成")
+        self.cancel_token.raise_if_cancelled()
+        with self.events.stage("最終INI生成", 4, 4) as stage, span("stage.robco"):
+            stage.ok = self._check_consistency() and self._generate_robco_ini()
+        if not stage.ok:
+            logging.critical("[Main] 最終 INI 生成失敗")
+            return False
+
+        logging.info("全工程正常完了")
+        return True
+
+    def _run_mapper(self) -> bool:
         try:
             output_dir = self.config.get_path('Paths', 'output_dir')
             intermediate_dir = output_dir / 'intermediate'
@@ -746,18 +1007,20 @@ class Orchestrator:
                 "--munitions-file", str(intermediate_dir / 'munitions_ammo_ids.ini'),
                 "--output-file", str(self.config.get_path('Paths', 'ammo_map_file'))
             ]
-            proc = subprocess.run(cmd, capture_output=True, text=True, encoding='utf-8', errors='replace')
+            proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, encoding='utf-8', errors='replace')
+            while True:
+                try:
+                    _, stderr = proc.communicate(timeout=0.5)
+                    break
+                except subprocess.TimeoutExpired:
+                    if self.cancel_token.cancelled:
+                        kill_process_tree(proc.pid)
+                        proc.communicate()
+                        raise RunCancelled(self.cancel_token.reason)
             if proc.returncode != 0:
-                logging.error(f"[Main] mapper.py 実行エラー\n{proc.stderr}")
+                logging.error(f"[Main] mapper.py 実行エラー\n{stderr}")
                 return False
+            return True
         except Exception as e:
             logging.critical(f"[Main] マッピングツール起動例外: {e}", exc_info=True)
             return False
-
-        logging.info("ステップ4: 最終INI生成")
-        if not self._generate_robco_ini():
-            logging.critical("[Main] 最終 INI 生成失敗")
-            return False
-
-        logging.info("全工程正常完了")
-        return True
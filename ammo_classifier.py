@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+# ammo_classifier.py — 弾薬 EditorID のキーワード分類器
+#
+# ammo_categories.json の classification_rules を 1 本のトライ型正規表現にコンパイルし、
+# EditorID をルールの優先順位どおりに分類する。コンパイル結果はルールファイルの
+# ハッシュをキーにディスクへキャッシュする。
+
+from __future__ import annotations
+import hashlib
+import json
+import logging
+import re
+from bisect import bisect_right
+from pathlib import Path
+
+from utils import read_text_auto, atomic_write_text
+
+_CACHE_VERSION = 2
+
+def _trie_regex(keywords: list[str]) -> str:
+    """キーワード群を接頭辞を共有するトライ型の正規表現に変換する (常に最長一致を優先)。"""
+    trie: dict = {}
+    for kw in keywords:
+        node = trie
+        for ch in kw:
+            node = node.setdefault(ch, {})
+        node[""] = {}
+
+    def render(node: dict) -> str:
+        branches = [re.escape(ch) + render(child) for ch, child in sorted(node.items()) if ch]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        if "" in node:
+            return f"(?:{body})?"
+        return body
+
+    return render(trie)
+
+def _compile_rules(rules: list[dict]) -> tuple[str, dict[str, int]]:
+    """
+    ルールを (正規表現パターン, キーワード -> 優先ルール番号) にコンパイルする。
+
+    ある位置で一致するキーワード同士は必ず一方が他方の接頭辞になるため、
+    トライの最長一致キーワードさえ分かれば、その接頭辞になっているキーワードも含めた
+    最優先ルールを事前計算した表から引ける。
+    """
+    keyword_rule: dict[str, int] = {}
+    for idx, rule in enumerate(rules):
+        for kw in rule.get("keywords", []):
+            if kw:
+                keyword_rule.setdefault(kw.lower(), idx)
+    best_rule = {
+        kw: min(rule_idx for other, rule_idx in keyword_rule.items() if kw.startswith(other))
+        for kw in keyword_rule
+    }
+    pattern = f"(?=({_trie_regex(list(keyword_rule))}))" if keyword_rule else "(?!)"
+    return pattern, best_rule
+
+class AmmoClassifier:
+    """classification_rules をコンパイルした分類器。先に書かれたルールほど優先される。"""
+
+    def __init__(self, pattern: str, best_rule: dict[str, int], results: list[dict]):
+        self._regex = re.compile(pattern)
+        self._best_rule = best_rule
+        self._results = results
+
+    @classmethod
+    def from_rules(cls, rules: list[dict]) -> "AmmoClassifier":
+        results = [{"Category": rule["Category"], "Power": rule["Power"]} for rule in rules]
+        pattern, best_rule = _compile_rules(rules)
+        return cls(pattern, best_rule, results)
+
+    @classmethod
+    def from_rules_file(cls, rules_file: Path, cache_dir: Path | None = None) -> "AmmoClassifier":
+        """
+        ammo_categories.json から分類器を作る。cache_dir を指定すると、
+        ルールファイルのハッシュをキーにコンパイル結果を保存・再利用する。
+        """
+        raw = rules_file.read_bytes()
+        digest = hashlib.sha256(raw).hexdigest()[:16]
+        cache_path = cache_dir / f"ammo_classifier_{digest}.json" if cache_dir else None
+
+        if cache_path and cache_path.is_file():
+            try:
+                cached = json.loads(cache_path.read_text(encoding="utf-8"))
+                if cached.get("version") == _CACHE_VERSION:
+                    return cls(cached["pattern"], cached["best_rule"], cached["results"])
+            except Exception as e:
+                logging.debug(f"[Classifier] キャッシュの読み込みに失敗したため再コンパイルします: {e}")
+
+        rules = json.loads(read_text_auto(rules_file)).get("classification_rules", [])
+        classifier = cls.from_rules(rules)
+        if cache_path:
+            try:
+                payload = {
+                    "version": _CACHE_VERSION,
+                    "pattern": classifier._regex.pattern,
+                    "best_rule": classifier._best_rule,
+                    "results": classifier._results,
+                }
+                atomic_write_text(cache_path, json.dumps(payload, ensure_ascii=False))
+            except Exception as e:
+                logging.debug(f"[Classifier] キャッシュの保存に失敗: {e}")
+        return classifier
+
+    def classify(self, editor_id: str) -> dict | None:
+        """1 件の EditorID を分類する。一致するルールがなければ None。"""
+        best = None
+        for m in self._regex.finditer(editor_id.lower()):
+            rule_idx = self._best_rule[m.group(1)]
+            if best is None or rule_idx < best:
+                best = rule_idx
+                if best == 0:
+                    break
+        return dict(self._results[best]) if best is not None else None
+
+    def classify_many(self, editor_ids: list[str]) -> list[dict | None]:
+        """
+        複数の EditorID を 1 回の走査でまとめて分類する。
+        戻り値は editor_ids と同じ順序の分類結果 (一致なしは None)。
+        """
+        # 改行はキーワードに含まれないため、改行区切りで連結しても ID をまたいだ一致は起きない
+        lowered = [eid.lower() for eid in editor_ids]
+        starts = []
+        offset = 0
+        for eid in lowered:
+            starts.append(offset)
+            offset += len(eid) + 1
+        text = "\n".join(lowered)
+
+        best: list[int | None] = [None] * len(editor_ids)
+        for m in self._regex.finditer(text):
+            i = bisect_right(starts, m.start()) - 1
+            rule_idx = self._best_rule[m.group(1)]
+            if best[i] is None or rule_idx < best[i]:
+                best[i] = rule_idx
+        return [dict(self._results[b]) if b is not None else None for b in best]
@@ -0,0 +1,232 @@
+# -*- coding: utf-8 -*-
+# artifact_store.py — 実行ごとのデバッグ出力・バックアップを保存する内容アドレス型ストア
+#
+# 同じ内容のファイルは SHA-256 をキーに blobs/ へ 1 回だけ保存し、実行ごとの
+# runs/<run_id>/ にはそのハードリンクを置く (ハードリンクできない環境ではコピー)。
+# 何を保存したかは manifests/<run_id>.json に記録する。
+# 保持期間と合計サイズの上限を超えた実行は、最後に使われた時刻の古い順に削除し、
+# どの実行からも参照されなくなった blob を消す。
+
+from __future__ import annotations
+import hashlib
+import json
+import logging
+import os
+import shutil
+import stat
+import time
+import uuid
+from pathlib import Path
+from typing import Optional
+
+from utils import atomic_output, atomic_write_text
+
+_MANIFEST_VERSION = 1
+_CHUNK = 1 << 20
+
+def remove_file(path: Path):
+    """読み取り専用属性の付いたファイルも削除する (Windows では属性を外さないと消せない)。"""
+    try:
+        path.unlink()
+    except PermissionError:
+        os.chmod(path, stat.S_IWRITE | stat.S_IREAD)
+        path.unlink()
+    except FileNotFoundError:
+        pass
+
+def link_file(src: Path, dest: Path):
+    """dest を src のハードリンクで置き換える (ハードリンクできない環境ではコピー)。"""
+    if dest.exists():
+        remove_file(dest)
+    try:
+        os.link(src, dest)
+    except OSError:
+        shutil.copyfile(src, dest)
+
+def _safe_name(name: str) -> str:
+    """成果物名をパス区切りを含まないファイル名にする。"""
+    return name.replace('\\', '_').replace('/', '_').strip() or 'artifact'
+
+class ArtifactRun:
+    """1 回の実行で保存する成果物の集まり。put_* のたびにマニフェストを書き出す。"""
+
+    def __init__(self, store: "ArtifactStore", run_id: str, label: str, retain: bool = True):
+        self.store = store
+        self.run_id = run_id
+        self.label = label
+        self.dir = store.runs_dir / run_id
+        self.manifest = {
+            'version': _MANIFEST_VERSION,
+            'run_id': run_id,
+            'label': label,
+            'retain': retain,
+            'created': time.time(),
+            'last_used': time.time(),
+            'artifacts': {},
+        }
+
+    def put_bytes(self, name: str, data: bytes, source: str = '') -> Path:
+        digest = hashlib.sha256(data).hexdigest()
+        blob = self.store._blob_path(digest)
+        if not blob.exists():
+            self.store._write_blob(blob, lambda f: f.write(data))
+        return self._link(name, digest, len(data), source)
+
+    def put_text(self, name: str, text: str, encoding: str = 'utf-8', source: str = '') -> Path:
+        return self.put_bytes(name, text.encode(encoding), source)
+
+    def put_file(self, name: str, src: Path) -> Path:
+        """src を保存する。内容が既存の blob と同じならコピーしない。"""
+        h = hashlib.sha256()
+        with open(src, 'rb') as f:
+            for chunk in iter(lambda: f.read(_CHUNK), b''):
+                h.update(chunk)
+        digest = h.hexdigest()
+        blob = self.store._blob_path(digest)
+        if not blob.exists():
+            def copy(out):
+                with open(src, 'rb') as f:
+                    shutil.copyfileobj(f, out, _CHUNK)
+            self.store._write_blob(blob, copy)
+        return self._link(name, digest, blob.stat().st_size, str(src))
+
+    def _link(self, name: str, digest: str, size: int, source: str) -> Path:
+        name = _safe_name(name)
+        self.dir.mkdir(parents=True, exist_ok=True)
+        dest = self.dir / name
+        link_file(self.store._blob_path(digest), dest)
+        self.manifest['artifacts'][name] = {'sha256': digest, 'size': size, 'source': source}
+        self.manifest['last_used'] = time.time()
+        self.store._write_manifest(self.manifest)
+        return dest
+
+class ArtifactStore:
+    """
+    root 以下の内容アドレス型ストア。
+    max_bytes / max_age_seconds を超えた実行を enforce_retention() で削除する。
+    最新の keep_runs 件の実行は上限を超えていても残す。
+    retain=False で始めた実行 (プロファイルなど) はこの件数に数えず、常に削除の対象にする。
+    """
+
+    def __init__(self, root: Path, max_bytes: Optional[int] = None,
+                 max_age_seconds: Optional[float] = None, keep_runs: int = 1):
+        self.root = Path(root)
+        self.blobs_dir = self.root / 'blobs'
+        self.runs_dir = self.root / 'runs'
+        self.manifests_dir = self.root / 'manifests'
+        self.max_bytes = max_bytes
+        self.max_age_seconds = max_age_seconds
+        self.keep_runs = keep_runs
+
+    # ---- 保存 ----
+
+    def begin_run(self, label: str, retain: bool = True) -> ArtifactRun:
+        run_id = f"{time.strftime('%Y%m%d_%H%M%S')}_{_safe_name(label)}_{uuid.uuid4().hex[:6]}"
+        run = ArtifactRun(self, run_id, label, retain)
+        self._write_manifest(run.manifest)
+        return run
+
+    def _blob_path(self, digest: str) -> Path:
+        return self.blobs_dir / digest[:2] / digest
+
+    def _write_blob(self, blob: Path, writer):
+        blob.parent.mkdir(parents=True, exist_ok=True)
+        with atomic_output(blob, 'wb') as f:
+            writer(f)
+        # ハードリンク経由で書き換えられて他の実行の内容まで変わらないよう読み取り専用にする
+        os.chmod(blob, stat.S_IREAD)
+
+    def _write_manifest(self, manifest: dict):
+        self.manifests_dir.mkdir(parents=True, exist_ok=True)
+        atomic_write_text(self.manifests_dir / f"{manifest['run_id']}.json",
+                          json.dumps(manifest, ensure_ascii=False, indent=2))
+
+    # ---- 参照 ----
+
+    def runs(self) -> list[dict]:
+        """保存されている実行のマニフェストを古い順に返す。"""
+        manifests = []
+        if not self.manifests_dir.is_dir():
+            return manifests
+        for p in self.manifests_dir.glob('*.json'):
+            try:
+                manifests.append(json.loads(p.read_text(encoding='utf-8')))
+            except Exception as e:
+                logging.debug(f"[Artifacts] マニフェストを読めません: {p}: {e}")
+        manifests.sort(key=lambda m: m.get('created', 0))
+        return manifests
+
+    def find(self, name: str) -> Optional[Path]:
+        """name を保存した最新の実行のファイルを返し、その実行の最終使用時刻を更新する。"""
+        for manifest in reversed(self.runs()):
+            if name in manifest.get('artifacts', {}):
+                manifest['last_used'] = time.time()
+                self._write_manifest(manifest)
+                path = self.runs_dir / manifest['run_id'] / name
+                return path if path.exists() else self._blob_path(manifest['artifacts'][name]['sha256'])
+        return None
+
+    # ---- 保持ポリシー ----
+
+    def enforce_retention(self) -> dict[str, int]:
+        """
+        保持期間・合計サイズの上限を超えた実行を最終使用時刻の古い順 (LRU) に削除し、
+        参照されなくなった blob を消す。戻り値は {'runs': 削除した実行数, 'blobs': 削除した blob 数, 'bytes': 解放したバイト数}。
+        """
+        manifests = self.runs()
+        retained = [m for m in manifests if m.get('retain', True)]
+        protected = {m['run_id'] for m in retained[-self.keep_runs:]} if self.keep_runs > 0 else set()
+        candidates = sorted((m for m in manifests if m['run_id'] not in protected),
+                            key=lambda m: m.get('last_used', m.get('created', 0)))
+
+        blob_sizes: dict[str, int] = {}
+        for m in manifests:
+            for info in m.get('artifacts', {}).values():
+                blob_sizes[info['sha256']] = info['size']
+        refcount: dict[str, int] = {}
+        for m in manifests:
+            for digest in {info['sha256'] for info in m.get('artifacts', {}).values()}:
+                refcount[digest] = refcount.get(digest, 0) + 1
+        total = sum(blob_sizes.values())
+
+        now = time.time()
+        evicted = []
+        for m in candidates:
+            too_old = self.max_age_seconds is not None and now - m.get('last_used', 0) > self.max_age_seconds
+            too_big = self.max_bytes is not None and total > self.max_bytes
+            if not (too_old or too_big):
+                continue
+            evicted.append(m)
+            for digest in {info['sha256'] for info in m.get('artifacts', {}).values()}:
+                refcount[digest] -= 1
+                if refcount[digest] == 0:
+                    total -= blob_sizes[digest]
+
+        stats = {'runs': 0, 'blobs': 0, 'bytes': 0}
+        for m in evicted:
+            run_dir = self.runs_dir / m['run_id']
+            if run_dir.is_dir():
+                for p in run_dir.iterdir():
+                    remove_file(p)
+                run_dir.rmdir()
+            remove_file(self.manifests_dir / f"{m['run_id']}.json")
+            stats['runs'] += 1
+        for digest, count in refcount.items():
+            if count == 0:
+                blob = self._blob_path(digest)
+                if blob.exists():
+                    remove_file(blob)
+                    stats['blobs'] += 1
+                    stats['bytes'] += blob_sizes[digest]
+        # どのマニフェストにも載っていない blob (書き込み途中で中断した実行など) も消す
+        if self.blobs_dir.is_dir():
+            for blob in self.blobs_dir.glob('*/*'):
+                if blob.name not in refcount and not blob.name.endswith('.tmp'):
+                    size = blob.stat().st_size
+                    remove_file(blob)
+                    stats['blobs'] += 1
+                    stats['bytes'] += size
+        if stats['runs']:
+            logging.info(f"[Artifacts] 保持ポリシーにより {stats['runs']} 件の実行を削除 "
+                         f"(blob {stats['blobs']} 件, {stats['bytes'] / 1024 / 1024:.1f} MB 解放)")
+        return stats
@@ -0,0 +1,7 @@
+"""
+Munitions AutoPatcher の処理のベンチマーク。
+
+プロジェクトのルートから実行する。例:
+    python -m benchmarks.bench_robco --sizes 1000 10000 100000
+    python -m benchmarks.bench_orchestrator --repeat 3
+"""
@@ -0,0 +1,250 @@
+"""
+偽の xEdit / MO2 を相手にした XEditRunner のエンドツーエンドのベンチマーク。
+
+実行ごとにサンドボックス (ゲームの Data フォルダ、Edit Scripts を含む xEdit フォルダ、
+MO2 フォルダ、overwrite フォルダ、config.ini) を作り、benchmarks/fakes の偽物を実際の
+実行ファイル名で配置して、プロファイラを有効にした状態で all_extractors スクリプトの
+XEditRunner を実行する。XEditRunner の区間から各フェーズの時間を求める。
+
+    prepare  - 一時スクリプト・デバッグファイル・pas ユニットの準備
+    launch   - xEdit または MO2 の起動
+    detect   - MO2 の子孫から xEdit を見つけるまで (MO2 経由のみ)
+    wait     - xEdit の終了待ち
+    verify   - 成功メッセージ・フォールバックの検査
+    collect  - 成果物の Output/intermediate へのコピー
+
+Linux では自分の子でないプロセス (MO2 経由の xEdit) の終了コードを読めないため、MO2 経由の
+実行はログと成果物だけで判定される。そのため crash シナリオは xEdit を直接起動し、終了コード 1 で判定させる。
+
+偽物は起動・終了の時刻を記録するので、検出の遅延 (xEdit が見えてから見つけるまで) と
+終了の遅延 (xEdit が終了してから気づくまで) も表示する。値は --repeat 回の中央値。
+
+シナリオ:
+    direct       xEdit を直接起動する
+    mo2          MO2 経由。xEdit はランチャーの孫プロセスになる
+    mo2_forward  MO2 が起動中のインスタンスにショートカットを渡してすぐ終了する
+    crash        (直接起動した) xEdit が途中でクラッシュする。実行は失敗しなければならない
+    hang         xEdit が固まる。--hang-timeout 秒後に実行が失敗しなければならない
+    no_success   xEdit が成功メッセージを出さない (フォールバック検査、約 30 秒)
+
+使い方:
+    python -m benchmarks.bench_orchestrator
+    python -m benchmarks.bench_orchestrator --scenarios mo2 mo2_forward --repeat 5 --log-rate 2000
+"""
+
+from __future__ import annotations
+import argparse
+import json
+import logging
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from dataclasses import dataclass
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+import psutil
+import profiling
+from config_manager import ConfigManager
+from Orchestrator import XEditRunner, kill_process_tree
+from benchmarks.fakes import install, write_mo2_config
+from benchmarks.fakes.fake_xedit import OUTPUTS, SUCCESS_MESSAGE
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+PHASES = ("prepare", "launch", "detect", "wait", "verify", "collect")
+XEDIT_NAME = "xEdit.exe"
+MO2_NAME = "ModOrganizer.exe"
+MO2_ENTRY = "xEdit"
+
+@dataclass(frozen=True)
+class Scenario:
+    use_mo2: bool
+    xedit_mode: str = "ok"
+    mo2_mode: str = "wait"
+    expect_ok: bool = True
+
+SCENARIOS = {
+    "direct": Scenario(use_mo2=False),
+    "mo2": Scenario(use_mo2=True),
+    "mo2_forward": Scenario(use_mo2=True, mo2_mode="forward"),
+    "crash": Scenario(use_mo2=False, xedit_mode="crash", expect_ok=False),
+    "hang": Scenario(use_mo2=True, xedit_mode="hang", expect_ok=False),
+    "no_success": Scenario(use_mo2=True, xedit_mode="no_success"),
+}
+DEFAULT_SCENARIOS = ("direct", "mo2", "mo2_forward", "crash", "hang")
+
+def build_sandbox(root: Path, scenario: Scenario, timeout: int) -> ConfigManager:
+    """fake を配置したゲーム・xEdit・MO2 の環境と config.ini を作る。"""
+    data = root / "Data"
+    data.mkdir(parents=True)
+    (data / "Fallout4.esm").write_bytes(b"TES4")
+    xedit = install("xedit", root / "xEdit" / XEDIT_NAME)
+    (xedit.parent / "Edit Scripts").mkdir()
+    overwrite = root / "overwrite"
+    (overwrite / "Edit Scripts" / "Output").mkdir(parents=True)
+    mo2 = install("mo2", root / "MO2" / MO2_NAME)
+    write_mo2_config(mo2, {MO2_ENTRY: xedit}, overwrite)
+
+    config_path = root / "config.ini"
+    config_path.write_text(f"""
+[Environment]
+use_mo2 = {scenario.use_mo2}
+mo2_executable_path = {mo2}
+xedit_profile_name = Bench
+mo2_xedit_entry_name = {MO2_ENTRY}
+keep_temp_scripts = False
+
+[Paths]
+project_root = {root}
+overwrite_path = {overwrite}
+game_data_path = {data}
+xedit_executable = {xedit}
+pas_scripts_dir = {PROJECT_ROOT / 'pas_scripts'}
+output_dir = {root / 'Output'}
+robco_patcher_dir = {root / 'RobCo_Auto_Patcher'}
+strategy_file = {PROJECT_ROOT / 'setting' / 'strategy.json'}
+ammo_categories_file = {PROJECT_ROOT / 'setting' / 'ammo_categories.json'}
+ammo_map_file = {root / 'ammo_map.json'}
+
+[Scripts]
+all_extractors = 00_RunAllExtractors.pas
+
+[Parameters]
+xedit_timeout_seconds = {timeout}
+log_verification_timeout_seconds = 1
+log_poll_interval_seconds = 0.1
+""", encoding="utf-8")
+    return ConfigManager(str(config_path))
+
+def _kill_leftovers(stamp: dict):
+    """タイムアウトや引き継ぎで残ったプロセス (fake MO2 / xEdit) を終了させる。"""
+    for child in psutil.Process().children(recursive=True):
+        kill_process_tree(child.pid)
+    if stamp.get("pid") and psutil.pid_exists(stamp["pid"]):
+        kill_process_tree(stamp["pid"])
+
+def run_once(workdir: Path, name: str, scenario: Scenario, args) -> dict:
+    """シナリオを 1 回実行し、成否・各フェーズの時間・遅延を返す。"""
+    root = Path(tempfile.mkdtemp(prefix=f"{name}_", dir=workdir))
+    config = build_sandbox(root, scenario, args.hang_timeout if scenario.xedit_mode == "hang" else args.timeout)
+    stamp_path = root / "xedit_stamp.json"
+    env = {
+        "FAKE_XEDIT_MODE": scenario.xedit_mode,
+        "FAKE_XEDIT_STARTUP": str(args.startup),
+        "FAKE_XEDIT_LOG_LINES": str(args.log_lines),
+        "FAKE_XEDIT_LOG_RATE": str(args.log_rate),
+        "FAKE_XEDIT_WEAPONS": str(args.weapons),
+        "FAKE_XEDIT_STAMP": str(stamp_path),
+        "FAKE_MO2_MODE": scenario.mo2_mode,
+        "FAKE_MO2_STARTUP": str(args.mo2_startup),
+    }
+    saved = {k: os.environ.get(k) for k in env}
+    os.environ.update(env)
+    profiler = profiling.Profiler(name)
+    try:
+        runner = XEditRunner(config, "all_extractors", SUCCESS_MESSAGE, list(OUTPUTS))
+        with profiler.activate():
+            ok = runner.run()
+    finally:
+        for k, v in saved.items():
+            if v is None:
+                os.environ.pop(k, None)
+            else:
+                os.environ[k] = v
+        stamp = json.loads(stamp_path.read_text(encoding="utf-8")) if stamp_path.is_file() else {}
+        _kill_leftovers(stamp)
+
+    spans = {r.name.split(".", 1)[1]: r for r in profiler.spans() if r.name.startswith("xedit.")}
+    ends = {phase: profiler.started_at + (r.start_ms + r.wall_ms) / 1000 for phase, r in spans.items()}
+    result = {
+        "ok": ok,
+        "total": profiler.spans()[0].wall_ms / 1000,
+        "phases": {phase: spans[phase].wall_ms / 1000 for phase in PHASES if phase in spans},
+        "collected": sum((root / "Output" / "intermediate" / fn).is_file() for fn in OUTPUTS),
+    }
+    if "detect" in ends and "start" in stamp:
+        result["detect_latency"] = ends["detect"] - stamp["start"]
+    if "wait" in ends and "exit" in stamp:
+        result["exit_latency"] = ends["wait"] - stamp["exit"]
+    if not args.keep:
+        shutil.rmtree(root, ignore_errors=True)
+    return result
+
+def bench_scenario(workdir: Path, name: str, args) -> dict:
+    runs = [run_once(workdir, name, SCENARIOS[name], args) for _ in range(args.repeat)]
+
+    def median(key, sub=None):
+        values = [(r[sub] if sub else r).get(key) for r in runs]
+        values = [v for v in values if v is not None]
+        return statistics.median(values) if values else None
+
+    return {
+        "scenario": name,
+        "expect_ok": SCENARIOS[name].expect_ok,
+        "ok": [r["ok"] for r in runs],
+        "total": median("total"),
+        "phases": {phase: median(phase, "phases") for phase in PHASES},
+        "detect_latency": median("detect_latency"),
+        "exit_latency": median("exit_latency"),
+        "collected": min(r["collected"] for r in runs),
+    }
+
+def _fmt(value) -> str:
+    return f"{value:>8.3f}s" if value is not None else f"{'-':>9}"
+
+def _print_table(results: list[dict]):
+    print(f"{'scenario':<12} {'result':>7} {'total':>9} " + " ".join(f"{p:>9}" for p in PHASES)
+          + f" {'detect lat':>10} {'exit lat':>9} {'files':>5}")
+    for r in results:
+        passed = all(ok == r["expect_ok"] for ok in r["ok"])
+        row = f"{r['scenario']:<12} {'pass' if passed else 'FAIL':>7} {_fmt(r['total'])} "
+        row += " ".join(_fmt(r["phases"][p]) for p in PHASES)
+        row += f" {_fmt(r['detect_latency']):>10} {_fmt(r['exit_latency'])} {r['collected']:>5}"
+        print(row)
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="偽の xEdit / MO2 を使った XEditRunner のエンドツーエンドのベンチマーク")
+    parser.add_argument("--scenarios", nargs="+", choices=list(SCENARIOS), default=list(DEFAULT_SCENARIOS))
+    parser.add_argument("--repeat", type=int, default=3, help="シナリオごとの実行回数 (中央値を表示)")
+    parser.add_argument("--weapons", type=int, default=1000, help="偽の weapon_omod_map.json の武器数")
+    parser.add_argument("--log-lines", type=int, default=2000, help="偽の xEdit が書くセッションログの行数")
+    parser.add_argument("--log-rate", type=float, default=0, help="1 秒あたりのセッションログの行数 (0 は無制限)")
+    parser.add_argument("--startup", type=float, default=2.0,
+                        help="偽の xEdit のプラグイン読み込み時間 (秒)。XEditRunner は 1 秒後から xEdit を探す")
+    parser.add_argument("--mo2-startup", type=float, default=0.3, help="偽の MO2 の起動にかかる時間 (秒)")
+    parser.add_argument("--timeout", type=int, default=120, help="通常のシナリオの xedit_timeout_seconds")
+    parser.add_argument("--hang-timeout", type=int, default=3, help="hang シナリオの xedit_timeout_seconds")
+    parser.add_argument("--json", type=Path, help="結果をこの JSON ファイルにも書き出す")
+    parser.add_argument("--keep", action="store_true", help="サンドボックスを削除せずに残す")
+    parser.add_argument("--verbose", action="store_true", help="XEditRunner のログを表示する")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.CRITICAL + 1,
+                        format="%(levelname)s %(message)s")
+    workdir = Path(tempfile.mkdtemp(prefix="orchestrator_bench_"))
+    try:
+        results = [bench_scenario(workdir, name, args) for name in args.scenarios]
+    finally:
+        if args.keep:
+            print(f"サンドボックスを残しました: {workdir}")
+        else:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    _print_table(results)
+    if args.json:
+        report = {
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "settings": {k: v for k, v in vars(args).items() if k not in ("json", "keep", "verbose")},
+            "results": results,
+        }
+        args.json.write_text(json.dumps(report, indent=2), encoding="utf-8")
+    return 0 if all(all(ok == r["expect_ok"] for ok in r["ok"]) for r in results) else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,221 @@
+"""
+合成ロードオーダーの規模での robco_ini_generate のベンチマーク。
+
+サイズごとに合成データ (benchmarks/synthetic.py) を生成し、生成処理の各フェーズを個別に計測する。
+    load      - _load_data_sources (extraction.mrec がない状態。JSON/CSV を読み、コンテナを作る)
+    load_warm - _load_data_sources (直前の load が作った extraction.mrec を読む)
+    process   - _process_weapon_records
+    plan      - INI ドキュメントの組み立てと前回出力との差分 (_plan_ini_outputs)
+    zip       - IniOutputSink による ZIP (とディスク) への書き出し (_write_ini_outputs)
+
+時間は --repeat 回の実行の最良値で、各回とも RobCo の出力ディレクトリと extraction.mrec を消してから実行する。
+フェーズごとのメモリのピークは、計測が時間に影響しないよう、別の 1 回で tracemalloc を使って測る。
+
+使い方:
+    python -m benchmarks.bench_robco --sizes 1000 10000 100000 --omods 3
+    python -m benchmarks.bench_robco --save-baseline
+    python -m benchmarks.bench_robco --baseline benchmarks/baseline_robco.json --threshold 0.2
+"""
+
+from __future__ import annotations
+import argparse
+import json
+import logging
+import platform
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from types import SimpleNamespace
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+import robco_ini_generate as rig
+from config_manager import ParameterSettings
+from benchmarks.synthetic import generate
+from record_store import EXTRACTION_FILE
+
+PHASES = ("load", "load_warm", "process", "plan", "zip")
+DEFAULT_BASELINE = Path(__file__).resolve().parent / "baseline_robco.json"
+
+class BenchConfig:
+    """ConfigManager と同じインターフェースを持つ、合成データ用の設定。"""
+
+    def __init__(self, dataset, robco_patcher_dir: Path, parameters: dict[str, str] | None = None):
+        self._paths = {
+            "output_dir": dataset.output_dir,
+            "strategy_file": dataset.strategy,
+            "ammo_map_file": dataset.ammo_map,
+            "leveled_lists_csv": dataset.leveled_lists_csv,
+            "robco_patcher_dir": robco_patcher_dir,
+        }
+        self._parameters = parameters or {}
+        self.snapshot = SimpleNamespace(parameters=ParameterSettings(
+            robco_output_mode=self._parameters.get("robco_output_mode", ParameterSettings.robco_output_mode)))
+
+    def get_path(self, section, key):
+        if key not in self._paths:
+            raise KeyError(key)
+        return self._paths[key]
+
+    def get_string(self, section, key, fallback=""):
+        return self._parameters.get(key, fallback)
+
+    def get_boolean(self, section, key, fallback=False):
+        value = self._parameters.get(key)
+        return fallback if value is None else value.lower() in ("1", "true", "yes")
+
+def _run_phases(config, trace_memory: bool = False) -> dict[str, dict]:
+    """generator の各フェーズを 1 回ずつ実行し、フェーズごとの計測値を返す。"""
+    robco_patcher_dir = config.get_path("Paths", "robco_patcher_dir")
+    if robco_patcher_dir.exists():
+        shutil.rmtree(robco_patcher_dir)
+    robco_base_dir = robco_patcher_dir / "F4SE" / "Plugins" / "RobCo_Patcher"
+    zip_path = robco_patcher_dir.parent / f"{robco_patcher_dir.name}.zip"
+    zip_path.unlink(missing_ok=True)
+    # 前の回が作ったコンテナが残っていると load が毎回ウォームになるので消す
+    (config.get_path("Paths", "output_dir") / EXTRACTION_FILE).unlink(missing_ok=True)
+    arc_prefix = f"{robco_patcher_dir.name}/F4SE/Plugins/RobCo_Patcher"
+    output_mode = rig._get_output_mode(config)
+
+    results: dict[str, dict] = {}
+    state: dict = {}
+
+    def phase(name, func):
+        if trace_memory:
+            tracemalloc.reset_peak()
+            base, _ = tracemalloc.get_traced_memory()
+        start = time.perf_counter()
+        value = func()
+        elapsed = time.perf_counter() - start
+        entry = {"seconds": elapsed}
+        if trace_memory:
+            _, peak = tracemalloc.get_traced_memory()
+            entry["peak_bytes"] = max(0, peak - base)
+        results[name] = entry
+        return value
+
+    phase("load", lambda: rig._load_data_sources(config))
+    data = phase("load_warm", lambda: rig._load_data_sources(config))
+    processed = phase("process", lambda: rig._process_weapon_records(data))
+    state["plan"] = phase("plan", lambda: rig._plan_ini_outputs(
+        processed, robco_base_dir, zip_path, arc_prefix, output_mode=output_mode))
+    documents, changes, stale = state["plan"]
+    phase("zip", lambda: rig._write_ini_outputs(documents, changes, stale, robco_base_dir, zip_path, arc_prefix))
+    results["zip"]["zip_bytes"] = zip_path.stat().st_size
+    return results
+
+def bench_size(workdir: Path, weapons: int, omods: int, repeat: int, parameters: dict[str, str]) -> dict:
+    """1 つのデータサイズについてベンチマークを実行する。"""
+    dataset = generate(workdir / f"w{weapons}", weapons, omods)
+    config = BenchConfig(dataset, dataset.root / "RobCo_Auto_Patcher", parameters)
+
+    best: dict[str, float] = {}
+    for _ in range(repeat):
+        run = _run_phases(config)
+        for name in PHASES:
+            best[name] = min(best.get(name, float("inf")), run[name]["seconds"])
+
+    tracemalloc.start()
+    try:
+        traced = _run_phases(config, trace_memory=True)
+        _, total_peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "weapons": weapons,
+        "omods": dataset.omods,
+        "phases": {name: {"seconds": best[name], "peak_bytes": traced[name]["peak_bytes"]} for name in PHASES},
+        # 実際の 1 回の実行で読み込みは 1 度なので、合計にはコールドの load だけを含める
+        "total_seconds": sum(seconds for name, seconds in best.items() if name != "load_warm"),
+        "peak_bytes": total_peak,
+        "zip_bytes": traced["zip"]["zip_bytes"],
+    }
+
+def compare(results: list[dict], baseline: dict, threshold: float) -> list[str]:
+    """ベースラインと比較し、閾値を超えて遅くなった/メモリが増えた項目を返す。"""
+    regressions = []
+    base_by_size = {(r["weapons"], r["omods"]): r for r in baseline.get("results", [])}
+    for result in results:
+        base = base_by_size.get((result["weapons"], result["omods"]))
+        if not base:
+            continue
+        for name in PHASES:
+            if name not in base["phases"]:
+                continue
+            old, new = base["phases"][name]["seconds"], result["phases"][name]["seconds"]
+            # 1ms 未満の揺らぎは無視する
+            if new > old * (1 + threshold) and new - old > 0.001:
+                regressions.append(f"武器 {result['weapons']} 件: {name} {old:.4f}s -> {new:.4f}s (+{(new / old - 1) * 100:.0f}%)")
+        old_peak, new_peak = base["peak_bytes"], result["peak_bytes"]
+        if new_peak > old_peak * (1 + threshold):
+            regressions.append(f"武器 {result['weapons']} 件: メモリのピーク {old_peak / 2**20:.1f} MiB -> {new_peak / 2**20:.1f} MiB")
+    return regressions
+
+def _print_table(results: list[dict], baseline: dict | None):
+    base_by_size = {(r["weapons"], r["omods"]): r for r in (baseline or {}).get("results", [])}
+    print(f"{'weapons':>8} {'omods':>8} " + " ".join(f"{p:>10}" for p in PHASES) + f" {'total':>10} {'peak MiB':>9} {'vs base':>8}")
+    for r in results:
+        row = f"{r['weapons']:>8} {r['omods']:>8} " + " ".join(f"{r['phases'][p]['seconds']:>9.4f}s" for p in PHASES)
+        row += f" {r['total_seconds']:>9.4f}s {r['peak_bytes'] / 2**20:>9.1f}"
+        base = base_by_size.get((r["weapons"], r["omods"]))
+        row += f" {r['total_seconds'] / base['total_seconds']:>7.2f}x" if base else f" {'-':>8}"
+        print(row)
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="robco_ini_generate のベンチマーク")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000], help="計測する武器数")
+    parser.add_argument("--omods", type=int, default=3, help="武器あたりの OMOD 数の平均")
+    parser.add_argument("--repeat", type=int, default=3, help="サイズごとの実行回数 (最良値を表示)")
+    parser.add_argument("--output-mode", choices=[rig.OUTPUT_MODE_MONOLITHIC, rig.OUTPUT_MODE_SHARDED], default=rig.OUTPUT_MODE_MONOLITHIC)
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE, help="比較するベースラインの JSON")
+    parser.add_argument("--save-baseline", action="store_true", help="今回の結果を新しいベースラインとして保存する")
+    parser.add_argument("--threshold", type=float, default=0.2, help="失敗とみなすまでに許す悪化の割合")
+    parser.add_argument("--json", type=Path, help="結果をこの JSON ファイルにも書き出す")
+    parser.add_argument("--keep", action="store_true", help="生成したデータを削除せずに残す")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING)
+    parameters = {"robco_output_mode": args.output_mode}
+
+    workdir = Path(tempfile.mkdtemp(prefix="robco_bench_"))
+    try:
+        results = [bench_size(workdir, n, args.omods, args.repeat, parameters) for n in args.sizes]
+    finally:
+        if args.keep:
+            print(f"生成したデータを残しました: {workdir}")
+        else:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "output_mode": args.output_mode,
+        "results": results,
+    }
+    baseline = None
+    if args.baseline.is_file() and not args.save_baseline:
+        baseline = json.loads(args.baseline.read_text(encoding="utf-8"))
+
+    _print_table(results, baseline)
+    if args.json:
+        args.json.write_text(json.dumps(report, indent=2), encoding="utf-8")
+    if args.save_baseline:
+        args.baseline.write_text(json.dumps(report, indent=2), encoding="utf-8")
+        print(f"ベースラインを保存しました: {args.baseline}")
+        return 0
+    if baseline:
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print("性能の悪化:")
+            for line in regressions:
+                print(f"  {line}")
+            return 1
+        print(f"{args.baseline.name} と比べた悪化はありません (閾値 {args.threshold:.0%})")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,68 @@
+"""
+xEdit と Mod Organizer 2 の代わりになる偽の実行ファイル。
+
+XEditRunner は xEdit を (直接または MO2 のショートカット経由で) 起動し、実行ファイル名で
+プロセスを見つけて終了を待ち、成果物を検査・収集する。このパッケージの偽物はその
+やりとりを OS を問わず再現するので、ゲームを入れなくても一連の処理を計測・回帰テストできる。
+
+    fake_xedit.py  XEditRunner._build_command の引数を受け取り、セッションログを書きながら
+                   抽出結果のファイルを出力する
+    fake_mo2.py    XEditRunner._build_mo2_command の引数を受け取り、設定された実行ファイルを
+                   MO2 と同じように起動する
+
+install() は指定したファイル名 (xEdit.exe など) で、現在のインタープリタで偽物を実行する
+ランチャーを書き出す。XEditRunner からは本物と同じように実行できる。偽物からは
+ランチャーのパスがグローバル変数 LAUNCHER として見える (launcher_path() を参照)。
+"""
+
+from __future__ import annotations
+import json
+import stat
+import sys
+from pathlib import Path
+
+FAKES_DIR = Path(__file__).resolve().parent
+PROJECT_ROOT = FAKES_DIR.parents[1]
+MO2_CONFIG_NAME = "ModOrganizer.json"
+
+def set_process_name(name: str):
+    """プロセス名 (Linux の comm) を name にする。psutil の name() で実行ファイル名として見えるようにする。"""
+    try:
+        with open("/proc/self/comm", "wb") as f:
+            f.write(name.encode("utf-8")[:15])
+    except OSError:
+        pass  # Linux 以外では変更できない
+
+def launcher_path(namespace: dict) -> Path:
+    """fake を起動したランチャーのパス。ランチャーを介さずに実行された場合は sys.argv[0]。"""
+    return Path(namespace.get("LAUNCHER") or sys.argv[0]).resolve()
+
+def install(kind: str, dest: Path) -> Path:
+    """
+    fake_<kind>.py を起動するランチャーを dest に書き出し、実行可能にする。
+    dest のファイル名がそのままプロセス名になる。
+    """
+    script = FAKES_DIR / f"fake_{kind}.py"
+    if not script.is_file():
+        raise ValueError(f"unknown fake: {kind}")
+    dest = Path(dest)
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    dest.write_text(
+        f"#!{sys.executable}\n"
+        "import runpy, sys\n"
+        f"sys.path.insert(0, {str(PROJECT_ROOT)!r})\n"
+        # run_path は sys.argv[0] を fake のパスに置き換えるので、ランチャーのパスは別に渡す
+        f"runpy.run_path({str(script)!r}, init_globals={{'LAUNCHER': __file__}}, run_name='__main__')\n",
+        encoding="utf-8",
+    )
+    dest.chmod(dest.stat().st_mode | stat.S_IXUSR | stat.S_IXGRP | stat.S_IXOTH)
+    return dest
+
+def write_mo2_config(mo2_executable: Path, executables: dict[str, Path], overwrite: Path | None = None) -> Path:
+    """fake MO2 が読む ModOrganizer.json (ショートカット名 -> 実行ファイル) を書き出す。"""
+    path = Path(mo2_executable).parent / MO2_CONFIG_NAME
+    path.write_text(json.dumps({
+        "executables": {name: str(exe) for name, exe in executables.items()},
+        "overwrite": str(overwrite) if overwrite else "",
+    }, indent=2), encoding="utf-8")
+    return path
@@ -0,0 +1,102 @@
+"""
+偽の Mod Organizer 2 ランチャー。
+
+XEditRunner._build_mo2_command が作るコマンドライン
+
+    ModOrganizer.exe -p <プロファイル> moshortcut://[<インスタンス>/|:]<エントリ> -a <引数...>
+
+を受け取る。<エントリ> は実行ファイルと同じフォルダの ModOrganizer.json
+(benchmarks.fakes.write_mo2_config を参照) で実行ファイルに解決する。MO2 と同じく対象は
+直接ではなく短命な補助プロセス (MO2 の usvfs プロキシ) を介して起動するため、xEdit は
+ランチャーの孫プロセスになる。設定に overwrite フォルダがあれば、仮想ファイルシステムが
+xEdit の書き込み先を振り替えるのと同じように、FAKE_XEDIT_OUTPUT_DIR を
+<overwrite>/Edit Scripts/Output にする。
+
+    FAKE_MO2_MODE     wait | forward | fail                (既定 wait)
+    FAKE_MO2_STARTUP  対象を起動するまでの秒数              (既定 0.3)
+
+wait は対象が終了するまでランチャーと補助プロセスを残す。forward は 2 つ目の MO2 が
+起動中の MO2 にショートカットを渡す動作を真似て、対象を起動したらすぐ補助プロセスと
+ランチャーが終了する (対象はランチャーの子孫ではなくなる)。fail は何も起動せずにエラーで終了する。
+"""
+
+from __future__ import annotations
+import json
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+from benchmarks.fakes import MO2_CONFIG_NAME, launcher_path, set_process_name
+
+MODES = ("wait", "forward", "fail")
+LAUNCHER = launcher_path(globals())
+
+def parse_args(argv: list[str]) -> tuple[str, str, list[str]]:
+    """(プロファイル名, ショートカット名, 転送する引数) を返す。"""
+    profile, shortcut, forwarded = "", "", []
+    i = 0
+    while i < len(argv):
+        arg = argv[i]
+        if arg == "-p" and i + 1 < len(argv):
+            profile = argv[i + 1]
+            i += 2
+            continue
+        if arg == "-a":
+            forwarded = argv[i + 1:]
+            break
+        if arg.startswith("moshortcut://"):
+            shortcut = arg[len("moshortcut://"):]
+        i += 1
+    # moshortcut://<instance>/<entry> と moshortcut://:<entry> はエントリ名だけを使う
+    entry = shortcut.rsplit("/", 1)[-1].lstrip(":")
+    return profile, entry, forwarded
+
+def proxy(target: str, args: list[str], detach: bool) -> int:
+    """usvfs proxy 相当。target を起動し、detach でなければ終了を待つ。"""
+    set_process_name("usvfs_proxy.exe")
+    process = subprocess.Popen([target, *args], start_new_session=detach)
+    return 0 if detach else process.wait()
+
+def main(argv: list[str] | None = None) -> int:
+    argv = sys.argv[1:] if argv is None else argv
+    if argv[:1] == ["--proxy"]:
+        return proxy(argv[2], argv[3:], detach=argv[1] == "forward")
+
+    set_process_name(LAUNCHER.name)
+    mode = os.environ.get("FAKE_MO2_MODE", "wait").strip().lower()
+    profile, entry, forwarded = parse_args(argv)
+    print(f"[FakeMO2] profile={profile} entry={entry} mode={mode}", flush=True)
+    if mode not in MODES:
+        print(f"[FakeMO2] unknown FAKE_MO2_MODE: {mode}", flush=True)
+        return 2
+    if mode == "fail":
+        print("[FakeMO2] failed to start the shortcut", flush=True)
+        return 1
+
+    config_path = LAUNCHER.parent / MO2_CONFIG_NAME
+    try:
+        config = json.loads(config_path.read_text(encoding="utf-8"))
+    except (OSError, ValueError) as e:
+        print(f"[FakeMO2] cannot read {config_path}: {e}", flush=True)
+        return 1
+    target = config.get("executables", {}).get(entry)
+    if not target:
+        print(f"[FakeMO2] executable '{entry}' is not configured", flush=True)
+        return 1
+    if config.get("overwrite"):
+        os.environ.setdefault("FAKE_XEDIT_OUTPUT_DIR", str(Path(config["overwrite"]) / "Edit Scripts" / "Output"))
+
+    try:
+        time.sleep(float(os.environ.get("FAKE_MO2_STARTUP", 0.3)))
+    except ValueError:
+        pass
+    helper = subprocess.Popen([sys.executable, str(Path(__file__).resolve()), "--proxy", mode, target, *forwarded])
+    code = helper.wait()
+    print(f"[FakeMO2] {entry} {'handed off' if mode == 'forward' else f'exited with code {code}'}", flush=True)
+    return code
+
+if __name__ == "__main__":
+    raise SystemExit(main())
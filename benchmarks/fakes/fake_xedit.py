@@ -0,0 +1,170 @@
+"""
+偽の xEdit。
+
+XEditRunner._build_command が作るコマンドライン
+
+    xEdit.exe [-fo4] -script:<パスまたは名前> -S:<Edit Scripts> -IKnowWhatImDoing
+              -AllowMasterFilesEdit -R:<セッションログ> -report
+
+を受け取り、00_RunAllExtractors.pas を実行する xEdit のように振る舞う。プラグインを
+「読み込み」、-R のファイルにセッションログを書き、<Edit Scripts>/Output に抽出結果を出力して
+成功メッセージを出す。コマンドラインは XEditRunner が決めるため、動作は環境変数で指定する。
+
+    FAKE_XEDIT_MODE       ok | hang | crash | no_success      (既定 ok)
+    FAKE_XEDIT_STARTUP    プラグインの読み込みにかかる秒数     (既定 0.5)
+    FAKE_XEDIT_LOG_LINES  スクリプトが書くログの行数           (既定 2000)
+    FAKE_XEDIT_LOG_RATE   1 秒あたりのログ行数、0 は無制限     (既定 0)
+    FAKE_XEDIT_WEAPONS    weapon_omod_map.json の武器数        (既定 1000)
+    FAKE_XEDIT_OUTPUT_DIR 出力先 (偽の MO2 が overwrite フォルダを指定する)
+    FAKE_XEDIT_STAMP      pid と start / script_done / exit の時刻を書き込む JSON ファイル
+
+hang はログを半分書いたところで止まり、終了させられるまで眠り続ける。crash は成果物の
+一部とアクセス違反をログに書いて終了コード 1 で終わる。no_success は正常に終わるが
+成功メッセージを出さない。
+"""
+
+from __future__ import annotations
+import json
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+from benchmarks.fakes import launcher_path, set_process_name
+from benchmarks.synthetic import generate
+
+SUCCESS_MESSAGE = "[AutoPatcher] All extractions complete."
+OUTPUTS = (
+    "weapon_omod_map.json", "weapon_ammo_map.json", "unique_ammo_for_mapping.ini",
+    "WeaponLeveledLists_Export.csv", "munitions_ammo_ids.ini",
+)
+MODES = ("ok", "hang", "crash", "no_success")
+LAUNCHER = launcher_path(globals())
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.environ.get(name, default))
+    except ValueError:
+        return default
+
+def parse_args(argv: list[str]) -> dict[str, str]:
+    """xEdit 形式の引数 (-key:value / -flag) を辞書にする。"""
+    args = {}
+    for arg in argv:
+        if not arg.startswith("-"):
+            continue
+        key, sep, value = arg[1:].partition(":")
+        args[key.lower()] = value if sep else ""
+    return args
+
+class SessionLog:
+    """-R で指定されたセッションログ。1 行ごとに flush し、ログ監視側から途中経過が見えるようにする。"""
+
+    def __init__(self, path: Path | None, rate: float):
+        self.file = open(path, "a", encoding="utf-8") if path else sys.stdout
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._next = time.monotonic()
+
+    def write(self, message: str):
+        if self.interval:
+            self._next += self.interval
+            delay = self._next - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+        self.file.write(f"[{datetime.now():%Y-%m-%d %H:%M:%S}] {message}\n")
+        self.file.flush()
+
+class Stamp:
+    """ベンチマークが検出・終了の遅延を測るための時刻記録。"""
+
+    def __init__(self, path: str):
+        self.path = Path(path) if path else None
+        self.data = {"pid": os.getpid()}
+        self.mark("start")
+
+    def mark(self, key: str):
+        self.data[key] = time.time()
+        if self.path:
+            self.path.write_text(json.dumps(self.data), encoding="utf-8")
+
+def write_outputs(output_dir: Path, weapons: int, names=OUTPUTS):
+    """synthetic のデータセットから xEdit の抽出結果と同じ形のファイルを作る。"""
+    output_dir.mkdir(parents=True, exist_ok=True)
+    with tempfile.TemporaryDirectory() as tmp:
+        dataset = generate(Path(tmp), weapons)
+        records = json.loads(dataset.weapon_omod_map.read_text(encoding="utf-8"))
+        strategy = json.loads(dataset.strategy.read_text(encoding="utf-8"))
+        files = {
+            "weapon_omod_map.json": dataset.weapon_omod_map.read_text(encoding="utf-8"),
+            "WeaponLeveledLists_Export.csv": dataset.leveled_lists_csv.read_text(encoding="utf-8"),
+        }
+    files["weapon_ammo_map.json"] = json.dumps([
+        {"editor_id": r["weap_editor_id"], "full_name": r["weap_editor_id"], "ammo_form_id": r["ammo_formid"].upper()}
+        for r in records
+    ], indent=2)
+    ammo = {r["ammo_formid"].upper(): r["plugin"] for r in records}
+    files["unique_ammo_for_mapping.ini"] = "\n".join(
+        ["[UnmappedAmmo]"] + [f"{fid}={plugin}|SynthAmmo_{fid}" for fid, plugin in sorted(ammo.items())]) + "\n"
+    files["munitions_ammo_ids.ini"] = "\n".join(
+        ["[MunitionsAmmo]"] + [f"{fid}=Mun_Ammo_{fid}" for fid in strategy["ammo_classification"]]) + "\n"
+    for name in names:
+        (output_dir / name).write_text(files[name], encoding="utf-8")
+
+def main(argv: list[str] | None = None) -> int:
+    argv = sys.argv[1:] if argv is None else argv
+    set_process_name(LAUNCHER.name)
+    stamp = Stamp(os.environ.get("FAKE_XEDIT_STAMP", ""))
+    args = parse_args(argv)
+    mode = os.environ.get("FAKE_XEDIT_MODE", "ok").strip().lower()
+    if mode not in MODES:
+        print(f"[FakeXEdit] unknown FAKE_XEDIT_MODE: {mode}", file=sys.stderr)
+        return 2
+
+    scripts_dir = Path(args.get("s") or LAUNCHER.parent / "Edit Scripts")
+    output_dir = Path(os.environ.get("FAKE_XEDIT_OUTPUT_DIR") or scripts_dir / "Output")
+    script = Path(args.get("script", ""))
+    if not script.is_absolute():
+        script = scripts_dir / script
+    log = SessionLog(Path(args["r"]) if args.get("r") else None, _env_float("FAKE_XEDIT_LOG_RATE", 0))
+    lines = int(_env_float("FAKE_XEDIT_LOG_LINES", 2000))
+    weapons = int(_env_float("FAKE_XEDIT_WEAPONS", 1000))
+
+    log.write(f"FO4Edit (fake) starting session, args: {' '.join(argv)}")
+    if not script.is_file():
+        log.write(f"Exception in unit userscript: script not found: {script}")
+        return 1
+    log.write("Background Loader: loading plugins...")
+    time.sleep(_env_float("FAKE_XEDIT_STARTUP", 0.5))
+    log.write("Background Loader: finished")
+    log.write(f"Applying script \"{script.name}\"")
+    log.write("[DEBUG] 00_RunAllExtractors.pas")
+    log.write("[AutoPatcher] All-in-one extraction process started.")
+    log.write(f"[STAGE] Time={datetime.now():%Y/%m/%d %H:%M:%S} FileCount={max(1, weapons // 200)}")
+    log.write("[STAGE] Stage=before_file_loop")
+
+    stop_at = lines // 2 if mode in ("hang", "crash") else lines
+    for i in range(stop_at):
+        log.write(f"[PROBE_WEAPON] idx={i} plugin=SynthMod{i % 7:04d}.esp editor=SynthWeapon{i:06d} form={0x01000000 + i:08X}")
+    if mode == "hang":
+        log.write("[STAGE_LAST] waiting on modal dialog")
+        while True:
+            time.sleep(3600)
+    if mode == "crash":
+        write_outputs(output_dir, weapons, OUTPUTS[:2])
+        log.write("Exception in unit userscript line 481: Access violation at address 00000000 in module 'FO4Edit.exe'")
+        stamp.mark("exit")
+        return 1
+
+    write_outputs(output_dir, weapons)
+    stamp.mark("script_done")
+    if mode != "no_success":
+        log.write(SUCCESS_MESSAGE)
+    log.write("[Apply Script done] Processed Records: 0, Elapsed Time: 00:00")
+    stamp.mark("exit")
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
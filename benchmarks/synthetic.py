@@ -0,0 +1,127 @@
+"""
+robco_ini_generate のベンチマーク用の合成ロードオーダー生成。
+
+実際の xEdit の出力と同じ形のデータ一式 (weapon_omod_map.json, ammo_map.json,
+strategy.json, WeaponLeveledLists_Export.csv) を、任意の武器数と
+武器あたりの OMOD 数で書き出す。
+"""
+
+from __future__ import annotations
+import csv
+import json
+import random
+from dataclasses import dataclass
+from pathlib import Path
+
+MUNITIONS_PLUGIN = "Munitions - An Ammo Expansion.esl"
+
+CATEGORIES = [
+    "Primitive", "StandardBallistic_Low", "StandardBallistic_Medium", "AdvancedBallistic",
+    "MilitaryGrade", "Shotgun_Standard", "Shotgun_Heavy", "Energy_Standard",
+    "Energy_Advanced", "Exotic", "Explosive",
+]
+
+FACTION_LEVELED_LISTS = {
+    "Raiders": "LLI_Raider_Weapons",
+    "Gunners": "LLI_Hostile_Gunner_Any",
+    "Institute": "LL_InstituteLaserGun",
+}
+
+@dataclass
+class SyntheticDataset:
+    """生成したデータ一式のパスと件数。"""
+    root: Path
+    output_dir: Path
+    weapon_omod_map: Path
+    ammo_map: Path
+    strategy: Path
+    leveled_lists_csv: Path
+    weapons: int
+    omods: int
+
+def generate(root: Path, weapons: int, omods_per_weapon: int = 3, *, plugins: int | None = None,
+             source_ammo: int | None = None, munitions_ammo: int = 120, mapped_ratio: float = 0.8,
+             seed: int = 1234) -> SyntheticDataset:
+    """
+    root 以下に合成ロードオーダーを生成する。
+
+    omods_per_weapon は武器あたりの OMOD 数の平均で、実際の数は 0 から平均の 2 倍の間でばらつく。
+    mapped_ratio は元の弾薬のうち ammo_map.json にマッピングを持つものの割合。
+    """
+    rng = random.Random(seed)
+    root = Path(root)
+    output_dir = root / "Output"
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    plugins = plugins or max(1, weapons // 200)
+    source_ammo = source_ammo or max(10, weapons // 50)
+    plugin_names = [f"SynthMod{i:04d}.esp" for i in range(plugins)]
+
+    # Munitions の弾薬とその分類
+    munitions_fids = [f"FE{0x8000 + i:06X}" for i in range(munitions_ammo)]
+    classification = {
+        fid: {"Category": CATEGORIES[i % len(CATEGORIES)], "Power": 1 + i % 4}
+        for i, fid in enumerate(munitions_fids)
+    }
+
+    # 元の弾薬 -> Munitions のマッピング
+    ammo_fids = [f"0A{i:06x}" for i in range(source_ammo)]
+    mapped = ammo_fids[: int(len(ammo_fids) * mapped_ratio)]
+    mappings = [
+        {
+            "source": {"formid": fid, "plugin": plugin_names[i % plugins], "editor_id": f"SynthAmmo{i}"},
+            "target": {"formid": rng.choice(munitions_fids).lower(), "plugin": MUNITIONS_PLUGIN, "editor_id": ""},
+        }
+        for i, fid in enumerate(mapped)
+    ]
+
+    # OMOD を持つ武器レコード
+    records = []
+    omod_total = 0
+    for i in range(weapons):
+        plugin = plugin_names[i % plugins]
+        n_omods = rng.randint(0, 2 * omods_per_weapon) if omods_per_weapon else 0
+        omod_total += n_omods
+        records.append({
+            "plugin": plugin,
+            "weap_formid": f"{0x01000000 + i:08X}",
+            "weap_editor_id": f"SynthWeapon{i:06d}",
+            "ammo_formid": rng.choice(ammo_fids),
+            "omods": [{"plugin": plugin, "formid": f"{0x02000000 + i * 16 + j:08X}"} for j in range(n_omods)],
+        })
+
+    # カテゴリごとの重みを乱数で決めた allocation_matrix を持つ戦略ファイル
+    allocation_matrix = {
+        faction: {cat: rng.choice([0, 0, 5, 10, 20, 40]) for cat in CATEGORIES}
+        for faction in FACTION_LEVELED_LISTS
+    }
+    strategy = {
+        "ammo_classification": classification,
+        "allocation_matrix": allocation_matrix,
+        "faction_leveled_lists": FACTION_LEVELED_LISTS,
+        "distribution": {"weapons_per_faction": 30, "seed": seed},
+    }
+
+    dataset = SyntheticDataset(
+        root=root,
+        output_dir=output_dir,
+        weapon_omod_map=output_dir / "weapon_omod_map.json",
+        ammo_map=root / "ammo_map.json",
+        strategy=root / "strategy.json",
+        leveled_lists_csv=output_dir / "WeaponLeveledLists_Export.csv",
+        weapons=weapons,
+        omods=omod_total,
+    )
+    dataset.weapon_omod_map.write_text(json.dumps(records, ensure_ascii=False, indent=2), encoding="utf-8")
+    dataset.ammo_map.write_text(json.dumps({"meta": {"version": 2, "source": "synthetic"}, "mappings": mappings}, indent=2), encoding="utf-8")
+    dataset.strategy.write_text(json.dumps(strategy, ensure_ascii=False, indent=2), encoding="utf-8")
+
+    with dataset.leveled_lists_csv.open("w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f, quoting=csv.QUOTE_ALL)
+        writer.writerow(["EditorID", "FormID", "SourceFile"])
+        for i, editor_id in enumerate(FACTION_LEVELED_LISTS.values()):
+            writer.writerow([editor_id, f"{0x00100000 + i:08X}", "Fallout4.esm"])
+        for i in range(max(10, weapons // 10)):
+            writer.writerow([f"LLI_Synth_{i:06d}", f"{0x03000000 + i:08X}", plugin_names[i % plugins]])
+
+    return dataset
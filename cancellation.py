@@ -0,0 +1,39 @@
+# -*- coding: utf-8 -*-
+# cancellation.py — 実行中の処理を協調的に中止するためのトークン
+#
+# GUI などの呼び出し元が CancelToken.cancel() を呼ぶと、Orchestrator / XEditRunner は
+# 待機ループやステージの区切りでそれを検知し、RunCancelled を送出して後始末に進む。
+
+from __future__ import annotations
+import threading
+
+class RunCancelled(BaseException):
+    """
+    処理がキャンセルされたことを表す。
+    途中の `except Exception` で握りつぶされないよう BaseException を継承する。
+    """
+
+class CancelToken:
+    """スレッド間で共有するキャンセル要求フラグ。"""
+
+    def __init__(self):
+        self._event = threading.Event()
+        self.reason = ""
+
+    def cancel(self, reason: str = "ユーザーによる中止"):
+        if not self._event.is_set():
+            self.reason = reason
+            self._event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def raise_if_cancelled(self):
+        if self._event.is_set():
+            raise RunCancelled(self.reason)
+
+    def sleep(self, seconds: float):
+        """seconds 秒待つ。待機中にキャンセルされたら直ちに RunCancelled を送出する。"""
+        if self._event.wait(seconds):
+            raise RunCancelled(self.reason)
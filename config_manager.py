@@ -11,9 +11,85 @@
 # =============================================================================
 
 import configparser
+import io
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
 from pathlib import Path
+from types import MappingProxyType
+from typing import Mapping, Optional
 import os
 
+from utils import atomic_write_text, read_text_auto
+
+# ファイルの更新時刻を確認する最短間隔 (秒)。これより短い間隔の設定参照ではファイルを stat しない
+_MTIME_CHECK_INTERVAL = 1.0
+_OUTPUT_MODES = ('monolithic', 'sharded')
+
+class ConfigError(ValueError):
+    """config.ini の必須項目の欠落や型の誤りを表す。"""
+
+@dataclass(frozen=True)
+class EnvironmentSettings:
+    """[Environment] セクション。"""
+    use_mo2: bool
+    use_signal_mode: bool
+    mo2_executable_path: str
+    xedit_profile_name: str
+    mo2_xedit_entry_name: str
+    mo2_shortcut_format: str
+    mo2_instance_name: str
+    keep_temp_scripts: bool
+    mo2_overwrite_dir: str
+
+@dataclass(frozen=True)
+class PathSettings:
+    """[Paths] セクション。すべて project_root 基準で解決済みの絶対パス。"""
+    project_root: Path
+    game_data_path: Path
+    xedit_executable: Path
+    pas_scripts_dir: Path
+    output_dir: Path
+    robco_patcher_dir: Path
+    strategy_file: Path
+    ammo_categories_file: Path
+    ammo_map_file: Path
+    overwrite_path: Optional[Path] = None
+    lib_dir: Optional[Path] = None
+    settings_dir: Optional[Path] = None
+
+    @property
+    def xedit_output_dir(self) -> Path:
+        return self.xedit_executable.parent / 'Edit Scripts' / 'Output'
+
+@dataclass(frozen=True)
+class ParameterSettings:
+    """[Parameters] セクション。"""
+    xedit_timeout_seconds: int = 600
+    log_verification_timeout_seconds: int = 10
+    log_poll_interval_seconds: float = 0.5
+    simplify_robco_ammo_ini: bool = True
+    robco_write_loose_files: bool = True
+    robco_zip_compresslevel: int = 6
+    robco_output_mode: str = 'monolithic'
+    strategy_incremental: bool = True
+    munitions_plugin_name: str = 'Munitions - An Ammo Expansion.esl'
+    artifact_retention_mb: int = 512
+    artifact_retention_days: int = 30
+    artifact_keep_runs: int = 5
+    consistency_gate: bool = True
+    profiling: bool = False
+    profiling_trace_memory: bool = False
+
+@dataclass(frozen=True)
+class ConfigSnapshot:
+    """config.ini を読み込んだ時点の、検証済みで変更不可な設定。"""
+    environment: EnvironmentSettings
+    paths: PathSettings
+    parameters: ParameterSettings
+    scripts: Mapping[str, str]
+    mtime_ns: int
+
 class ConfigManager:
     """
     config.ini ファイルの読み込みとアクセスを管理するクラス。
@@ -28,8 +104,23 @@ class ConfigManager:
         if not self.config_path.is_file():
             raise FileNotFoundError(f"設定ファイルが見つかりません: {self.config_path}")
 
+        # transaction() 中は save_setting の書き込みを保留し、終了時にまとめて 1 回書き込む
+        self._transaction_depth = 0
+        self._dirty = False
+
+        self._load()
+        # 起動時に設定全体を検証する (欠落・型の誤りはここで ConfigError になる)
+        self._snapshot: Optional[ConfigSnapshot] = self._build_snapshot()
+
+    def _load(self):
+        """config.ini を読み込み、メモ化したパスなどをすべて破棄する。"""
         self.config = configparser.ConfigParser(interpolation=configparser.BasicInterpolation())
-        self.config.read(self.config_path, encoding='utf-8')
+        # メモ帳などで BOM 付き / cp932 で保存された場合も読めるよう文字コードを自動判定する
+        self.config.read_string(read_text_auto(self.config_path), source=str(self.config_path))
+        self._mtime_ns = self.config_path.stat().st_mtime_ns
+        self._last_mtime_check = time.monotonic()
+        self._path_cache: dict[tuple[str, str], Path] = {}
+        self._snapshot = None
 
         # project_rootがconfig.iniで指定されていればそれを使い、
         # なければconfig.iniファイルのあるディレクトリを基準にする
@@ -37,6 +128,125 @@ class ConfigManager:
         # config.ini自身の場所を基準に解決することで、より堅牢にする
         self.project_root = (self.config_path.parent / project_root_str).resolve()
 
+    def invalidate(self):
+        """メモ化した設定を破棄する。次回の参照時に現在の内容から作り直す。"""
+        self._path_cache.clear()
+        self._snapshot = None
+
+    def _reload_if_changed(self):
+        """ファイルが外部で更新されていれば読み直す (確認は _MTIME_CHECK_INTERVAL 秒に 1 回まで)。"""
+        now = time.monotonic()
+        if now - self._last_mtime_check < _MTIME_CHECK_INTERVAL:
+            return
+        self._last_mtime_check = now
+        # 未保存の変更がある間は読み直さない
+        if self._dirty or self._transaction_depth > 0:
+            return
+        try:
+            mtime_ns = self.config_path.stat().st_mtime_ns
+        except OSError:
+            return
+        if mtime_ns != self._mtime_ns:
+            self._load()
+
+    @property
+    def snapshot(self) -> ConfigSnapshot:
+        """検証済みの設定スナップショット。save_setting やファイル更新で作り直される。"""
+        self._reload_if_changed()
+        if self._snapshot is None:
+            self._snapshot = self._build_snapshot()
+        return self._snapshot
+
+    def _build_snapshot(self) -> ConfigSnapshot:
+        def raw(section: str, key: str) -> Optional[str]:
+            try:
+                return self.config.get(section, key)
+            except (configparser.NoSectionError, configparser.NoOptionError):
+                return None
+            except configparser.Error as e:
+                raise ConfigError(f"config.ini [{section}] {key} の値を展開できません: {e}") from e
+
+        def required(section: str, key: str) -> str:
+            value = raw(section, key)
+            if value is None or not value.strip():
+                raise ConfigError(f"config.ini の [{section}] に {key} が設定されていません。")
+            return value
+
+        def typed(section: str, key: str, default, cast):
+            value = raw(section, key)
+            if value is None or not value.strip():
+                return default
+            try:
+                if cast is bool:
+                    return self.config.getboolean(section, key)
+                return cast(value)
+            except ValueError as e:
+                raise ConfigError(f"config.ini [{section}] {key} の値が不正です ({cast.__name__} が必要): {value!r}") from e
+
+        def positive(section: str, key: str, default, cast):
+            value = typed(section, key, default, cast)
+            if value <= 0:
+                raise ConfigError(f"config.ini [{section}] {key} には正の値を指定してください: {value!r}")
+            return value
+
+        def path(key: str) -> Path:
+            return self._resolve_path(required('Paths', key))
+
+        def optional_path(key: str) -> Optional[Path]:
+            value = raw('Paths', key)
+            return self._resolve_path(value) if value and value.strip() else None
+
+        environment = EnvironmentSettings(
+            use_mo2=typed('Environment', 'use_mo2', False, bool),
+            use_signal_mode=typed('Environment', 'use_signal_mode', False, bool),
+            mo2_executable_path=raw('Environment', 'mo2_executable_path') or '',
+            xedit_profile_name=raw('Environment', 'xedit_profile_name') or '',
+            mo2_xedit_entry_name=raw('Environment', 'mo2_xedit_entry_name') or '',
+            mo2_shortcut_format=raw('Environment', 'mo2_shortcut_format') or 'auto',
+            mo2_instance_name=raw('Environment', 'mo2_instance_name') or '',
+            keep_temp_scripts=typed('Environment', 'keep_temp_scripts', False, bool),
+            mo2_overwrite_dir=raw('Environment', 'mo2_overwrite_dir') or '',
+        )
+        paths = PathSettings(
+            project_root=self.project_root,
+            game_data_path=path('game_data_path'),
+            xedit_executable=path('xedit_executable'),
+            pas_scripts_dir=path('pas_scripts_dir'),
+            output_dir=path('output_dir'),
+            robco_patcher_dir=path('robco_patcher_dir'),
+            strategy_file=path('strategy_file'),
+            ammo_categories_file=path('ammo_categories_file'),
+            ammo_map_file=path('ammo_map_file'),
+            overwrite_path=optional_path('overwrite_path'),
+            lib_dir=optional_path('lib_dir'),
+            settings_dir=optional_path('settings_dir'),
+        )
+        defaults = ParameterSettings()
+        parameters = ParameterSettings(
+            xedit_timeout_seconds=positive('Parameters', 'xedit_timeout_seconds', defaults.xedit_timeout_seconds, int),
+            log_verification_timeout_seconds=positive('Parameters', 'log_verification_timeout_seconds', defaults.log_verification_timeout_seconds, int),
+            log_poll_interval_seconds=positive('Parameters', 'log_poll_interval_seconds', defaults.log_poll_interval_seconds, float),
+            simplify_robco_ammo_ini=typed('Parameters', 'simplify_robco_ammo_ini', defaults.simplify_robco_ammo_ini, bool),
+            robco_write_loose_files=typed('Parameters', 'robco_write_loose_files', defaults.robco_write_loose_files, bool),
+            robco_zip_compresslevel=typed('Parameters', 'robco_zip_compresslevel', defaults.robco_zip_compresslevel, int),
+            robco_output_mode=(raw('Parameters', 'robco_output_mode') or defaults.robco_output_mode).strip().lower(),
+            strategy_incremental=typed('Parameters', 'strategy_incremental', defaults.strategy_incremental, bool),
+            munitions_plugin_name=raw('Parameters', 'munitions_plugin_name') or defaults.munitions_plugin_name,
+            artifact_retention_mb=positive('Parameters', 'artifact_retention_mb', defaults.artifact_retention_mb, int),
+            artifact_retention_days=positive('Parameters', 'artifact_retention_days', defaults.artifact_retention_days, int),
+            artifact_keep_runs=positive('Parameters', 'artifact_keep_runs', defaults.artifact_keep_runs, int),
+            consistency_gate=typed('Parameters', 'consistency_gate', defaults.consistency_gate, bool),
+            profiling=typed('Parameters', 'profiling', defaults.profiling, bool),
+            profiling_trace_memory=typed('Parameters', 'profiling_trace_memory', defaults.profiling_trace_memory, bool),
+        )
+        if not 0 <= parameters.robco_zip_compresslevel <= 9:
+            raise ConfigError(f"config.ini [Parameters] robco_zip_compresslevel は 0〜9 で指定してください: {parameters.robco_zip_compresslevel}")
+        if parameters.robco_output_mode not in _OUTPUT_MODES:
+            raise ConfigError(f"config.ini [Parameters] robco_output_mode は {' / '.join(_OUTPUT_MODES)} のいずれかを指定してください: {parameters.robco_output_mode!r}")
+
+        scripts = dict(self.config.items('Scripts')) if self.config.has_section('Scripts') else {}
+        return ConfigSnapshot(environment, paths, parameters, MappingProxyType(scripts), self._mtime_ns)
+
     def _resolve_path(self, path_str: str) -> Path:
         """
         文字列のパスを正規化し、絶対パスの Path オブジェクトに変換する。
@@ -51,7 +261,16 @@ class ConfigManager:
         return p.resolve()
 
     def get_path(self, section: str, key: str) -> Path:
-        """指定されたセクションとキーからパスを Path オブジェクトとして返す。"""
+        """指定されたセクションとキーからパスを Path オブジェクトとして返す。解決結果はメモ化する。"""
+        self._reload_if_changed()
+        cached = self._path_cache.get((section, key))
+        if cached is not None:
+            return cached
+        path = self._get_path_uncached(section, key)
+        self._path_cache[(section, key)] = path
+        return path
+
+    def _get_path_uncached(self, section: str, key: str) -> Path:
         # 特別ルール: xedit_output_dir は xedit_executable から動的に導出
         if section == 'Paths' and key == 'xedit_output_dir':
             try:
@@ -80,13 +299,14 @@ class ConfigManager:
 
     def get_env_settings(self) -> dict:
         """[Environment] セクションの設定を辞書として返す。"""
-        use_mo2 = self.get_boolean('Environment', 'use_mo2')
-        settings = {'use_mo2': use_mo2}
-        if use_mo2:
-            settings['mo2_executable_path'] = os.path.normpath(self.get_string('Environment', 'mo2_executable_path'))
-            settings['xedit_profile_name'] = self.get_string('Environment', 'xedit_profile_name')
-            settings['mo2_xedit_entry_name'] = self.get_string('Environment', 'mo2_xedit_entry_name', '')
-            settings['game_data_path'] = self.get_path('Paths', 'game_data_path')
+        snapshot = self.snapshot
+        environment = snapshot.environment
+        settings = {'use_mo2': environment.use_mo2}
+        if environment.use_mo2:
+            settings['mo2_executable_path'] = os.path.normpath(environment.mo2_executable_path)
+            settings['xedit_profile_name'] = environment.xedit_profile_name
+            settings['mo2_xedit_entry_name'] = environment.mo2_xedit_entry_name
+            settings['game_data_path'] = snapshot.paths.game_data_path
             # overwrite_path は、呼び出し元が config_manager.get_path('Paths', 'overwrite_path') を使って直接取得します。
         return settings
 
@@ -94,8 +314,68 @@ class ConfigManager:
         """[Parameters] セクションから指定されたパラメータを文字列として返す。"""
         return self.get_string('Parameters', key)
 
-    def save_setting(self, section: str, key: str, value: str):
-        """設定を保存する。GUIからの呼び出しを想定。"""
+    def save_setting(self, section: str, key: str, value: str) -> bool:
+        """
+        設定を保存する。GUIからの呼び出しを想定。
+        値が変わらない場合は書き込まない。transaction() 中は書き込みを終了時まで保留する。
+        変更があった場合 True を返す。
+        """
+        if self.config.get(section, key, raw=True, fallback=None) == value:
+            return False
         self.config.set(section, key, value)
-        with open(self.config_path, 'w', encoding='utf-8') as configfile:
-            self.config.write(configfile)
+        self._dirty = True
+        self.invalidate()
+        if self._transaction_depth == 0:
+            self._flush()
+        return True
+
+    def save_settings(self, settings: dict[str, dict[str, str]]) -> bool:
+        """{セクション: {キー: 値}} をまとめて保存する。書き込みは最大 1 回。変更があった場合 True を返す。"""
+        changed = False
+        with self.transaction():
+            for section, values in settings.items():
+                for key, value in values.items():
+                    changed |= self.save_setting(section, key, value)
+        return changed
+
+    @contextmanager
+    def transaction(self):
+        """
+        with ブロック内の save_setting をまとめ、終了時に 1 回だけアトミックに書き込む。
+        ブロック内で例外が発生した場合は変更を破棄し、ファイルにもメモリ上の設定にも反映しない。
+        """
+        if self._transaction_depth > 0:
+            self._transaction_depth += 1
+            try:
+                yield self
+            finally:
+                self._transaction_depth -= 1
+            return
+
+        backup = self._render()
+        dirty_before = self._dirty
+        self._transaction_depth = 1
+        try:
+            yield self
+        except BaseException:
+            self.config = configparser.ConfigParser(interpolation=configparser.BasicInterpolation())
+            self.config.read_string(backup)
+            self._dirty = dirty_before
+            self.invalidate()
+            raise
+        finally:
+            self._transaction_depth = 0
+        if self._dirty:
+            self._flush()
+
+    def _render(self) -> str:
+        buffer = io.StringIO()
+        self.config.write(buffer)
+        return buffer.getvalue()
+
+    def _flush(self):
+        """設定ファイルを一時ファイル経由で置き換える (書き込み途中の状態を他から見せない)。"""
+        atomic_write_text(self.config_path, self._render(), encoding='utf-8')
+        self._dirty = False
+        self._mtime_ns = self.config_path.stat().st_mtime_ns
+        self.invalidate()
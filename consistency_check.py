@@ -0,0 +1,284 @@
+# -*- coding: utf-8 -*-
+# consistency_check.py — 抽出データ・マッピング・戦略ファイル間の整合性検査
+#
+# weapon_omod_map.json / ammo_map.json / munitions_ammo_ids.ini / unique_ammo_for_mapping.ini /
+# WeaponLeveledLists_Export.csv / strategy.json を 1 回ずつ読み込んでキーの集合にし、
+# ファイル間の参照関係をすべて集合演算で検査する。
+# 不整合があっても INI 生成自体は成功し、空の INI ができるだけなので、生成前にここで止める。
+# 結果は consistency_report.json (機械可読) に書き出す。
+
+from __future__ import annotations
+import json
+import logging
+import time
+from collections import Counter
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Iterable, Optional
+
+from record_store import ABSENT, Table, read_ini_table
+from robco_ini_generate import (
+    _get_target_ll_editorids, _load_ammo_map, _load_leveled_lists, _open_fresh_table, _read_weapon_records,
+)
+from utils import atomic_write_text, read_text_auto
+
+REPORT_FILE = 'consistency_report.json'
+ERROR = 'ERROR'
+WARNING = 'WARNING'
+INFO = 'INFO'
+_SEVERITY_ORDER = {ERROR: 0, WARNING: 1, INFO: 2}
+_MAX_SAMPLES = 20
+
+@dataclass(frozen=True)
+class Finding:
+    """検査結果 1 件。samples は該当キーの先頭 _MAX_SAMPLES 件 (ソート済み)。"""
+    code: str
+    severity: str
+    message: str
+    count: int = 0
+    samples: tuple = ()
+
+@dataclass
+class ConsistencyReport:
+    generated_at: str
+    elapsed_ms: float = 0.0
+    counts: dict[str, int] = field(default_factory=dict)
+    findings: list[Finding] = field(default_factory=list)
+
+    @property
+    def ok(self) -> bool:
+        """ERROR の検査結果がなければ真。"""
+        return not any(f.severity == ERROR for f in self.findings)
+
+    def to_dict(self) -> dict:
+        return {
+            'generated_at': self.generated_at,
+            'elapsed_ms': round(self.elapsed_ms, 1),
+            'ok': self.ok,
+            'counts': self.counts,
+            'findings': [asdict(f) for f in self.findings],
+        }
+
+@dataclass
+class ArtifactSets:
+    """各ファイルから取り出したキーの集合。FormID はすべて 8 桁大文字。"""
+    missing: list[str] = field(default_factory=list)
+    missing_optional: list[str] = field(default_factory=list)  # INI 生成には不要なファイル
+    weapon_count: int = 0
+    weapon_ammo: set = field(default_factory=set)
+    duplicate_weapons: list = field(default_factory=list)
+    mapping: dict[str, str] = field(default_factory=dict)
+    munitions_ammo: set = field(default_factory=set)
+    unmapped_ammo: set = field(default_factory=set)
+    leveled_lists: set = field(default_factory=set)
+    classification: dict[str, str] = field(default_factory=dict)
+    allocation_matrix: dict = field(default_factory=dict)
+    faction_leveled_lists: dict[str, str] = field(default_factory=dict)
+
+# --- 読み込み ---
+
+def _weapon_keys(records) -> tuple[int, set, list]:
+    """
+    武器レコードから (件数, 元の弾薬 FormID の集合, 重複した武器キー) を求める。
+    プラグインか FormID のない行は重複の判定から除く。
+    """
+    if isinstance(records, Table) and records.kind('plugin') == 'str' and records.kind('weap_formid') == 'formid':
+        try:
+            ammo = {fid.strip().upper() for fid in records.distinct('ammo_formid')}
+        except TypeError:
+            ammo = None  # 想定外の列の種類なら行ごとに読む
+        if ammo is not None:
+            # コンテナの列は生の番号のまま数え、異なる組み合わせだけを復号する。
+            # プラグイン名は JSON の場合と同じく大文字小文字を区別しない
+            raw = Counter(pair for pair in zip(records.column('plugin'), records.column('weap_formid'))
+                          if ABSENT not in pair)
+            plugins = {p: records.store.string(p).strip().lower() for p in {p for p, _ in raw}}
+            pairs = Counter()
+            for (p, f), n in raw.items():
+                if plugins[p]:
+                    pairs[(plugins[p], f'{f:08X}')] += n
+            return len(records), ammo, [key for key, n in pairs.items() if n > 1]
+    ammo = set()
+    pairs = Counter()
+    for rec in records:
+        fid = (rec.get('ammo_formid') or '').strip().upper()
+        if fid:
+            ammo.add(fid)
+        plugin = (rec.get('plugin') or '').strip().lower()
+        weap_fid = (rec.get('weap_formid') or '').strip().upper()
+        if plugin and weap_fid:
+            pairs[(plugin, weap_fid)] += 1
+    return len(records), ammo, [key for key, n in pairs.items() if n > 1]
+
+def _ini_formids(output_dir: Path, table: str, filename: str, section: str, fields: tuple[str, ...],
+                 missing: list[str]) -> set:
+    path = output_dir / 'intermediate' / filename
+    if not path.is_file():
+        missing.append(str(path))
+        return set()
+    rows = _open_fresh_table(output_dir, table, path)
+    if rows is not None:
+        return {fid.upper() for fid in rows.distinct('formid')}
+    return {row['formid'] for row in read_ini_table(path, section, fields)}
+
+def load_artifacts(config) -> ArtifactSets:
+    """検査対象のファイルを 1 回ずつ読み込み、キーの集合にする。"""
+    sets = ArtifactSets()
+    output_dir = config.get_path('Paths', 'output_dir')
+
+    records = _read_weapon_records(output_dir, config, pack=False)
+    sets.weapon_count, sets.weapon_ammo, sets.duplicate_weapons = _weapon_keys(records)
+
+    ammo_map_file = config.get_path('Paths', 'ammo_map_file')
+    if ammo_map_file.is_file():
+        sets.mapping = {src.upper(): dst.upper() for src, dst in _load_ammo_map(ammo_map_file).items()}
+    else:
+        sets.missing.append(str(ammo_map_file))
+
+    # どちらの INI も INI 生成には使わず、無ければそれを参照する検査を省略するだけなので任意扱い
+    sets.munitions_ammo = _ini_formids(output_dir, 'munitions_ammo', 'munitions_ammo_ids.ini',
+                                       'MunitionsAmmo', ('editor_id',), sets.missing_optional)
+    sets.unmapped_ammo = _ini_formids(output_dir, 'unmapped_ammo', 'unique_ammo_for_mapping.ini',
+                                      'UnmappedAmmo', ('plugin', 'editor_id'), sets.missing_optional)
+    sets.leveled_lists = set(_load_leveled_lists(output_dir, config))
+
+    strategy_file = config.get_path('Paths', 'strategy_file')
+    strategy = {}
+    if strategy_file.is_file():
+        strategy = json.loads(read_text_auto(strategy_file))
+    else:
+        sets.missing.append(str(strategy_file))
+    sets.classification = {
+        fid.upper(): (info or {}).get('Category', '')
+        for fid, info in (strategy.get('ammo_classification') or {}).items()
+    }
+    sets.allocation_matrix = strategy.get('allocation_matrix') or {}
+    sets.faction_leveled_lists = strategy.get('faction_leveled_lists') or _get_target_ll_editorids()
+    return sets
+
+# --- 検査 ---
+
+def _finding(code: str, severity: str, message: str, keys: Iterable = ()) -> Optional[Finding]:
+    keys = sorted(keys, key=str)
+    if not keys:
+        return None
+    return Finding(code, severity, message, len(keys), tuple(keys[:_MAX_SAMPLES]))
+
+def check(sets: ArtifactSets) -> list[Finding]:
+    """集合演算で参照関係を検査し、検査結果を重大度順に返す。"""
+    findings: list[Optional[Finding]] = []
+    add = findings.append
+    sources = set(sets.mapping)
+    targets = set(sets.mapping.values())
+    classified = set(sets.classification)
+    categories = set(sets.classification.values()) - {''}
+    factions = set(sets.faction_leveled_lists)
+    distribution = bool(sets.allocation_matrix and sets.classification)
+
+    add(_finding('ARTIFACT_MISSING', ERROR, '必要なファイルが見つかりません', sets.missing))
+    add(_finding('OPTIONAL_ARTIFACT_MISSING', WARNING,
+                 '任意のファイルが見つかりません (関連する検査を省略します)', sets.missing_optional))
+    if not sets.weapon_count:
+        add(Finding('WEAPONS_EMPTY', ERROR, 'weapon_omod_map.json に武器レコードがありません'))
+    if not sets.leveled_lists:
+        add(Finding('LEVELED_LISTS_EMPTY', ERROR, 'WeaponLeveledLists_Export.csv に Leveled List がありません'))
+    if sets.weapon_ammo and sources and not sets.weapon_ammo & sources:
+        add(Finding('AMMO_MAP_NO_MATCH', ERROR,
+                    'ammo_map.json のマッピング元がどの武器の弾薬とも一致しません (INI が空になります)',
+                    len(sources)))
+
+    if sets.munitions_ammo:
+        add(_finding('AMMO_MAP_TARGET_UNKNOWN', ERROR,
+                     'マッピング先の弾薬が munitions_ammo_ids.ini にありません', targets - sets.munitions_ammo))
+        add(_finding('CLASSIFICATION_UNKNOWN_AMMO', WARNING,
+                     'ammo_classification の FormID が munitions_ammo_ids.ini にありません',
+                     classified - sets.munitions_ammo))
+        if sets.classification:
+            add(_finding('MUNITIONS_UNCLASSIFIED', WARNING,
+                         'Munitions の弾薬に ammo_classification の分類がありません',
+                         sets.munitions_ammo - classified))
+    if sets.leveled_lists:
+        add(_finding('FACTION_LL_MISSING', ERROR,
+                     'faction_leveled_lists の EditorID が WeaponLeveledLists_Export.csv にありません',
+                     set(sets.faction_leveled_lists.values()) - sets.leveled_lists))
+
+    if distribution:
+        add(_finding('MAPPED_AMMO_UNCLASSIFIED', WARNING,
+                     'マッピング先の弾薬に分類がなく、その武器は Leveled List に配分されません',
+                     targets - classified))
+        add(_finding('ALLOCATION_UNKNOWN_CATEGORY', WARNING,
+                     'allocation_matrix のカテゴリに分類された弾薬がありません',
+                     {c for weights in sets.allocation_matrix.values() for c, w in (weights or {}).items()
+                      if w and c not in categories}))
+        add(_finding('ALLOCATION_UNKNOWN_FACTION', WARNING,
+                     'allocation_matrix の勢力が faction_leveled_lists にありません (無視されます)',
+                     set(sets.allocation_matrix) - factions))
+        add(_finding('FACTION_WITHOUT_ALLOCATION', WARNING,
+                     'faction_leveled_lists の勢力に allocation_matrix の重みがありません (武器が配分されません)',
+                     factions - set(sets.allocation_matrix)))
+
+    add(_finding('WEAPON_KEY_DUPLICATE', WARNING,
+                 '同じプラグイン・FormID の武器レコードが複数あります', sets.duplicate_weapons))
+    if sets.weapon_ammo:
+        add(_finding('AMMO_MAP_SOURCE_UNUSED', WARNING,
+                     'マッピング元の弾薬を使う武器がありません', sources - sets.weapon_ammo))
+    add(_finding('WEAPON_AMMO_UNMAPPED', INFO,
+                 '武器の弾薬のうち ammo_map.json にマッピングがないもの', sets.weapon_ammo - sources))
+    add(_finding('UNMAPPED_AMMO_PENDING', INFO,
+                 'unique_ammo_for_mapping.ini の弾薬のうち未マッピングのもの', sets.unmapped_ammo - sources))
+
+    result = [f for f in findings if f is not None]
+    result.sort(key=lambda f: _SEVERITY_ORDER[f.severity])
+    return result
+
+# --- 実行 ---
+
+def run(config, report_path: Optional[Path] = None) -> ConsistencyReport:
+    """
+    整合性を検査し、結果を report_path (既定は output_dir/consistency_report.json) に書き出す。
+    """
+    start = time.perf_counter()
+    report = ConsistencyReport(generated_at=time.strftime('%Y-%m-%d %H:%M:%S'))
+    sets = load_artifacts(config)
+    report.findings = check(sets)
+    report.counts = {
+        'weapons': sets.weapon_count,
+        'weapon_ammo': len(sets.weapon_ammo),
+        'mappings': len(sets.mapping),
+        'munitions_ammo': len(sets.munitions_ammo),
+        'unmapped_ammo': len(sets.unmapped_ammo),
+        'leveled_lists': len(sets.leveled_lists),
+        'classified_ammo': len(sets.classification),
+    }
+    report.elapsed_ms = (time.perf_counter() - start) * 1000
+
+    for f in report.findings:
+        level = {ERROR: logging.ERROR, WARNING: logging.WARNING, INFO: logging.INFO}[f.severity]
+        samples = f": {', '.join(map(str, f.samples[:5]))}{' ...' if f.count > 5 else ''}" if f.samples else ''
+        logging.log(level, f"[Consistency] {f.code} ({f.count}件) {f.message}{samples}")
+    logging.info(f"[Consistency] 検査完了: {'OK' if report.ok else 'NG'} "
+                 f"(ERROR {sum(f.severity == ERROR for f in report.findings)}件, "
+                 f"WARNING {sum(f.severity == WARNING for f in report.findings)}件, {report.elapsed_ms:.0f} ms)")
+
+    if report_path is None:
+        report_path = config.get_path('Paths', 'output_dir') / REPORT_FILE
+    try:
+        atomic_write_text(report_path, json.dumps(report.to_dict(), ensure_ascii=False, indent=2))
+    except OSError as e:
+        logging.warning(f"[Consistency] {report_path} を書き出せません: {e}")
+    return report
+
+def main(argv: Optional[list[str]] = None) -> int:
+    import argparse
+    from config_manager import ConfigManager
+    parser = argparse.ArgumentParser(description='抽出データ・マッピング・戦略ファイル間の整合性を検査する')
+    parser.add_argument('--config', default='config.ini', help='config.ini のパス')
+    parser.add_argument('-o', '--output', type=Path, help='レポートの出力先 (既定は output_dir/consistency_report.json)')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    report = run(ConfigManager(args.config), args.output)
+    return 0 if report.ok else 1
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,148 @@
+# -*- coding: utf-8 -*-
+# json_repair.py — xEdit エクスポートの壊れた JSON を 1 パスで修復する
+#
+# xEdit (Pascal スクリプト) が途中で落ちたり、出力の組み立てに失敗したりすると、
+# weapon_omod_map.json などが次のように壊れることがある。
+#   - 配列の括弧がない / オブジェクト間のカンマがない
+#   - オブジェクト内のカンマ抜け、末尾の余分なカンマ
+#   - 文字列中の生の改行・制御文字
+#   - 途中で切れた末尾
+# ここではトップレベルのオブジェクトを先頭から 1 回だけ走査して取り出し、
+# 読めたレコードと、読めなかった箇所のオフセットを返す。
+
+from __future__ import annotations
+import json
+import re
+from dataclasses import dataclass, field
+from typing import Iterator, Union
+
+# 正常なオブジェクトは C 実装の raw_decode でそのまま読む (制御文字は許容)
+_DECODER = json.JSONDecoder(strict=False)
+# トップレベルのオブジェクト間の区切り (空白・カンマ・配列の括弧)
+_SEPARATOR = re.compile(r"[\s,\[\]]*")
+# 構造文字と文字列の終端だけに飛ぶための正規表現
+_STRUCTURAL = re.compile(r'[{}\[\]"]')
+_STRING_END = re.compile(r'["\\]')
+# 値の直後で改行し、カンマなしで次のキー/値が始まっている箇所
+_MISSING_COMMA = re.compile(r'(?<=["\d}\]el])(\s*\n\s*)(?=["{\[])')
+# 閉じ括弧の直前の余分なカンマ
+_TRAILING_COMMA = re.compile(r",(\s*[}\]])")
+
+@dataclass(frozen=True)
+class RepairError:
+    """読めなかった箇所。offset は元テキスト中の文字位置、line は 1 始まりの行番号。"""
+    offset: int
+    line: int
+    message: str
+    snippet: str = ""
+    truncated: bool = False
+
+@dataclass
+class RepairResult:
+    records: list = field(default_factory=list)
+    errors: list[RepairError] = field(default_factory=list)
+    truncated: bool = False
+    repaired: int = 0
+
+    @property
+    def ok(self) -> bool:
+        return not self.errors
+
+def _error(text: str, offset: int, message: str, truncated: bool = False) -> RepairError:
+    return RepairError(offset, text.count("\n", 0, offset) + 1, message, text[offset:offset + 60], truncated)
+
+def _scan_object_end(text: str, start: int) -> int | None:
+    """start の '{' に対応する閉じ括弧の直後の位置を返す。途中で終わっていれば None。"""
+    depth = 0
+    pos = start
+    while True:
+        m = _STRUCTURAL.search(text, pos)
+        if not m:
+            return None
+        ch = m.group()
+        pos = m.end()
+        if ch == '"':
+            while True:
+                s = _STRING_END.search(text, pos)
+                if not s:
+                    return None
+                if s.group() == "\\":
+                    pos = s.end() + 1
+                    continue
+                pos = s.end()
+                break
+        elif ch in "{[":
+            depth += 1
+        else:
+            depth -= 1
+            if depth == 0:
+                return pos
+
+def _repair_object(fragment: str):
+    """1 オブジェクト分の断片に局所的な修正 (カンマ補完・余分なカンマ削除) を施して読む。"""
+    fixed = _TRAILING_COMMA.sub(r"\1", _MISSING_COMMA.sub(r",\1", fragment))
+    return json.loads(fixed, strict=False)
+
+def iter_records(text: str) -> Iterator[Union[tuple[int, object, bool], RepairError]]:
+    """
+    テキスト中のトップレベルのオブジェクトを先頭から順に返す。
+    読めたものは (オフセット, オブジェクト, 修復したか)、読めなかったものは RepairError。
+    """
+    pos = 0
+    length = len(text)
+    while True:
+        pos = _SEPARATOR.match(text, pos).end()
+        if pos >= length:
+            return
+        if text[pos] != "{":
+            # オブジェクトの外にあるゴミは次の '{' まで読み飛ばす
+            next_start = text.find("{", pos)
+            yield _error(text, pos, "オブジェクトの外に不正な文字列があります")
+            if next_start < 0:
+                return
+            pos = next_start
+            continue
+        try:
+            obj, end = _DECODER.raw_decode(text, pos)
+            yield pos, obj, False
+            pos = end
+            continue
+        except json.JSONDecodeError:
+            pass
+
+        end = _scan_object_end(text, pos)
+        if end is None:
+            yield _error(text, pos, "ファイル末尾でオブジェクトが途切れています", truncated=True)
+            return
+        try:
+            yield pos, _repair_object(text[pos:end]), True
+        except json.JSONDecodeError as e:
+            yield _error(text, pos + e.pos, f"オブジェクトを修復できません: {e.msg}")
+        pos = end
+
+def repair_json_text(text: str) -> RepairResult:
+    """壊れた JSON テキストからトップレベルのオブジェクトを回収する。"""
+    result = RepairResult()
+    for item in iter_records(text):
+        if isinstance(item, RepairError):
+            result.errors.append(item)
+            result.truncated |= item.truncated
+            continue
+        _, obj, repaired = item
+        result.repaired += repaired
+        if isinstance(obj, dict):
+            result.records.append(obj)
+        elif isinstance(obj, list):
+            result.records.extend(obj)
+    return result
+
+def loads_tolerant(text: str) -> tuple[object, RepairResult | None]:
+    """
+    まず通常の json.loads を試し、失敗したときだけ修復する。
+    戻り値は (データ, 修復結果)。修復しなかった場合、修復結果は None。
+    """
+    try:
+        return json.loads(text), None
+    except json.JSONDecodeError:
+        result = repair_json_text(text)
+        return result.records, result
@@ -0,0 +1,282 @@
+# -*- coding: utf-8 -*-
+# log_index.py — Output / xEdit ログのマーカー索引
+#
+# ログファイルを mmap して既知のマーカー ([PROBE_*] / [STAGE] / [ERROR] / Exception など) が
+# 現れる行の先頭オフセットを記録し、索引ファイルに保存する。索引はファイルのサイズと
+# 更新時刻で差分更新し、追記されたログは前回の続きからだけ走査する。
+# 問い合わせはマーカー種別と時刻範囲で索引を引き、該当行だけをファイルから読む。
+
+from __future__ import annotations
+import hashlib
+import json
+import logging
+import mmap
+import re
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Iterable, Iterator, Optional
+
+from utils import atomic_write_text, detect_encoding
+
+_INDEX_VERSION = 2
+INDEX_FILE_NAME = '.log_index.json'
+DEFAULT_PATTERNS = ('*.log', '*.txt')
+
+# マーカー種別 -> 行内で探すバイト列の正規表現の並び
+# 正規表現は 1 本ずつ走査する。先頭が固定文字列のパターンは re の高速検索が効くため、
+# 選択 (|) でまとめた 1 本の正規表現よりはるかに速い。
+# EXCEPTION と TEST は旧 scan_output_logs.py と同じく大文字小文字を区別しない
+# (高速検索は効かなくなるが、追記分しか走査しないので影響は小さい)。
+DEFAULT_MARKERS: dict[str, tuple[bytes, ...]] = {
+    'PROBE': (rb'\[[A-Z_]*PROBE[A-Z_]*\]',),
+    'STAGE': (rb'\[STAGE\]',),
+    'ERROR': (rb'\[ERROR\]', rb' - (?:ERROR|CRITICAL) - '),
+    'EXCEPTION': (rb'(?i)Exception', rb'(?i)Access ?Violation'),
+    'TEST': (rb'(?i)\[AutoPatcher-Test\]',),
+}
+# 行頭付近の時刻 (AutoPatcherGUI の LOG_FORMAT や xEdit の DateTimeToStr の出力)
+_TIMESTAMP = re.compile(rb'(\d{4})[-/](\d{1,2})[-/](\d{1,2})[ T](\d{1,2}):(\d{2}):(\d{2})')
+_TIMESTAMP_WINDOW = 64
+# 先頭が変わっていたら (ローテーション・作り直し) 差分ではなく全体を走査し直す
+_HEAD_BYTES = 256
+
+@dataclass(frozen=True)
+class LogHit:
+    """問い合わせ結果 1 件。timestamp は行内の時刻、なければファイルの更新時刻。"""
+    path: Path
+    offset: int
+    kind: str
+    tag: str
+    timestamp: float
+    text: str
+
+def _compile_markers(markers: dict[str, tuple[bytes, ...]]) -> list[tuple[int, re.Pattern]]:
+    return [(kind_id, re.compile(pattern))
+            for kind_id, patterns in enumerate(markers.values()) for pattern in patterns]
+
+def _markers_digest(markers: dict[str, tuple[bytes, ...]]) -> str:
+    h = hashlib.sha256()
+    for kind, patterns in sorted(markers.items()):
+        h.update(kind.encode('ascii') + b'\0' + b'\0'.join(patterns) + b'\0\0')
+    return h.hexdigest()[:16]
+
+def _parse_timestamp(line_head: bytes) -> Optional[float]:
+    m = _TIMESTAMP.search(line_head)
+    if not m:
+        return None
+    try:
+        return datetime(*(int(g) for g in m.groups())).timestamp()
+    except ValueError:
+        return None
+
+def _head_digest(data, length: int) -> str:
+    return hashlib.sha256(data[:length]).hexdigest()[:16]
+
+def _empty_entry() -> dict:
+    return {'size': 0, 'mtime_ns': 0, 'head': '', 'head_len': 0, 'scanned': 0,
+            'tags': [], 'offsets': [], 'kinds': [], 'tag_ids': [], 'times': []}
+
+class LogIndex:
+    """
+    roots 以下のログファイル (patterns に一致するもの) と files で直接指定したログの索引。
+    index_path を省略すると最初の root の直下に .log_index.json を置く。
+    """
+
+    def __init__(self, roots: Iterable[Path] = (), files: Iterable[Path] = (),
+                 patterns: Iterable[str] = DEFAULT_PATTERNS,
+                 markers: Optional[dict[str, tuple[bytes, ...]]] = None,
+                 index_path: Optional[Path] = None):
+        self.roots = [Path(r) for r in roots]
+        self.files = [Path(f) for f in files]
+        self.patterns = tuple(patterns)
+        self.markers = dict(markers or DEFAULT_MARKERS)
+        self._kinds = list(self.markers)
+        self._patterns = _compile_markers(self.markers)
+        self._digest = _markers_digest(self.markers)
+        if index_path is None and self.roots:
+            index_path = self.roots[0] / INDEX_FILE_NAME
+        self.index_path = Path(index_path) if index_path else None
+        self._entries: dict[str, dict] = {}
+        self._load()
+
+    # ---- 索引の保存・読み込み ----
+
+    def _load(self):
+        if not self.index_path or not self.index_path.is_file():
+            return
+        try:
+            data = json.loads(self.index_path.read_text(encoding='utf-8'))
+        except Exception as e:
+            logging.debug(f"[LogIndex] 索引を読み込めないため作り直します: {e}")
+            return
+        if data.get('version') == _INDEX_VERSION and data.get('markers') == self._digest:
+            self._entries = data.get('files', {})
+
+    def save(self):
+        if not self.index_path:
+            return
+        payload = {'version': _INDEX_VERSION, 'markers': self._digest, 'files': self._entries}
+        atomic_write_text(self.index_path, json.dumps(payload, ensure_ascii=False, separators=(',', ':')))
+
+    # ---- 走査 ----
+
+    def discover(self) -> list[Path]:
+        """索引対象のログファイルを列挙する。"""
+        found: dict[str, Path] = {}
+        for root in self.roots:
+            if not root.is_dir():
+                continue
+            for pattern in self.patterns:
+                for p in root.rglob(pattern):
+                    if p.is_file():
+                        found[str(p.resolve())] = p
+        for p in self.files:
+            if p.is_file():
+                found[str(p.resolve())] = p
+        return list(found.values())
+
+    def refresh(self, save: bool = True) -> dict[str, int]:
+        """
+        索引を最新にする。変更のないファイルは読まず、追記されたファイルは続きだけ走査する。
+        戻り値は {'unchanged': n, 'appended': n, 'rescanned': n, 'removed': n, 'bytes': 走査したバイト数}。
+        """
+        stats = {'unchanged': 0, 'appended': 0, 'rescanned': 0, 'removed': 0, 'bytes': 0}
+        live = set()
+        for path in self.discover():
+            key = str(path.resolve())
+            live.add(key)
+            try:
+                st = path.stat()
+            except OSError:
+                continue
+            entry = self._entries.get(key)
+            if entry and entry['size'] == st.st_size and entry['mtime_ns'] == st.st_mtime_ns:
+                stats['unchanged'] += 1
+                continue
+            scanned = self._scan(path, entry, st, stats)
+            if scanned is not None:
+                self._entries[key] = scanned
+        for key in [k for k in self._entries if k not in live]:
+            del self._entries[key]
+            stats['removed'] += 1
+        if save and (stats['appended'] or stats['rescanned'] or stats['removed']):
+            self.save()
+        return stats
+
+    def _scan(self, path: Path, entry: Optional[dict], st, stats: dict) -> Optional[dict]:
+        try:
+            with open(path, 'rb') as f:
+                if st.st_size == 0:
+                    mm = b''
+                else:
+                    mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                try:
+                    return self._scan_mapped(mm, entry, st, stats)
+                finally:
+                    if isinstance(mm, mmap.mmap):
+                        mm.close()
+        except OSError as e:
+            logging.debug(f"[LogIndex] {path} を読めません: {e}")
+            return None
+
+    def _scan_mapped(self, mm, entry: Optional[dict], st, stats: dict) -> dict:
+        size = len(mm)
+        if entry and entry['size'] <= size and entry['head'] == _head_digest(mm, entry['head_len']):
+            start = entry['scanned']
+            stats['appended'] += 1
+        else:
+            entry = _empty_entry()
+            start = 0
+            stats['rescanned'] += 1
+        # 書きかけの最終行は次回に回す
+        end = mm.rfind(b'\n', start, size) + 1 or start
+        fallback_time = st.st_mtime_ns / 1e9
+
+        # 1 行に同じ種別のマーカーが複数あっても 1 件として数える
+        found: dict[tuple[int, int], bytes] = {}
+        for kind_id, regex in self._patterns:
+            for m in regex.finditer(mm, start, end):
+                line_start = mm.rfind(b'\n', 0, m.start()) + 1
+                found.setdefault((line_start, kind_id), m.group())
+
+        tag_ids = {tag: i for i, tag in enumerate(entry['tags'])}
+        for (line_start, kind_id), matched in sorted(found.items()):
+            tag = matched.strip(b'[] -').decode('ascii', 'replace')
+            tag_id = tag_ids.get(tag)
+            if tag_id is None:
+                tag_id = tag_ids[tag] = len(entry['tags'])
+                entry['tags'].append(tag)
+            ts = _parse_timestamp(mm[line_start:line_start + _TIMESTAMP_WINDOW])
+            entry['offsets'].append(line_start)
+            entry['kinds'].append(kind_id)
+            entry['tag_ids'].append(tag_id)
+            entry['times'].append(ts if ts is not None else fallback_time)
+        stats['bytes'] += end - start
+        head_len = min(size, _HEAD_BYTES)
+        entry.update(size=size, mtime_ns=st.st_mtime_ns, head=_head_digest(mm, head_len),
+                     head_len=head_len, scanned=end)
+        return entry
+
+    # ---- 問い合わせ ----
+
+    def query(self, markers: Optional[Iterable[str]] = None,
+              since: Optional[float] = None, until: Optional[float] = None,
+              path_contains: Optional[str] = None, limit: Optional[int] = None) -> Iterator[LogHit]:
+        """
+        索引を引いて該当行を返す。markers はマーカー種別 ('PROBE' など) か
+        具体的なタグ ('PROBE_FORMID_RAW' など) の並び。since / until は UNIX 時刻。
+        """
+        wanted = {m.upper() for m in markers} if markers else None
+        count = 0
+        for key, entry in self._entries.items():
+            if path_contains and path_contains.lower() not in key.lower():
+                continue
+            hits = []
+            for offset, kind_id, tag_id, ts in zip(entry['offsets'], entry['kinds'], entry['tag_ids'], entry['times']):
+                if since is not None and ts < since:
+                    continue
+                if until is not None and ts > until:
+                    continue
+                if wanted is not None and self._kinds[kind_id] not in wanted and entry['tags'][tag_id].upper() not in wanted:
+                    continue
+                hits.append((offset, kind_id, tag_id, ts))
+            if not hits:
+                continue
+            path = Path(key)
+            for (offset, kind_id, tag_id, ts), text in zip(hits, _read_lines(path, [h[0] for h in hits])):
+                yield LogHit(path, offset, self._kinds[kind_id], entry['tags'][tag_id], ts, text)
+                count += 1
+                if limit is not None and count >= limit:
+                    return
+
+    def counts(self) -> dict[str, int]:
+        """タグごとの件数。"""
+        totals: dict[str, int] = {}
+        for entry in self._entries.values():
+            for tag_id in entry['tag_ids']:
+                tag = entry['tags'][tag_id]
+                totals[tag] = totals.get(tag, 0) + 1
+        return totals
+
+def _read_lines(path: Path, offsets: list[int]) -> list[str]:
+    """offsets の位置から始まる行を読む。ファイルが消えていれば空文字列。"""
+    try:
+        encoding = detect_encoding(path)
+        with open(path, 'rb') as f:
+            lines = []
+            for offset in offsets:
+                f.seek(offset)
+                lines.append(f.readline().rstrip(b'\r\n').decode(encoding, 'replace'))
+            return lines
+    except OSError:
+        return [''] * len(offsets)
+
+def parse_time(value: str) -> float:
+    """'2025-10-14 21:41' / '2025-10-14T21:41:54' / '-30m' / '-2h' / '-1d' を UNIX 時刻にする。"""
+    m = re.fullmatch(r'-(\d+)([smhd])', value.strip())
+    if m:
+        unit = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}[m.group(2)]
+        return time.time() - int(m.group(1)) * unit
+    return datetime.fromisoformat(value.strip()).timestamp()
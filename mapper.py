@@ -1,16 +1,14 @@
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
-import os
 from pathlib import Path
 import argparse
-import locale
 import configparser
 import json
 import sys
 from datetime import datetime, timezone
 
-# utils.pyから共通関数をインポート (もしあれば)
-# from utils import read_text_utf8_fallback
+from munitions_lookup import AmmoSuggester, MunitionsSearchIndex
+from utils import read_text_auto
 
 def normalize_form_id(value: str | None) -> str | None:
     if value is None:
@@ -25,13 +23,124 @@ def normalize_form_id(value: str | None) -> str | None:
         filtered = filtered[-8:]
     return filtered.rjust(8, "0")
 
+# 仮想スクロール表示の1行の高さ (px) と、固定幅カラムの幅 (文字数)
+ROW_HEIGHT = 30
+COLUMN_WIDTHS = (4, 24, 30, 24)
+
+class TargetPicker:
+    """
+    全行で共有する、変換先 Munitions 弾薬の絞り込み選択ポップアップ。
+    入力のたびに MunitionsSearchIndex を引き、一致の良い順に候補を表示する。
+    """
+    CLEAR_LABEL = "(選択解除)"
+
+    def __init__(self, root_window, max_results: int = 200):
+        self.root = root_window
+        self.max_results = max_results
+        self.index: MunitionsSearchIndex | None = None
+        self._priority: list[str] = []
+        self._results: list[str] = []
+        self._on_select = None
+
+        self.popup = tk.Toplevel(self.root)
+        self.popup.withdraw()
+        self.popup.overrideredirect(True)
+
+        self.query_var = tk.StringVar()
+        self.entry = ttk.Entry(self.popup, textvariable=self.query_var)
+        self.entry.pack(fill=tk.X)
+        list_frame = ttk.Frame(self.popup)
+        list_frame.pack(fill=tk.BOTH, expand=1)
+        self.listbox = tk.Listbox(list_frame, height=12, exportselection=False)
+        scrollbar = ttk.Scrollbar(list_frame, orient="vertical", command=self.listbox.yview)
+        self.listbox.configure(yscrollcommand=scrollbar.set)
+        scrollbar.pack(side="right", fill="y")
+        self.listbox.pack(side="left", fill=tk.BOTH, expand=1)
+
+        self.query_var.trace_add("write", lambda *_: self._update_results())
+        self.entry.bind("<Down>", lambda e: self._move_selection(1))
+        self.entry.bind("<Up>", lambda e: self._move_selection(-1))
+        self.entry.bind("<Return>", lambda e: self._pick())
+        self.listbox.bind("<Double-Button-1>", lambda e: self._pick())
+        self.listbox.bind("<Return>", lambda e: self._pick())
+        for widget in (self.entry, self.listbox):
+            widget.bind("<Escape>", lambda e: self.close())
+            widget.bind("<FocusOut>", lambda e: self.root.after(50, self._close_if_unfocused))
+
+    def is_open(self) -> bool:
+        return self.popup.winfo_viewable()
+
+    def contains(self, widget) -> bool:
+        return str(widget).startswith(str(self.popup))
+
+    def open(self, anchor, priority: list[str], on_select):
+        """anchor の直下に開く。priority (自動推定の候補など) は空入力時に先頭へ並べる。"""
+        self._priority = priority
+        self._on_select = on_select
+        x, y = anchor.winfo_rootx(), anchor.winfo_rooty() + anchor.winfo_height()
+        self.popup.geometry(f"{max(anchor.winfo_width(), 300)}x260+{x}+{y}")
+        self.popup.deiconify()
+        self.popup.lift()
+        self.query_var.set("")
+        self._update_results()
+        self.entry.focus_set()
+
+    def close(self):
+        self._on_select = None
+        self.popup.withdraw()
+
+    def _close_if_unfocused(self):
+        focus = self.popup.focus_get()
+        if focus is None or not self.contains(focus):
+            self.close()
+
+    def _update_results(self):
+        query = self.query_var.get()
+        if self.index is None:
+            results = []
+        elif query.strip():
+            results = self.index.search(query, self.max_results)
+        else:
+            rest = [label for label in self.index.labels if label not in self._priority]
+            results = [self.CLEAR_LABEL] + self._priority + rest
+        self._results = results
+        self.listbox.delete(0, tk.END)
+        if results:
+            self.listbox.insert(tk.END, *results)
+            self.listbox.selection_set(0)
+            self.listbox.activate(0)
+
+    def _move_selection(self, step: int):
+        if not self._results:
+            return
+        current = self.listbox.curselection()
+        index = max(0, min(len(self._results) - 1, (current[0] if current else -1) + step))
+        self.listbox.selection_clear(0, tk.END)
+        self.listbox.selection_set(index)
+        self.listbox.activate(index)
+        self.listbox.see(index)
+
+    def _pick(self):
+        current = self.listbox.curselection()
+        if not current or not self._results:
+            return
+        label = self._results[current[0]]
+        on_select = self._on_select
+        self.close()
+        if on_select:
+            on_select("" if label == self.CLEAR_LABEL else label)
+
 class AmmoMapperApp:
     def __init__(self, root_window, ammo_file_path, munitions_file_path, output_file_path, *, headless: bool = False):
         self.root = root_window
         self.headless = headless
 
-        self.canvas: tk.Canvas | None = None
-        self.content_frame: ttk.Frame | None = None
+        # 行の状態は ammo_to_map (モデル) が持ち、ウィジェットは表示中の行数分だけ作って使い回す
+        self.list_frame: ttk.Frame | None = None
+        self.scrollbar: ttk.Scrollbar | None = None
+        self.row_pool: list[dict] = []
+        self.first_row = 0
+        self.visible_rows = 0
 
         if not self.headless:
             if self.root is None:
@@ -48,6 +157,9 @@ class AmmoMapperApp:
         self.ammo_to_map = []
         self.munitions_ammo_list = []
         self.weapon_records = []
+        self.suggester: AmmoSuggester | None = None
+        self.search_index: MunitionsSearchIndex | None = None
+        self.picker: TargetPicker | None = None
 
         self.ammo_file_path = Path(ammo_file_path)
         self.munitions_file_path = Path(munitions_file_path)
@@ -76,56 +188,156 @@ class AmmoMapperApp:
         main_frame = ttk.Frame(self.root)
         main_frame.pack(fill=tk.BOTH, expand=1, padx=10, pady=5)
 
-        self.canvas = tk.Canvas(main_frame, borderwidth=0)
-        self.content_frame = ttk.Frame(self.canvas)
-        
-        scrollbar = ttk.Scrollbar(main_frame, orient="vertical", command=self.canvas.yview)
-        self.canvas.configure(yscrollcommand=scrollbar.set)
-
-        scrollbar.pack(side="right", fill="y")
-        self.canvas.pack(side="left", fill="both", expand=True)
-        self.canvas.create_window((0, 0), window=self.content_frame, anchor="nw")
-
-        self.content_frame.bind("<Configure>", lambda e: self.canvas.configure(scrollregion=self.canvas.bbox("all")))
-        self.canvas.bind_all("<MouseWheel>", self.on_mouse_wheel)
-
+        header_frame = ttk.Frame(main_frame)
+        header_frame.pack(fill=tk.X)
         headers = ["変換", "ESP名", "元弾薬EditorID", "OMOD (存在する場合優先)", "変換先Munitions弾薬 (FormID | EditorID)"]
         for i, header in enumerate(headers):
-            ttk.Label(self.content_frame, text=header, font=('Helvetica', 10, 'bold')).grid(row=0, column=i, padx=5, pady=(5, 10), sticky="w")
-
-        self.content_frame.grid_columnconfigure(4, weight=1)
+            width = COLUMN_WIDTHS[i] if i < len(COLUMN_WIDTHS) else None
+            ttk.Label(header_frame, text=header, font=('Helvetica', 10, 'bold'), width=width).grid(row=0, column=i, padx=5, pady=(5, 10), sticky="w")
+        header_frame.grid_columnconfigure(4, weight=1)
+
+        body_frame = ttk.Frame(main_frame)
+        body_frame.pack(fill=tk.BOTH, expand=1)
+        self.scrollbar = ttk.Scrollbar(body_frame, orient="vertical", command=self.on_scrollbar)
+        self.scrollbar.pack(side="right", fill="y")
+        self.list_frame = ttk.Frame(body_frame)
+        self.list_frame.pack(side="left", fill="both", expand=True)
+
+        self.list_frame.bind("<Configure>", self.on_list_resize)
+        self.root.bind_all("<MouseWheel>", self.on_mouse_wheel)
+        self.root.bind_all("<Button-4>", self.on_mouse_wheel)
+        self.root.bind_all("<Button-5>", self.on_mouse_wheel)
+        self.picker = TargetPicker(self.root)
 
         button_frame = ttk.Frame(self.root)
         button_frame.pack(fill=tk.X, padx=10, pady=(0, 10))
         
+        suggest_button = ttk.Button(button_frame, text="候補を自動入力", command=self.apply_suggestions)
+        suggest_button.pack(side=tk.LEFT, padx=5, pady=5)
+
         save_button = ttk.Button(button_frame, text="マッピングを保存 (JSON)", command=self.save_mappings_json)
-        save_button.pack(pady=5)
+        save_button.pack(side=tk.LEFT, padx=5, pady=5)
 
     def on_mouse_wheel(self, event):
-        scroll_speed = -1 if os.name == 'posix' else -int(event.delta / 120)
-        self.canvas.yview_scroll(scroll_speed, "units")
+        if self.picker and self.picker.contains(event.widget):
+            return
+        if event.num == 4 or getattr(event, "delta", 0) > 0:
+            self.scroll_to(self.first_row - 3)
+        elif event.num == 5 or getattr(event, "delta", 0) < 0:
+            self.scroll_to(self.first_row + 3)
+
+    def on_scrollbar(self, *args):
+        """スクロールバーからのコマンド ('moveto', fraction) / ('scroll', n, 'units'|'pages') を処理する"""
+        if args[0] == "moveto":
+            self.scroll_to(round(float(args[1]) * len(self.ammo_to_map)))
+        elif args[0] == "scroll":
+            step = int(args[1])
+            if args[2] == "pages":
+                step *= max(1, self.visible_rows - 1)
+            self.scroll_to(self.first_row + step)
+
+    def on_list_resize(self, event):
+        """表示領域の高さに合わせて行ウィジェットのプールを増やし、描き直す"""
+        self.visible_rows = max(1, event.height // ROW_HEIGHT)
+        # 下端で一部だけ見える行の分も確保する
+        while len(self.row_pool) < self.visible_rows + 1:
+            self.row_pool.append(self._create_row_widgets())
+        self.scroll_to(self.first_row)
+
+    def _create_row_widgets(self) -> dict:
+        frame = ttk.Frame(self.list_frame)
+        slot = {"frame": frame, "index": None, "chk_var": tk.BooleanVar()}
+        ttk.Checkbutton(frame, variable=slot["chk_var"], width=COLUMN_WIDTHS[0],
+                        command=lambda: self._on_row_checked(slot)).grid(row=0, column=0, padx=5, sticky="w")
+        slot["labels"] = []
+        for col in range(1, 4):
+            label = ttk.Label(frame, width=COLUMN_WIDTHS[col])
+            label.grid(row=0, column=col, sticky="w", padx=5)
+            slot["labels"].append(label)
+        # 変換先は全行共有の TargetPicker で選ぶ (行ごとに候補リストを持たない)
+        slot["target_var"] = tk.StringVar()
+        target = ttk.Entry(frame, textvariable=slot["target_var"], state="readonly", width=50)
+        target.grid(row=0, column=4, sticky="ew", padx=(5, 0), pady=2)
+        target.bind("<Button-1>", lambda e: self.open_picker(slot))
+        ttk.Button(frame, text="▼", width=2, command=lambda: self.open_picker(slot)).grid(row=0, column=5, padx=(0, 5))
+        slot["target"] = target
+        frame.grid_columnconfigure(4, weight=1)
+        return slot
+
+    def _on_row_checked(self, slot: dict):
+        if slot["index"] is not None:
+            self.ammo_to_map[slot["index"]]["checked"] = slot["chk_var"].get()
+
+    def open_picker(self, slot: dict):
+        """行の変換先を選ぶポップアップを開く。自動推定の候補があれば先頭に並べる。"""
+        index = slot["index"]
+        if index is None or self.picker is None:
+            return
+        row = self.ammo_to_map[index]
+        priority = [s.label for s in row.get("suggestions", [])]
+
+        def on_select(label: str):
+            row["selected_target"] = label
+            self.refresh_rows()
+
+        self.picker.open(slot["target"], priority, on_select)
+
+    def scroll_to(self, first_row: int):
+        """先頭に表示する行を変更し、表示中の行だけをモデルから描き直す"""
+        total = len(self.ammo_to_map)
+        self.first_row = max(0, min(first_row, total - self.visible_rows))
+        if self.picker and self.picker.is_open():
+            self.picker.close()
+        self.refresh_rows()
+
+    def refresh_rows(self):
+        """プール中の各ウィジェットに、現在の表示範囲のモデル行を割り当てる"""
+        if self.list_frame is None:
+            return
+        total = len(self.ammo_to_map)
+        for slot_no, slot in enumerate(self.row_pool):
+            index = self.first_row + slot_no
+            if index >= total:
+                slot["index"] = None
+                slot["frame"].place_forget()
+                continue
+            row = self.ammo_to_map[index]
+            slot["index"] = index
+            slot["chk_var"].set(row["checked"])
+            for label, text in zip(slot["labels"], (row["esp_name"], row["editor_id"], "")):
+                label.configure(text=text)
+            slot["target_var"].set(row["selected_target"])
+            slot["frame"].place(x=0, y=slot_no * ROW_HEIGHT, relwidth=1, height=ROW_HEIGHT)
+        if total:
+            self.scrollbar.set(self.first_row / total, min(1.0, (self.first_row + self.visible_rows) / total))
+        else:
+            self.scrollbar.set(0.0, 1.0)
 
     def reload_data_and_build_ui(self):
         self.ammo_to_map = []
         self.munitions_ammo_list = []
-        for child in self.content_frame.winfo_children():
-            if int(child.grid_info()['row']) > 0:
-                child.destroy()
-        if self.load_data():
-            self.build_ui_rows()
+        self.first_row = 0
+        self.load_data()
+        if self.picker:
+            self.picker.index = self.search_index
+        self.refresh_rows()
 
     def load_data(self):
         """INI形式の弾薬リストを読み込む"""
         try:
             # Munitions弾薬リスト
             parser = configparser.ConfigParser()
-            parser.read(self.munitions_file_path, encoding=locale.getpreferredencoding())
+            if self.munitions_file_path.is_file():
+                parser.read_string(read_text_auto(self.munitions_file_path))
             if parser.has_section('MunitionsAmmo'):
                 self.munitions_ammo_list = [f"{form_id.upper()} | {editor_id}" for form_id, editor_id in parser.items('MunitionsAmmo')]
                 self.munitions_ammo_list.sort()
+            self.suggester = AmmoSuggester.from_labels(self.munitions_ammo_list)
+            self.search_index = MunitionsSearchIndex(self.munitions_ammo_list)
             
             # 変換元弾薬リスト
-            parser.read(self.ammo_file_path, encoding=locale.getpreferredencoding())
+            if self.ammo_file_path.is_file():
+                parser.read_string(read_text_auto(self.ammo_file_path))
             if parser.has_section('UnmappedAmmo'):
                 exclude_list = ['Fallout4.esm', 'Munitions - An Ammo Expansion.esl', 'DLCRobot.esm', 'DLCCoast.esm', 'DLCNukaWorld.esm']
                 for original_form_id, details_part in parser.items('UnmappedAmmo'):
@@ -137,27 +349,35 @@ class AmmoMapperApp:
                         "original_form_id": original_form_id.upper(),
                         "esp_name": esp_name,
                         "editor_id": details[1].strip() if len(details) > 1 else "(不明)",
-                        "widgets": {},
-                        "omods_info": [] # 将来の拡張用
+                        "omods_info": [], # 将来の拡張用
+                        "checked": False,
+                        "selected_target": "",
                     })
             return True
         except Exception as e:
             messagebox.showerror("エラー", f"ファイルの読み込みに失敗しました:\n{e}")
             return False
 
-    def build_ui_rows(self):
-        """データに基づいてUIの行を動的に構築する"""
-        munitions_list_with_blank = [""] + self.munitions_ammo_list
-        for index, ammo_data in enumerate(self.ammo_to_map):
-            row_num = index + 1
-            chk_var = tk.BooleanVar()
-            ttk.Checkbutton(self.content_frame, variable=chk_var).grid(row=row_num, column=0, padx=(5, 10))
-            ttk.Label(self.content_frame, text=ammo_data["esp_name"]).grid(row=row_num, column=1, sticky="w", padx=5)
-            ttk.Label(self.content_frame, text=ammo_data["editor_id"]).grid(row=row_num, column=2, sticky="w", padx=5)
-            ttk.Label(self.content_frame, text="").grid(row=row_num, column=3, sticky="w", padx=5) # OMODプレースホルダー
-            combo = ttk.Combobox(self.content_frame, values=munitions_list_with_blank, state="readonly", width=50)
-            combo.grid(row=row_num, column=4, sticky="ew", padx=5, pady=2)
-            ammo_data['widgets'] = {'chk_var': chk_var, 'combo': combo}
+    def apply_suggestions(self, min_score: float = 0.3, k: int = 3) -> int:
+        """
+        未選択の各行について Munitions 弾薬の候補を一括で推定し、最上位候補を選択状態にする。
+        候補は ammo_data['suggestions'] にも保持する。選択した行数を返す。
+        """
+        if not self.suggester or not self.ammo_to_map:
+            return 0
+        all_suggestions = self.suggester.suggest_many([row["editor_id"] for row in self.ammo_to_map], k)
+        applied = 0
+        for ammo_data, suggestions in zip(self.ammo_to_map, all_suggestions):
+            ammo_data["suggestions"] = suggestions
+            if not suggestions or suggestions[0].score < min_score or ammo_data["selected_target"]:
+                continue
+            ammo_data["selected_target"] = suggestions[0].label
+            ammo_data["checked"] = True
+            applied += 1
+        if not self.headless:
+            self.refresh_rows()
+            messagebox.showinfo("候補の自動入力", f"{applied} / {len(self.ammo_to_map)} 行に候補を入力しました。\n内容を確認してから保存してください。")
+        return applied
 
     def save_mappings_json(self) -> bool:
         """ユーザーの選択に基づいてammo_map.jsonを生成・保存する。"""
@@ -168,12 +388,10 @@ class AmmoMapperApp:
         has_error = False
 
         for index, ammo_data in enumerate(self.ammo_to_map):
-            widgets = ammo_data.get("widgets", {})
-            chk_var = widgets.get("chk_var")
-            if not (chk_var and chk_var.get()):
+            if not ammo_data["checked"]:
                 continue
 
-            selected_ammo = widgets.get("combo").get()
+            selected_ammo = ammo_data["selected_target"]
             if not selected_ammo:
                 messagebox.showerror("エラー", f"行 {index + 1}: {ammo_data['editor_id']} の変換先が選択されていません")
                 has_error = True
@@ -0,0 +1,204 @@
+# -*- coding: utf-8 -*-
+# munitions_lookup.py — Munitions 弾薬の検索・マッピング候補提示
+#
+# 変換元弾薬の EditorID から、対応しそうな Munitions 弾薬を推定する。
+# 口径表記の揺れ (5.56 / 556 / 5_56、12g / 12gauge など) を正規化したうえで、
+# Munitions 側 EditorID の文字 n-gram 転置インデックスを引いてスコア付けする。
+# あわせて、mapper の絞り込み入力用に接頭辞/部分文字列の検索インデックスを提供する。
+
+from __future__ import annotations
+import re
+from bisect import bisect_left
+from collections import Counter
+from dataclasses import dataclass
+
+# 口径・弾種の比較に寄与しない語
+_NOISE_WORDS = re.compile(r"munitions|ammo|caliber|calibre|cartridge|round|shell")
+# 数字の間の区切り (5.56 / 5_56 / 5-56 / 5 56 -> 556)
+_DIGIT_SEPARATOR = re.compile(r"(?<=\d)[._\-\s](?=\d)")
+# ゲージ表記 (12gauge / 12 ga / 12g -> 12g)
+_GAUGE = re.compile(r"(\d+)\s*(?:gauge|ga|g)(?![a-z])")
+# 口径 (.308 / 308cal -> 308)
+_CAL_SUFFIX = re.compile(r"(\d+)\s*cal(?![a-z])")
+_NON_ALNUM = re.compile(r"[^0-9a-z]+")
+_NUMBER_TOKEN = re.compile(r"\d+")
+# EditorID 内の単語の開始位置 (Mun_Ammo_556 / AmmoShotgunShell / Ammo10mm)
+_WORD_START = re.compile(r"(?<=[_\-\s.])[A-Za-z0-9]|(?<=[a-z])[A-Z]|(?<=[A-Za-z])[0-9]")
+
+def normalize_ammo_name(editor_id: str) -> str:
+    """EditorID を比較用に正規化する。口径表記の揺れを吸収し、英数字のみを残す。"""
+    s = (editor_id or "").replace("\u00a0", " ").lower()
+    s = _NOISE_WORDS.sub(" ", s)
+    s = _DIGIT_SEPARATOR.sub("", s)
+    s = _GAUGE.sub(r"\1g", s)
+    s = _CAL_SUFFIX.sub(r"\1", s)
+    return _NON_ALNUM.sub("", s)
+
+def _ngrams(text: str, n: int) -> set[str]:
+    padded = f"^{text}$"
+    if len(padded) <= n:
+        return {padded}
+    return {padded[i:i + n] for i in range(len(padded) - n + 1)}
+
+@dataclass(frozen=True)
+class Suggestion:
+    """マッピング候補 1 件。"""
+    formid: str
+    editor_id: str
+    score: float
+
+    @property
+    def label(self) -> str:
+        """mapper の変換先欄と同じ 'FORMID | EditorID' 形式。"""
+        return f"{self.formid} | {self.editor_id}"
+
+class AmmoSuggester:
+    """Munitions 弾薬 EditorID の n-gram 転置インデックス。"""
+
+    def __init__(self, candidates: list[tuple[str, str]], n: int = 3):
+        """candidates は (FormID, EditorID) のリスト。"""
+        self.n = n
+        self._candidates = list(candidates)
+        self._sizes: list[int] = []
+        self._numbers: list[set[str]] = []
+        self._index: dict[str, list[int]] = {}
+        for idx, (_, editor_id) in enumerate(self._candidates):
+            norm = normalize_ammo_name(editor_id)
+            grams = _ngrams(norm, n)
+            self._sizes.append(len(grams))
+            self._numbers.append(set(_NUMBER_TOKEN.findall(norm)))
+            for gram in grams:
+                self._index.setdefault(gram, []).append(idx)
+
+    @classmethod
+    def from_labels(cls, labels: list[str], n: int = 3) -> "AmmoSuggester":
+        """'FORMID | EditorID' 形式の文字列リストから作る。"""
+        candidates = []
+        for label in labels:
+            formid, _, editor_id = label.partition("|")
+            candidates.append((formid.strip(), editor_id.strip()))
+        return cls(candidates, n)
+
+    def suggest(self, editor_id: str, k: int = 3) -> list[Suggestion]:
+        """1 件の EditorID について上位 k 件の候補を返す。"""
+        return self.suggest_many([editor_id], k)[0]
+
+    def suggest_many(self, editor_ids: list[str], k: int = 3) -> list[list[Suggestion]]:
+        """
+        複数の EditorID について、それぞれ上位 k 件の候補をまとめて返す。
+        スコアは n-gram の Dice 係数に、口径などの数字トークンの一致度を加減したもの。
+        正規化後に同じ文字列になる問い合わせは 1 回だけ計算する。
+        """
+        memo: dict[str, list[Suggestion]] = {}
+        results = []
+        for editor_id in editor_ids:
+            norm = normalize_ammo_name(editor_id)
+            if norm not in memo:
+                memo[norm] = self._score(norm, k)
+            results.append(memo[norm])
+        return results
+
+    def _score(self, norm: str, k: int) -> list[Suggestion]:
+        if not norm:
+            return []
+        grams = _ngrams(norm, self.n)
+        overlap: Counter[int] = Counter()
+        for gram in grams:
+            for idx in self._index.get(gram, ()):
+                overlap[idx] += 1
+        numbers = set(_NUMBER_TOKEN.findall(norm))
+
+        scored = []
+        for idx, common in overlap.items():
+            score = 2.0 * common / (len(grams) + self._sizes[idx])
+            cand_numbers = self._numbers[idx]
+            if numbers and cand_numbers:
+                shared = numbers & cand_numbers
+                if shared:
+                    score += 0.5 * len(shared) / len(numbers | cand_numbers)
+                else:
+                    # 口径が明示されていて食い違う候補は下げる
+                    score -= 0.25
+            scored.append((score, idx))
+        scored.sort(key=lambda item: (-item[0], self._candidates[item[1]][1]))
+        return [
+            Suggestion(self._candidates[idx][0], self._candidates[idx][1], round(score, 4))
+            for score, idx in scored[:k] if score > 0
+        ]
+
+# 検索結果の順位 (小さいほど上位)
+_RANK_EXACT = 0
+_RANK_PREFIX = 1
+_RANK_WORD_PREFIX = 2
+_RANK_SUBSTRING = 3
+
+class MunitionsSearchIndex:
+    """
+    'FORMID | EditorID' 形式のラベル群に対する絞り込み検索インデックス。
+    FormID / EditorID / EditorID 内の各単語の先頭をキーにした整列済み配列 (接頭辞検索) と、
+    文字 trigram の転置インデックス (部分文字列検索) を持つ。
+    """
+
+    def __init__(self, labels: list[str]):
+        self.labels = list(labels)
+        self._texts: list[str] = []
+        keys: list[tuple[str, int, int]] = []
+        self._grams: dict[str, set[int]] = {}
+        for idx, label in enumerate(self.labels):
+            formid, _, editor_id = label.partition("|")
+            formid, editor_id = formid.strip(), editor_id.strip()
+            keys.append((formid.lower(), idx, _RANK_PREFIX))
+            keys.append((editor_id.lower(), idx, _RANK_PREFIX))
+            for m in _WORD_START.finditer(editor_id):
+                keys.append((editor_id[m.start():].lower(), idx, _RANK_WORD_PREFIX))
+            text = f"{formid} {editor_id}".lower()
+            self._texts.append(text)
+            for i in range(len(text) - 2):
+                self._grams.setdefault(text[i:i + 3], set()).add(idx)
+        keys.sort()
+        self._keys = [key for key, _, _ in keys]
+        self._key_entries = [(idx, rank) for _, idx, rank in keys]
+
+    def _token_ranks(self, token: str) -> dict[int, int]:
+        """1 語について、一致したラベル番号 -> 最良の順位 を返す。"""
+        ranks: dict[int, int] = {}
+        lo = bisect_left(self._keys, token)
+        hi = bisect_left(self._keys, token + "\uffff", lo)
+        for key, (idx, rank) in zip(self._keys[lo:hi], self._key_entries[lo:hi]):
+            rank = _RANK_EXACT if key == token else rank
+            if rank < ranks.get(idx, _RANK_SUBSTRING + 1):
+                ranks[idx] = rank
+
+        if len(token) >= 3:
+            candidates = None
+            for i in range(len(token) - 2):
+                found = self._grams.get(token[i:i + 3], set())
+                candidates = found if candidates is None else candidates & found
+                if not candidates:
+                    break
+        else:
+            candidates = range(len(self.labels))
+        for idx in candidates or ():
+            if idx not in ranks and token in self._texts[idx]:
+                ranks[idx] = _RANK_SUBSTRING
+        return ranks
+
+    def search(self, query: str, limit: int | None = 50) -> list[str]:
+        """
+        空白区切りの全語を含むラベルを、一致の質 (完全一致 > 接頭辞 > 単語の先頭 > 部分一致) の順に返す。
+        空の問い合わせでは全ラベルを元の順序で返す。
+        """
+        tokens = query.lower().split()
+        if not tokens:
+            return self.labels[:limit]
+        scores: dict[int, int] | None = None
+        for token in tokens:
+            ranks = self._token_ranks(token)
+            if scores is None:
+                scores = ranks
+            else:
+                scores = {idx: score + ranks[idx] for idx, score in scores.items() if idx in ranks}
+            if not scores:
+                return []
+        ordered = sorted(scores, key=lambda idx: (scores[idx], len(self.labels[idx]), self.labels[idx]))
+        return [self.labels[idx] for idx in ordered[:limit]]
@@ -0,0 +1,241 @@
+# -*- coding: utf-8 -*-
+# profiling.py — ステージ・処理単位の時間とメモリの計測
+#
+# span("名前") で囲んだ区間 (または @profiled を付けた関数) ごとに、経過時間・
+# CPU 時間 (そのスレッドの分)・tracemalloc のピークを記録する。
+# 計測は Profiler.activate() の with ブロック内でだけ行い、それ以外では span は何もしない。
+# 結果は run_profile.json (区間の一覧と名前ごとの集計) と、chrome://tracing や
+# Perfetto で開ける Chrome トレース形式 (run_trace.json) に書き出せる。
+
+from __future__ import annotations
+import functools
+import json
+import logging
+import os
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+from dataclasses import asdict, dataclass
+from typing import Callable, Iterator, Optional
+
+PROFILE_FILE = 'run_profile.json'
+TRACE_FILE = 'run_trace.json'
+
+_active: Optional["Profiler"] = None
+_NULL = nullcontext()
+
+@dataclass(frozen=True)
+class SpanRecord:
+    """
+    計測した区間 1 件。時刻・時間はミリ秒、start_ms は計測開始からの経過。
+    mem_peak_kib は区間中の tracemalloc のピーク (プロセス全体の値)、
+    mem_delta_kib は区間の前後での確保量の差。メモリを計測しない場合はどちらも None。
+    """
+    name: str
+    parent: Optional[int]
+    depth: int
+    thread: int
+    start_ms: float
+    wall_ms: float
+    cpu_ms: float
+    mem_peak_kib: Optional[float]
+    mem_delta_kib: Optional[float]
+    ok: bool
+
+class _Span:
+    __slots__ = ('profiler', 'name', 'index', 'parent', 'depth', 'start', 'cpu_start',
+                 'mem_start', 'peak_seen')
+
+    def __init__(self, profiler: "Profiler", name: str):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.profiler._enter(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.profiler._exit(self, exc_type is None)
+        return False
+
+class Profiler:
+    """
+    1 回の実行の計測結果を集める。区間の入れ子はスレッドごとに管理する。
+    trace_memory が真なら、計測中は tracemalloc を有効にする。Python 側の処理が
+    5 倍程度遅くなるため、メモリを調べるときだけ有効にする。
+    """
+
+    def __init__(self, label: str, trace_memory: bool = False):
+        self.label = label
+        self.trace_memory = trace_memory
+        self.records: list[Optional[SpanRecord]] = []
+        self.started_at = time.time()
+        self._origin = time.perf_counter()
+        self._wall = 0.0
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._started_tracemalloc = False
+
+    # ---- 区間 ----
+
+    def span(self, name: str) -> _Span:
+        return _Span(self, name)
+
+    def _stack(self) -> list[_Span]:
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def _enter(self, span: _Span):
+        stack = self._stack()
+        parent = stack[-1] if stack else None
+        with self._lock:
+            span.index = len(self.records)
+            self.records.append(None)
+        span.parent = parent.index if parent else None
+        span.depth = len(stack)
+        if self.trace_memory and tracemalloc.is_tracing():
+            current, peak = tracemalloc.get_traced_memory()
+            # 区間ごとのピークを取るためにリセットするので、外側の区間のピークは控えておく
+            for open_span in stack:
+                open_span.peak_seen = max(open_span.peak_seen, peak)
+            tracemalloc.reset_peak()
+            span.mem_start = current
+            span.peak_seen = current
+        else:
+            span.mem_start = None
+        stack.append(span)
+        span.cpu_start = time.thread_time()
+        span.start = time.perf_counter()
+
+    def _exit(self, span: _Span, ok: bool):
+        end = time.perf_counter()
+        cpu = time.thread_time() - span.cpu_start
+        stack = self._stack()
+        if stack and stack[-1] is span:
+            stack.pop()
+        peak_kib = delta_kib = None
+        if span.mem_start is not None and tracemalloc.is_tracing():
+            current, peak = tracemalloc.get_traced_memory()
+            span.peak_seen = max(span.peak_seen, peak)
+            for open_span in stack:
+                open_span.peak_seen = max(open_span.peak_seen, span.peak_seen)
+            peak_kib = span.peak_seen / 1024
+            delta_kib = (current - span.mem_start) / 1024
+        self.records[span.index] = SpanRecord(
+            name=span.name, parent=span.parent, depth=span.depth, thread=threading.get_ident(),
+            start_ms=(span.start - self._origin) * 1000, wall_ms=(end - span.start) * 1000, cpu_ms=cpu * 1000,
+            mem_peak_kib=peak_kib, mem_delta_kib=delta_kib, ok=ok,
+        )
+
+    # ---- 計測の開始・終了 ----
+
+    @contextmanager
+    def activate(self) -> Iterator["Profiler"]:
+        """with ブロック内で span() / @profiled の計測先をこの Profiler にする。"""
+        global _active
+        previous = _active
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracemalloc = True
+        self.started_at = time.time()
+        self._origin = time.perf_counter()
+        _active = self
+        try:
+            with self.span(self.label):
+                yield self
+        finally:
+            _active = previous
+            self._wall = time.perf_counter() - self._origin
+            if self._started_tracemalloc:
+                tracemalloc.stop()
+                self._started_tracemalloc = False
+
+    # ---- 書き出し ----
+
+    def spans(self) -> list[SpanRecord]:
+        """終了した区間を開始順に返す (計測中の区間は含まない)。"""
+        return [r for r in self.records if r is not None]
+
+    def summary(self) -> dict[str, dict]:
+        """区間名ごとの回数・合計時間・最大ピーク。"""
+        totals: dict[str, dict] = {}
+        for r in self.spans():
+            t = totals.setdefault(r.name, {'count': 0, 'wall_ms': 0.0, 'cpu_ms': 0.0, 'mem_peak_kib': None})
+            t['count'] += 1
+            t['wall_ms'] += r.wall_ms
+            t['cpu_ms'] += r.cpu_ms
+            if r.mem_peak_kib is not None:
+                t['mem_peak_kib'] = max(t['mem_peak_kib'] or 0.0, r.mem_peak_kib)
+        return totals
+
+    def to_dict(self) -> dict:
+        return {
+            'label': self.label,
+            'started_at': time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(self.started_at)),
+            'wall_ms': round(self._wall * 1000, 3),
+            'trace_memory': self.trace_memory,
+            'spans': [_rounded(asdict(r)) for r in self.spans()],
+            'summary': {name: _rounded(t) for name, t in self.summary().items()},
+        }
+
+    def to_chrome_trace(self) -> dict:
+        """Chrome トレース形式 (Trace Event Format) の辞書。"""
+        pid = os.getpid()
+        events = [{'name': 'process_name', 'ph': 'M', 'pid': pid, 'tid': 0, 'args': {'name': self.label}}]
+        for r in self.spans():
+            args = {'cpu_ms': round(r.cpu_ms, 3), 'ok': r.ok}
+            if r.mem_peak_kib is not None:
+                args.update(mem_peak_kib=round(r.mem_peak_kib, 1), mem_delta_kib=round(r.mem_delta_kib, 1))
+            events.append({'name': r.name, 'cat': r.name.split('.', 1)[0], 'ph': 'X', 'pid': pid, 'tid': r.thread,
+                           'ts': round(r.start_ms * 1000, 1), 'dur': round(r.wall_ms * 1000, 1), 'args': args})
+            if r.mem_peak_kib is not None:
+                events.append({'name': 'tracemalloc', 'ph': 'C', 'pid': pid, 'tid': r.thread,
+                               'ts': round((r.start_ms + r.wall_ms) * 1000, 1),
+                               'args': {'peak_kib': round(r.mem_peak_kib, 1)}})
+        return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+    def log_summary(self, limit: int = 10):
+        """時間のかかった区間名を上位 limit 件ログに出す。"""
+        totals = sorted(self.summary().items(), key=lambda kv: kv[1]['wall_ms'], reverse=True)
+        for name, t in totals[:limit]:
+            mem = f", peak {t['mem_peak_kib'] / 1024:.1f} MiB" if t['mem_peak_kib'] is not None else ''
+            logging.info(f"[Profile] {name}: {t['wall_ms'] / 1000:.2f}s (CPU {t['cpu_ms'] / 1000:.2f}s, "
+                         f"{t['count']}回{mem})")
+
+def _rounded(d: dict) -> dict:
+    return {k: round(v, 3) if isinstance(v, float) else v for k, v in d.items()}
+
+def dumps_profile(profiler: Profiler) -> str:
+    return json.dumps(profiler.to_dict(), ensure_ascii=False, indent=2)
+
+def dumps_trace(profiler: Profiler) -> str:
+    return json.dumps(profiler.to_chrome_trace(), ensure_ascii=False, separators=(',', ':'))
+
+# ---- 計測する側の API ----
+
+def active() -> Optional[Profiler]:
+    """計測中の Profiler (なければ None)。"""
+    return _active
+
+def span(name: str):
+    """計測中なら区間を記録するコンテキストマネージャ、そうでなければ何もしないものを返す。"""
+    profiler = _active
+    return profiler.span(name) if profiler is not None else _NULL
+
+def profiled(name: Optional[str] = None) -> Callable:
+    """関数の呼び出しを 1 つの区間として計測するデコレータ。name を省略すると関数の修飾名を使う。"""
+    def decorator(func):
+        span_name = name or func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            profiler = _active
+            if profiler is None:
+                return func(*args, **kwargs)
+            with profiler.span(span_name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
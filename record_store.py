@@ -0,0 +1,493 @@
+# -*- coding: utf-8 -*-
+# record_store.py — 抽出データ (武器・OMOD・弾薬・Leveled List) のバイナリコンテナ
+#
+# xEdit から抽出した表を、固定幅 (uint32) の列と文字列表からなる 1 ファイルにまとめる。
+# mmap で開いて列を memoryview としてそのまま参照するため、読み込み時に
+# JSON の構文解析や dict の大量生成が起きない。行は参照されたときに初めて組み立てる。
+#
+# ファイル構成 (リトルエンディアン):
+#   ヘッダー 32 バイト  MAGIC(8) / バージョン u32 / 予約 u32 / ディレクトリ位置 u64 / ディレクトリ長 u64
+#   列データ            u32 の配列 (8 バイト境界に整列)
+#   文字列表            UTF-8 文字列を連結したものと、その開始位置の u32 配列 (件数 + 1)
+#   ディレクトリ        表・列・文字列表の位置を記した JSON
+#
+# 列の種類:
+#   formid  8 桁大文字 16 進の FormID を数値で保持
+#   str     文字列表の番号
+#   json    文字列・FormID 以外の値 (数値・真偽値など) を JSON 文字列として文字列表に保持
+# どの種類でも 0xFFFFFFFF はキーが存在しないことを表す。
+# 値が dict の配列になっているキー (武器の omods など) は子表 "<表名>.<キー>" に分け、
+# 親の各行から子表の開始行と行数で参照する。
+
+from __future__ import annotations
+import configparser
+import csv
+import json
+import logging
+import mmap
+import re
+import struct
+import sys
+from array import array
+from collections.abc import Mapping, Sequence
+from pathlib import Path
+from typing import Iterable, Iterator, Optional
+
+from utils import atomic_output, read_text_auto, open_text_auto
+
+MAGIC = b'MAPRECS\0'
+FORMAT_VERSION = 1
+EXTRACTION_FILE = 'extraction.mrec'
+ABSENT = 0xFFFFFFFF
+
+_HEADER = struct.Struct('<8sIIQQ')
+_FORMID = re.compile(r'[0-9A-F]{8}')
+_LITTLE_ENDIAN = sys.byteorder == 'little'
+
+class RecordStoreError(ValueError):
+    """コンテナの形式が不正、またはバージョンが合わないことを表す。"""
+
+# ---- 書き込み ----
+
+class _StringTable:
+    def __init__(self):
+        self.ids: dict[str, int] = {}
+        self.values: list[str] = []
+
+    def add(self, value: str) -> int:
+        sid = self.ids.get(value)
+        if sid is None:
+            sid = self.ids[value] = len(self.values)
+            self.values.append(value)
+        return sid
+
+def _column_kind(values: list) -> str:
+    present = [v for v in values if v is not _MISSING]
+    if present and all(isinstance(v, str) and _FORMID.fullmatch(v) and v != 'FFFFFFFF' for v in present):
+        return 'formid'
+    if all(isinstance(v, str) for v in present):
+        return 'str'
+    return 'json'
+
+_MISSING = object()
+
+def _encode_column(values: list, kind: str, strings: _StringTable) -> array:
+    col = array('I')
+    for v in values:
+        if v is _MISSING:
+            col.append(ABSENT)
+        elif kind == 'formid':
+            col.append(int(v, 16))
+        elif kind == 'str':
+            col.append(strings.add(v))
+        else:
+            col.append(strings.add(json.dumps(v, ensure_ascii=False)))
+    return col
+
+def _flatten_tables(name: str, rows: list[dict], out: dict[str, dict]):
+    """rows を列ごとの値リストに分解する。dict の配列を値に持つキーは子表に分ける。"""
+    keys: list[str] = []
+    seen = set()
+    for row in rows:
+        for k in row:
+            if k not in seen:
+                seen.add(k)
+                keys.append(k)
+    child_keys = {
+        k for k in keys
+        if all(isinstance(row[k], list) and all(isinstance(c, dict) for c in row[k]) for row in rows if k in row)
+    }
+    table = {'keys': keys, 'columns': {}, 'children': {}}
+    out[name] = table
+    for k in keys:
+        if k in child_keys:
+            starts, counts, child_rows = array('I'), array('I'), []
+            for row in rows:
+                if k in row:
+                    starts.append(len(child_rows))
+                    counts.append(len(row[k]))
+                    child_rows.extend(row[k])
+                else:
+                    starts.append(ABSENT)
+                    counts.append(0)
+            child_name = f'{name}.{k}'
+            table['children'][k] = {'table': child_name, 'start': starts, 'count': counts}
+            _flatten_tables(child_name, child_rows, out)
+        else:
+            table['columns'][k] = [row.get(k, _MISSING) for row in rows]
+    table['rows'] = len(rows)
+
+def write_store(path: Path, tables: dict[str, list[dict]], meta: Optional[dict] = None) -> Path:
+    """tables (表名 -> 行 dict のリスト) をコンテナに書き出す。書き込みはアトミックに行う。"""
+    flat: dict[str, dict] = {}
+    for name, rows in tables.items():
+        _flatten_tables(name, list(rows), flat)
+
+    strings = _StringTable()
+    arrays: list[array] = []
+    directory = {'meta': meta or {}, 'tables': {}}
+    offset = _HEADER.size
+
+    def place(col: array) -> int:
+        nonlocal offset
+        start = offset
+        arrays.append(col)
+        offset += col.itemsize * len(col)
+        pad = -offset % 8
+        if pad:
+            arrays.append(array('B', bytes(pad)))
+            offset += pad
+        return start
+
+    for name, table in flat.items():
+        entry = {'rows': table['rows'], 'keys': table['keys'], 'columns': {}, 'children': {}}
+        for key, values in table['columns'].items():
+            kind = _column_kind(values)
+            entry['columns'][key] = {'kind': kind, 'offset': place(_encode_column(values, kind, strings))}
+        for key, child in table['children'].items():
+            entry['children'][key] = {'table': child['table'], 'start': place(child['start']), 'count': place(child['count'])}
+        directory['tables'][name] = entry
+
+    encoded = [s.encode('utf-8') for s in strings.values]
+    starts = array('I', [0])
+    for b in encoded:
+        starts.append(starts[-1] + len(b))
+    directory['strings'] = {'count': len(encoded), 'starts': place(starts)}
+    blob = b''.join(encoded)
+    directory['strings']['data'] = offset
+    offset += len(blob)
+    dir_bytes = json.dumps(directory, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+    with atomic_output(path, 'wb') as f:
+        f.write(_HEADER.pack(MAGIC, FORMAT_VERSION, 0, offset, len(dir_bytes)))
+        for col in arrays:
+            if not _LITTLE_ENDIAN and col.typecode == 'I':
+                col = array('I', col)
+                col.byteswap()
+            col.tofile(f)
+        f.write(blob)
+        f.write(dir_bytes)
+    return Path(path)
+
+# ---- 読み込み ----
+
+class RecordStore:
+    """mmap で開いたコンテナ。tables[表名] で Table を引く。"""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        with open(self.path, 'rb') as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            magic, version, _, dir_offset, dir_length = _HEADER.unpack_from(self._mm, 0)
+            if magic != MAGIC:
+                raise RecordStoreError(f"{self.path.name} はレコードコンテナではありません")
+            if version != FORMAT_VERSION:
+                raise RecordStoreError(f"{self.path.name} の形式バージョン {version} には対応していません")
+            directory = json.loads(self._mm[dir_offset:dir_offset + dir_length].decode('utf-8'))
+        except RecordStoreError:
+            self._mm.close()
+            raise
+        except (struct.error, ValueError) as e:
+            self._mm.close()
+            raise RecordStoreError(f"{self.path.name} を読めません: {e}") from e
+        self._view = memoryview(self._mm)
+        self.meta: dict = directory.get('meta', {})
+        info = directory['strings']
+        self._string_count = info['count']
+        self._string_starts = self._u32(info['starts'], info['count'] + 1)
+        self._string_data = info['data']
+        self._string_cache: dict[int, str] = {}
+        self._table_info: dict[str, dict] = directory['tables']
+        self.tables = {name: Table(self, name, entry) for name, entry in self._table_info.items()}
+
+    def _u32(self, offset: int, count: int):
+        view = self._view[offset:offset + 4 * count]
+        if _LITTLE_ENDIAN:
+            return view.cast('I')
+        col = array('I', view.tobytes())
+        col.byteswap()
+        return col
+
+    def string(self, sid: int) -> str:
+        s = self._string_cache.get(sid)
+        if s is None:
+            start = self._string_data + self._string_starts[sid]
+            end = self._string_data + self._string_starts[sid + 1]
+            s = self._string_cache[sid] = str(self._view[start:end], 'utf-8')
+        return s
+
+    def close(self):
+        for table in self.tables.values():
+            table._release()
+        if isinstance(self._string_starts, memoryview):
+            self._string_starts.release()
+        self._view.release()
+        self._mm.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+class Table(Sequence):
+    """表 1 つ。行は Row (読み取り専用の Mapping) として参照時に組み立てる。"""
+
+    def __init__(self, store: RecordStore, name: str, entry: dict):
+        self.store = store
+        self.name = name
+        self.keys = entry['keys']
+        self._rows = entry['rows']
+        self._columns = {k: (c['kind'], store._u32(c['offset'], self._rows)) for k, c in entry['columns'].items()}
+        self._children = {
+            k: (c['table'], store._u32(c['start'], self._rows), store._u32(c['count'], self._rows))
+            for k, c in entry['children'].items()
+        }
+
+    def __len__(self) -> int:
+        return self._rows
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [Row(self, i) for i in range(*index.indices(self._rows))]
+        if index < 0:
+            index += self._rows
+        if not 0 <= index < self._rows:
+            raise IndexError(index)
+        return Row(self, index)
+
+    def __iter__(self) -> Iterator["Row"]:
+        for i in range(self._rows):
+            yield Row(self, i)
+
+    def value(self, row: int, key: str, default=None):
+        col = self._columns.get(key)
+        if col is not None:
+            kind, data = col
+            raw = data[row]
+            if raw == ABSENT:
+                return default
+            return self._decode(kind, raw)
+        child = self._children.get(key)
+        if child is not None:
+            child_name, starts, counts = child
+            start = starts[row]
+            if start == ABSENT:
+                return default
+            return self.store.tables[child_name][start:start + counts[row]]
+        return default
+
+    def _decode(self, kind: str, raw: int):
+        if kind == 'formid':
+            return f'{raw:08X}'
+        if kind == 'str':
+            return self.store.string(raw)
+        return json.loads(self.store.string(raw))
+
+    def has(self, row: int, key: str) -> bool:
+        col = self._columns.get(key)
+        if col is not None:
+            return col[1][row] != ABSENT
+        child = self._children.get(key)
+        return child is not None and child[1][row] != ABSENT
+
+    def kind(self, key: str) -> Optional[str]:
+        """列の種類 ('formid' / 'str' / 'json')。列がなければ None。"""
+        col = self._columns.get(key)
+        return col[0] if col is not None else None
+
+    def column(self, key: str):
+        """formid / str 列の生の uint32 配列 (memoryview)。"""
+        return self._columns[key][1]
+
+    def distinct(self, key: str) -> set:
+        """formid / str 列の値の集合。同じ値は 1 回だけ復号する。列がなければ空集合。"""
+        col = self._columns.get(key)
+        if col is None:
+            return set()
+        kind, data = col
+        if kind == 'json':
+            raise TypeError(f"json 列 '{key}' の値は集合にできません")
+        raws = set(data)
+        raws.discard(ABSENT)
+        return {self._decode(kind, raw) for raw in raws}
+
+    def to_dicts(self) -> list[dict]:
+        return [row.to_dict() for row in self]
+
+    def _release(self):
+        for _, data in self._columns.values():
+            if isinstance(data, memoryview):
+                data.release()
+        for _, starts, counts in self._children.values():
+            for data in (starts, counts):
+                if isinstance(data, memoryview):
+                    data.release()
+
+class Row(Mapping):
+    """表の 1 行。dict と同じように get / [] / in / 反復で参照できる。"""
+    __slots__ = ('_table', '_index')
+
+    def __init__(self, table: Table, index: int):
+        self._table = table
+        self._index = index
+
+    def __getitem__(self, key):
+        if not self._table.has(self._index, key):
+            raise KeyError(key)
+        return self._table.value(self._index, key)
+
+    def get(self, key, default=None):
+        return self._table.value(self._index, key, default)
+
+    def __contains__(self, key) -> bool:
+        return self._table.has(self._index, key)
+
+    def __iter__(self):
+        return (k for k in self._table.keys if self._table.has(self._index, k))
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def to_dict(self) -> dict:
+        out = {}
+        for k in self:
+            v = self[k]
+            out[k] = [c.to_dict() for c in v] if isinstance(v, list) else v
+        return out
+
+    def __repr__(self):
+        return f"Row({self.to_dict()!r})"
+
+def open_store(path: Path) -> RecordStore:
+    return RecordStore(path)
+
+# ---- 既存形式との変換 ----
+
+def _source_stamp(path: Path) -> dict:
+    st = path.stat()
+    return {'path': path.name, 'size': st.st_size, 'mtime_ns': st.st_mtime_ns}
+
+def is_table_fresh(store: RecordStore, table: str, source: Path) -> bool:
+    """
+    table が source の現在の内容から作られたものか (サイズと更新時刻で判定)。
+    source がなければ、コンテナが古いかどうか確かめられないので偽とする。
+    """
+    if table not in store.tables:
+        return False
+    stamp = store.meta.get('sources', {}).get(table)
+    if not stamp:
+        return False
+    if not source.is_file():
+        return False
+    st = source.stat()
+    return stamp['size'] == st.st_size and stamp['mtime_ns'] == st.st_mtime_ns
+
+def read_ini_table(path: Path, section: str, fields: tuple[str, ...]) -> list[dict]:
+    """
+    'FORMID=値1|値2...' 形式の INI セクションを行のリストにする。
+    munitions_ammo_ids.ini ([MunitionsAmmo] formid=editor_id) や
+    unique_ammo_for_mapping.ini ([UnmappedAmmo] formid=plugin|editor_id) に使う。
+    """
+    parser = configparser.ConfigParser(interpolation=None)
+    parser.optionxform = str
+    parser.read_string(read_text_auto(path))
+    rows = []
+    if parser.has_section(section):
+        for formid, value in parser.items(section):
+            row = {'formid': formid.strip().upper()}
+            row.update(zip(fields, (p.strip() for p in value.split('|', len(fields) - 1))))
+            rows.append(row)
+    return rows
+
+def write_ini_table(path: Path, section: str, rows: Iterable[Mapping], fields: tuple[str, ...]):
+    lines = [f'[{section}]']
+    lines += [f"{row['formid']}={'|'.join(row.get(f, '') for f in fields)}" for row in rows]
+    with atomic_output(path, 'w', encoding='utf-8') as f:
+        f.write('\n'.join(lines) + '\n')
+
+def read_csv_table(path: Path) -> list[dict]:
+    with open_text_auto(path, newline='') as f:
+        return [dict(row) for row in csv.DictReader(f)]
+
+# 抽出ファイル -> (表名, 読み込み関数)。パスは output_dir からの相対。
+EXTRACTION_SOURCES = {
+    'weapons': ('weapon_omod_map.json', lambda p: json.loads(read_text_auto(p))),
+    'lvli': ('WeaponLeveledLists_Export.csv', read_csv_table),
+    'munitions_ammo': ('intermediate/munitions_ammo_ids.ini',
+                       lambda p: read_ini_table(p, 'MunitionsAmmo', ('editor_id',))),
+    'unmapped_ammo': ('intermediate/unique_ammo_for_mapping.ini',
+                      lambda p: read_ini_table(p, 'UnmappedAmmo', ('plugin', 'editor_id'))),
+}
+
+def pack_extraction(output_dir: Path, dest: Optional[Path] = None, loaded: Optional[dict[str, list]] = None) -> Path:
+    """
+    output_dir の抽出ファイルをまとめて 1 つのコンテナにする。
+    loaded に読み込み済みの表を渡すと、そのファイルは読み直さない。
+    """
+    output_dir = Path(output_dir)
+    tables, sources = {}, {}
+    for table, (relpath, reader) in EXTRACTION_SOURCES.items():
+        path = output_dir / relpath
+        if not path.is_file():
+            continue
+        rows = (loaded or {}).get(table)
+        tables[table] = rows if rows is not None else reader(path)
+        sources[table] = _source_stamp(path)
+    return write_store(dest or output_dir / EXTRACTION_FILE, tables, {'sources': sources})
+
+def unpack_extraction(store_path: Path, output_dir: Path) -> list[Path]:
+    """コンテナから元の形式 (JSON / CSV / INI) のファイルを書き戻す。"""
+    written = []
+    output_dir = Path(output_dir)
+    with RecordStore(store_path) as store:
+        for table, (relpath, _) in EXTRACTION_SOURCES.items():
+            if table not in store.tables:
+                continue
+            path = output_dir / relpath
+            rows = store.tables[table]
+            if table == 'weapons':
+                with atomic_output(path, 'w', encoding='utf-8') as f:
+                    f.write(json.dumps(rows.to_dicts(), ensure_ascii=False, indent=2))
+            elif table == 'lvli':
+                with atomic_output(path, 'w', encoding='utf-8') as f:
+                    writer = csv.DictWriter(f, fieldnames=rows.keys, quoting=csv.QUOTE_ALL, lineterminator='\n')
+                    writer.writeheader()
+                    writer.writerows(rows.to_dicts())
+            elif table == 'munitions_ammo':
+                write_ini_table(path, 'MunitionsAmmo', rows, ('editor_id',))
+            else:
+                write_ini_table(path, 'UnmappedAmmo', rows, ('plugin', 'editor_id'))
+            written.append(path)
+    return written
+
+def main(argv: Optional[list[str]] = None):
+    import argparse
+    parser = argparse.ArgumentParser(description='抽出データのバイナリコンテナ (pack / unpack / info)')
+    sub = parser.add_subparsers(dest='command', required=True)
+    p = sub.add_parser('pack', help='output_dir の抽出ファイルをコンテナにまとめる')
+    p.add_argument('output_dir', type=Path)
+    p.add_argument('-o', '--output', type=Path)
+    p = sub.add_parser('unpack', help='コンテナから JSON / CSV / INI を書き戻す')
+    p.add_argument('store', type=Path)
+    p.add_argument('output_dir', type=Path)
+    p = sub.add_parser('info', help='コンテナの表と件数を表示する')
+    p.add_argument('store', type=Path)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    if args.command == 'pack':
+        path = pack_extraction(args.output_dir, args.output)
+        logging.info(f"[RecordStore] {path} ({path.stat().st_size:,} bytes)")
+    elif args.command == 'unpack':
+        for path in unpack_extraction(args.store, args.output_dir):
+            logging.info(f"[RecordStore] {path}")
+    else:
+        with RecordStore(args.store) as store:
+            for name, table in store.tables.items():
+                logging.info(f"{name}: {len(table)} 行, 列 {', '.join(table.keys)}")
+            logging.info(f"strings: {store._string_count}")
+
+if __name__ == '__main__':
+    main()
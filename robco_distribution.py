@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+# robco_distribution.py — Leveled List 配分エンジン
+#
+# strategy.json の allocation_matrix (勢力ごとのカテゴリ重み) と ammo_classification
+# (Munitions 弾薬ごとの Category/Power) に基づき、パッチ対象武器を各勢力の
+# Leveled List へ配分する。乱数はシード固定のため、同じ入力からは常に同じ結果が得られる。
+
+from __future__ import annotations
+import logging
+import random
+from bisect import bisect_right
+from dataclasses import dataclass
+from itertools import accumulate
+
+DEFAULT_WEAPONS_PER_FACTION = 30
+DEFAULT_SEED = 0
+
+@dataclass(frozen=True)
+class PatchedWeapon:
+    """弾薬置換の対象となった武器。"""
+    plugin: str
+    formid: str
+    editor_id: str
+    ammo_formid: str  # 置換後の Munitions 弾薬 FormID (大文字)
+
+class WeightedSampler:
+    """累積重み配列に対する二分探索で、重み付きの抽選を行う。"""
+
+    def __init__(self, items: list, weights: list[float]):
+        self._items = []
+        self._weights = []
+        for item, weight in zip(items, weights):
+            if weight > 0:
+                self._items.append(item)
+                self._weights.append(float(weight))
+        self._rebuild()
+
+    def _rebuild(self):
+        self._cumulative = list(accumulate(self._weights))
+        self._total = self._cumulative[-1] if self._cumulative else 0.0
+
+    def __bool__(self) -> bool:
+        return self._total > 0
+
+    def sample(self, rng: random.Random):
+        """重みに比例した確率で要素を 1 つ返す。"""
+        idx = bisect_right(self._cumulative, rng.random() * self._total)
+        return self._items[min(idx, len(self._items) - 1)]
+
+    def remove(self, item):
+        """要素を抽選対象から外し、累積配列を作り直す。"""
+        idx = self._items.index(item)
+        del self._items[idx]
+        del self._weights[idx]
+        self._rebuild()
+
+def build_category_index(weapons: list[PatchedWeapon], ammo_classification: dict) -> dict[str, list[PatchedWeapon]]:
+    """置換後の弾薬カテゴリごとに武器をまとめたインデックスを構築する。"""
+    index: dict[str, list[PatchedWeapon]] = {}
+    unclassified = 0
+    for weapon in weapons:
+        category = (ammo_classification.get(weapon.ammo_formid) or {}).get("Category")
+        if not category:
+            unclassified += 1
+            continue
+        index.setdefault(category, []).append(weapon)
+    if unclassified:
+        logging.info(f"[Distribution] ammo_classification に分類のない武器 {unclassified}件 は配分対象外です。")
+    return index
+
+def allocate(category_index: dict[str, list[PatchedWeapon]], allocation_matrix: dict, factions,
+             weapons_per_faction: int = DEFAULT_WEAPONS_PER_FACTION, seed=DEFAULT_SEED) -> dict[str, list[PatchedWeapon]]:
+    """
+    勢力ごとのカテゴリ重みに従い、各勢力へ最大 weapons_per_faction 件の武器を重複なしで配分する。
+    乱数は (seed, 勢力名) から初期化するため、勢力の順序や追加に結果が左右されない。
+    """
+    # カテゴリ内の候補順を固定しておく (入力順に依存させない)
+    sorted_index = {cat: sorted(ws, key=lambda w: (w.plugin.lower(), w.formid)) for cat, ws in category_index.items()}
+
+    allocation: dict[str, list[PatchedWeapon]] = {}
+    for faction in factions:
+        weights = allocation_matrix.get(faction) or {}
+        categories = sorted(cat for cat in weights if sorted_index.get(cat))
+        sampler = WeightedSampler(categories, [weights[cat] for cat in categories])
+        rng = random.Random(f"{seed}:{faction}")
+
+        pools = {}
+        for cat in categories:
+            pool = list(sorted_index[cat])
+            rng.shuffle(pool)
+            pools[cat] = pool
+
+        picked: list[PatchedWeapon] = []
+        while sampler and len(picked) < weapons_per_faction:
+            cat = sampler.sample(rng)
+            picked.append(pools[cat].pop())
+            if not pools[cat]:
+                sampler.remove(cat)
+        allocation[faction] = sorted(picked, key=lambda w: (w.plugin.lower(), w.formid))
+    return allocation
+
+def build_leveled_list_lines(weapons: list[PatchedWeapon], strategy: dict, faction_ll_map: dict,
+                             leveled_list_map: dict) -> list[str]:
+    """
+    配分結果から、勢力ごとに 1 行へまとめた formsToAdd 行を生成する。
+    strategy の distribution セクションで weapons_per_faction と seed を指定できる。
+    """
+    options = strategy.get("distribution") or {}
+    weapons_per_faction = int(options.get("weapons_per_faction", DEFAULT_WEAPONS_PER_FACTION))
+    seed = options.get("seed", DEFAULT_SEED)
+
+    category_index = build_category_index(weapons, strategy.get("ammo_classification") or {})
+    allocation = allocate(category_index, strategy.get("allocation_matrix") or {}, sorted(faction_ll_map),
+                          weapons_per_faction=weapons_per_faction, seed=seed)
+
+    lines: list[str] = []
+    for faction, picked in allocation.items():
+        lli_editorid = faction_ll_map[faction]
+        ll_fid = (leveled_list_map.get(lli_editorid) or {}).get("formid", "").upper()
+        if not ll_fid:
+            logging.warning(f"[Distribution] {faction}: Leveled List '{lli_editorid}' のFormIDが見つからないためスキップします。")
+            continue
+        if not picked:
+            logging.info(f"[Distribution] {faction}: 配分対象の武器がありません。")
+            continue
+        forms = ",".join(f"{w.plugin}|{w.formid}" for w in picked)
+        lines.append(f"\n; Add {len(picked)} patched weapons to {faction} ({lli_editorid})")
+        lines.append(f"filterByFormLists={ll_fid}:formsToAdd={forms}")
+        logging.info(f"[Distribution] {faction}: {len(picked)}件の武器を配分しました。")
+    return lines
@@ -3,17 +3,25 @@
 
 from __future__ import annotations
 import csv
+import hashlib
 import json
 import logging
+import os
+import tempfile
 import time
-import shutil
+import zipfile
 from pathlib import Path
 import configparser
 from collections import Counter, defaultdict
+from collections.abc import Mapping, Sequence
 from dataclasses import dataclass, field
 
 # 共通ユーティリティをインポート
-from utils import read_text_utf8_fallback
+from utils import read_text_auto, open_text_auto, atomic_output
+from json_repair import loads_tolerant
+from record_store import EXTRACTION_FILE, RecordStoreError, open_store, is_table_fresh, pack_extraction
+from robco_distribution import PatchedWeapon, build_leveled_list_lines
+from profiling import profiled
 
 # --- データ構造定義 ---
 
@@ -22,7 +30,7 @@ class DataSource:
     """INI生成に必要な全ての入力データを保持する。"""
     strategy: dict
     ammo_map: dict[str, str]
-    weapon_records: list[dict]
+    weapon_records: Sequence[Mapping]  # list[dict] か、レコードコンテナの Table
     leveled_list_map: dict[str, dict]
     npc_list_map: dict[str, str]
     munitions_id_map: dict[str, dict]
@@ -34,9 +42,21 @@ class ProcessedData:
     weapon_set_ammo_lines: list[str] = field(default_factory=list)
     omod_set_ammo_map: dict[str, dict] = field(default_factory=dict)
     ll_add_weapon_lines: list[str] = field(default_factory=list)
+    # プラグイン別シャード出力用のインデックス (処理と同じ 1 パスで構築)。
+    # 大文字小文字だけが違うプラグイン名は同じプラグインとしてまとめ、最初に現れた表記をキーにする
+    weapon_lines_by_plugin: dict[str, list[str]] = field(default_factory=dict)
+    omod_keys_by_plugin: dict[str, list[str]] = field(default_factory=dict)
+
+@dataclass
+class IniDocument:
+    """書き出し対象の INI 1 ファイル分 (ヘッダー行を含む)。"""
+    relpath: str  # RobCo_Patcher ディレクトリからの相対パス (posix 形式)
+    lines: list[str]
+    entry_count: int
 
 # --- データ読み込み ---
 
+@profiled("robco.load")
 def _load_data_sources(config) -> DataSource:
     """すべての入力データソースを読み込んで、一つのデータクラスにまとめる。"""
     output_dir = config.get_path('Paths', 'output_dir')
@@ -44,7 +64,7 @@ def _load_data_sources(config) -> DataSource:
     ammo_map_file = config.get_path('Paths', 'ammo_map_file')
     
     # 各種ローダー関数を呼び出し
-    strategy_data = json.loads(read_text_utf8_fallback(strategy_file))
+    strategy_data = json.loads(read_text_auto(strategy_file))
     ammo_map = _load_ammo_map(ammo_map_file)
     weapon_records = _read_weapon_records(output_dir, config)
     leveled_list_map = _load_leveled_lists(output_dir, config)
@@ -68,7 +88,7 @@ def _load_ammo_map(ammo_map_file: Path) -> dict[str, str]:
         logging.warning(f"[Robco] マッピングファイルが見つかりません: {ammo_map_file}")
         return {}
     try:
-        data = json.loads(read_text_utf8_fallback(ammo_map_file))
+        data = json.loads(read_text_auto(ammo_map_file))
         mapping = {
             (m.get("source") or {}).get("formid").lower(): (m.get("target") or {}).get("formid").lower()
             for m in data.get("mappings", [])
@@ -80,8 +100,32 @@ def _load_ammo_map(ammo_map_file: Path) -> dict[str, str]:
         logging.error(f"[Robco] {ammo_map_file.name} の読み込みに失敗: {e}")
         return {}
 
-def _read_weapon_records(output_dir: Path, config) -> list[dict]:
-    """weapon_omod_map.json から武器情報を読み込む。"""
+def _open_fresh_table(directory: Path, table: str, source: Path):
+    """
+    directory のレコードコンテナに source から作った最新の table があれば返す (なければ None)。
+    source が存在しない場合は、コンテナが古い可能性があるため使わない。
+    """
+    path = directory / EXTRACTION_FILE
+    if not path.is_file():
+        return None
+    try:
+        store = open_store(path)
+    except (OSError, RecordStoreError) as e:
+        logging.debug(f"[Robco] {path.name} を開けません: {e}")
+        return None
+    if is_table_fresh(store, table, source):
+        return store.tables[table]
+    store.close()
+    return None
+
+def _read_weapon_records(output_dir: Path, config, pack: bool = True):
+    """
+    weapon_omod_map.json から武器情報を読み込む。
+    同じフォルダのレコードコンテナが JSON と一致していればそちらを mmap で参照し、
+    一致していなければ JSON を読んだうえでコンテナを作り直す (output_dir の JSON で、修復が不要だった場合のみ)。
+    JSON のないフォルダのコンテナは使わない。
+    pack=False のときはコンテナを作らない (読み取り専用の呼び出し元向け)。
+    """
     try:
         xedit_output_dir = config.get_path('Paths', 'xedit_output_dir')
     except Exception:
@@ -91,10 +135,28 @@ def _read_weapon_records(output_dir: Path, config) -> list[dict]:
     for d in [output_dir, output_dir.parent, xedit_output_dir]:
         if not d or not d.exists(): continue
         json_path = d / "weapon_omod_map.json"
+        table = _open_fresh_table(d, 'weapons', json_path)
+        if table is not None:
+            logging.info(f"[Robco] {EXTRACTION_FILE} から武器レコードを {len(table)} 件読み込みました。")
+            return table
         if json_path.is_file():
             try:
-                records = json.loads(read_text_utf8_fallback(json_path))
+                records, repair = loads_tolerant(read_text_auto(json_path))
+                if repair is not None:
+                    logging.warning(
+                        f"[Robco] {json_path.name} は壊れた JSON です。修復して {len(repair.records)} 件を読み込みました "
+                        f"(修復 {repair.repaired} 件, 読めなかった箇所 {len(repair.errors)} 件"
+                        f"{', 末尾が途切れています' if repair.truncated else ''})。"
+                    )
+                    for err in repair.errors[:5]:
+                        logging.warning(f"[Robco]   {err.line} 行目 (offset {err.offset}): {err.message}")
                 logging.info(f"[Robco] {json_path.name} から武器レコードを {len(records)} 件読み込みました。")
+                # 修復したデータはコンテナにしない (次回以降、修復の警告なしに欠けたレコードを読むことになるため)
+                if pack and d == output_dir and repair is None:
+                    try:
+                        pack_extraction(d, loaded={'weapons': records})
+                    except Exception as e:
+                        logging.debug(f"[Robco] {EXTRACTION_FILE} の作成に失敗: {e}")
                 return records
             except Exception as e:
                 logging.error(f"[Robco] {json_path.name} の読み込みに失敗: {e}")
@@ -102,6 +164,12 @@ def _read_weapon_records(output_dir: Path, config) -> list[dict]:
     logging.warning("[Robco] weapon_omod_map.json が見つかりませんでした。")
     return []
 
+def _leveled_list_mapping(rows) -> dict[str, dict]:
+    return {
+        row['EditorID'].strip('"'): {'plugin': row['SourceFile'].strip('"'), 'formid': row['FormID'].strip('"').upper()}
+        for row in rows if row.get('EditorID') and row.get('FormID') and row.get('SourceFile')
+    }
+
 def _load_leveled_lists(output_dir: Path, config) -> dict:
     """WeaponLeveledLists_Export.csv を読み込む。"""
     try:
@@ -113,14 +181,14 @@ def _load_leveled_lists(output_dir: Path, config) -> dict:
     for path in candidates:
         if path and path.is_file():
             try:
-                with path.open('r', encoding='utf-8', newline='') as f:
-                    reader = csv.DictReader(f)
-                    mapping = {
-                        row['EditorID'].strip('"'): {'plugin': row['SourceFile'].strip('"'), 'formid': row['FormID'].strip('"').upper()}
-                        for row in reader if row.get('EditorID') and row.get('FormID') and row.get('SourceFile')
-                    }
-                    logging.info(f"[Robco] {path.name} からLeveled List情報を {len(mapping)} 件読み込みました。")
-                    return mapping
+                table = _open_fresh_table(path.parent, 'lvli', path)
+                if table is not None:
+                    mapping = _leveled_list_mapping(table)
+                else:
+                    with open_text_auto(path, newline='') as f:
+                        mapping = _leveled_list_mapping(csv.DictReader(f))
+                logging.info(f"[Robco] {path.name} からLeveled List情報を {len(mapping)} 件読み込みました。")
+                return mapping
             except Exception as e:
                 logging.error(f"[Robco] {path.name} の読み込みに失敗: {e}")
     
@@ -139,6 +207,7 @@ def _load_munitions_ammo_id_map(output_dir: Path, plugin_name: str) -> dict[str,
 
 # --- データ処理 ---
 
+@profiled("robco.process")
 def _process_weapon_records(data: DataSource) -> ProcessedData:
     """武器レコードを処理し、各INIファイル用のデータを生成する。"""
     processed = ProcessedData()
@@ -149,6 +218,10 @@ def _process_weapon_records(data: DataSource) -> ProcessedData:
     seen_comments, seen_weapon_entries, seen_ll_lines = set(), set(), set()
     faction_ll_map = data.strategy.get('faction_leveled_lists') or _get_target_ll_editorids()
     munitions_plugin = data.strategy.get('munitions_plugin_name', 'Munitions - An Ammo Expansion.esl')
+    # allocation_matrix と ammo_classification があれば配分エンジンで Leveled List を構築する
+    use_distribution = bool(data.strategy.get('allocation_matrix') and data.strategy.get('ammo_classification'))
+    patched_weapons: dict[tuple[str, str], PatchedWeapon] = {}
+    shard_plugins: dict[str, str] = {}
 
     for rec in data.weapon_records:
         orig_ammo_fid = (rec.get("ammo_formid") or "").strip().lower()
@@ -163,20 +236,34 @@ def _process_weapon_records(data: DataSource) -> ProcessedData:
         comment = f"; [{weap_plugin}] {rec.get('weap_editor_id','')} -> {mapped_ammo_fid}"
         line = f"filterByWeapons={weap_plugin}|{weap_fid}:setNewAmmo={munitions_plugin}|{mapped_ammo_fid}"
         
+        shard_plugin = shard_plugins.setdefault(weap_plugin.lower(), weap_plugin)
+        plugin_lines = processed.weapon_lines_by_plugin.setdefault(shard_plugin, [])
         if comment not in seen_comments:
             processed.weapon_set_ammo_lines.append(comment)
+            plugin_lines.append(comment)
             seen_comments.add(comment)
         if line not in seen_weapon_entries:
             processed.weapon_set_ammo_lines.append(line)
+            plugin_lines.append(line)
             seen_weapon_entries.add(line)
 
         # OMODの弾薬置換情報を収集
         for omod in rec.get("omods", []):
-            omod_key = f"{omod.get('plugin','')}|{omod.get('formid','').upper()}"
+            omod_plugin = omod.get('plugin', '')
+            omod_key = f"{omod_plugin}|{omod.get('formid','').upper()}"
             if not omod_key: continue
+            if omod_key not in processed.omod_set_ammo_map:
+                shard_plugin = shard_plugins.setdefault(omod_plugin.lower(), omod_plugin)
+                processed.omod_keys_by_plugin.setdefault(shard_plugin, []).append(omod_key)
             processed.omod_set_ammo_map[omod_key] = {'target_ammo': mapped_ammo_fid, 'target_plugin': munitions_plugin}
 
         # Leveled Listへの追加行を生成
+        if use_distribution:
+            patched_weapons.setdefault(
+                (weap_plugin.lower(), weap_fid),
+                PatchedWeapon(weap_plugin, weap_fid, rec.get('weap_editor_id', ''), mapped_ammo_fid),
+            )
+            continue
         for faction, lli_editorid in faction_ll_map.items():
             ll_info = data.leveled_list_map.get(lli_editorid, {})
             ll_fid = ll_info.get("formid", "").upper()
@@ -188,68 +275,305 @@ def _process_weapon_records(data: DataSource) -> ProcessedData:
                 processed.ll_add_weapon_lines.append(ll_line)
                 seen_ll_lines.add(ll_line)
 
+    if use_distribution:
+        processed.ll_add_weapon_lines = build_leveled_list_lines(
+            list(patched_weapons.values()), data.strategy, faction_ll_map, data.leveled_list_map
+        )
+
     return processed
 
 # --- ファイル書き出し ---
 
-def _generate_ini_files(processed: ProcessedData, robco_base_dir: Path):
-    """処理済みデータから各INIファイルを生成・書き出しする。"""
-    timestamp = time.strftime('%Y-%m-%d %H:%M:%S')
-    
-    # ディレクトリ作成
-    formlist_dir = robco_base_dir / "formlist"
-    weapon_dir = robco_base_dir / "weapon"
-    omod_dir = robco_base_dir / "omod"
-    formlist_dir.mkdir(parents=True, exist_ok=True)
-    weapon_dir.mkdir(parents=True, exist_ok=True)
-    omod_dir.mkdir(parents=True, exist_ok=True)
-
-    # INIファイル1: FormList Remove
-    if processed.formlist_remove_lines:
-        header = [f"; Munitions Auto-Patcher: Remove Custom Ammo from FormLists\n; GeneratedAt={timestamp}"]
-        path = formlist_dir / "Munitions_FormList_RemoveCustomAmmo.ini"
-        path.write_text("\n".join(header + processed.formlist_remove_lines), encoding="utf-8")
-        logging.info(f"[Robco] 生成: {path.name} ({len(processed.formlist_remove_lines)}件)")
-
-    # INIファイル2: Weapon SetAmmo
-    if processed.weapon_set_ammo_lines:
-        header = [f"; Munitions Auto-Patcher: Set Weapon Ammo\n; GeneratedAt={timestamp}"]
-        path = weapon_dir / "Munitions_Weapon_SetAmmo.ini"
-        path.write_text("\n".join(header + processed.weapon_set_ammo_lines), encoding="utf-8")
-        logging.info(f"[Robco] 生成: {path.name} ({len(processed.weapon_set_ammo_lines)}件)")
-
-    # INIファイル3: OMOD SetAmmo
-    if processed.omod_set_ammo_map:
-        header = [f"; Munitions Auto-Patcher: OMOD Ammo Conversion\n; GeneratedAt={timestamp}"]
-        lines = [
-            f"filterByOMod={key}:changeOModPropertiesForm=Ammo={val['target_plugin']}|{val['target_ammo']}"
-            for key, val in sorted(processed.omod_set_ammo_map.items())
-        ]
-        path = omod_dir / "Munitions_OMOD_SetAmmo.ini"
-        path.write_text("\n".join(header + lines), encoding="utf-8")
-        logging.info(f"[Robco] 生成: {path.name} ({len(lines)}件)")
+_GENERATED_AT_PREFIX = "; GeneratedAt="
 
+class IniOutputSink:
+    """
+    生成した INI 行を ZIP エントリへ直接ストリーミングし、必要に応じてディスクにも書き出す出力先。
+    ZIP・ディスク上のファイルはいずれも一時ファイルに書き込み、ZIP の置き換えが成功してから
+    ディスクのファイルを rename で置き換え、delete_paths のファイルを削除する。
+    途中で失敗しても、ディスクだけが新しい内容になって ZIP と食い違うことはない
+    (次回の差分はディスクを基準にするため、食い違うと ZIP が作り直されなくなる)。
+    """
+
+    def __init__(self, zip_path: Path, arc_prefix: str, disk_dir: Path | None = None, compresslevel: int = 6,
+                 delete_paths: Sequence[str] = ()):
+        self.zip_path = zip_path
+        self.arc_prefix = arc_prefix.strip('/')
+        self.disk_dir = disk_dir
+        self.compresslevel = compresslevel
+        self.delete_paths = list(delete_paths)
+        self._zip_output = None
+        self._zip: zipfile.ZipFile | None = None
+        self._staged: list[tuple[str, Path]] = []  # (一時ファイル, 配置先)
+
+    def __enter__(self) -> "IniOutputSink":
+        self._zip_output = atomic_output(self.zip_path, 'wb')
+        fh = self._zip_output.__enter__()
+        self._zip = zipfile.ZipFile(fh, 'w', compression=zipfile.ZIP_DEFLATED, compresslevel=self.compresslevel)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            try:
+                self._zip.close()
+            except BaseException as e:
+                self._zip_output.__exit__(type(e), e, e.__traceback__)
+                raise
+            # 例外時は一時ZIPが破棄され、既存のZIPはそのまま残る
+            self._zip_output.__exit__(exc_type, exc, tb)
+        except BaseException:
+            self._discard_staged()
+            raise
+        if exc_type is not None:
+            self._discard_staged()
+            return False
+        self._commit_disk()
+        return False
+
+    def _commit_disk(self):
+        """ZIP の確定後に、ディスクのファイルを置き換えて不要になったファイルを削除する。"""
+        staged, self._staged = self._staged, []
+        try:
+            for tmp_name, dest in staged:
+                os.replace(tmp_name, dest)
+        finally:
+            for tmp_name, _ in staged:
+                if os.path.exists(tmp_name):
+                    os.unlink(tmp_name)
+        if self.disk_dir is not None:
+            for relpath in self.delete_paths:
+                (self.disk_dir / relpath).unlink(missing_ok=True)
+
+    def _discard_staged(self):
+        for tmp_name, _ in self._staged:
+            try:
+                os.unlink(tmp_name)
+            except OSError:
+                pass
+        self._staged = []
+
+    def write(self, relpath: str, lines: list[str], to_disk: bool = True):
+        """
+        INI 1 ファイル分の行を ZIP エントリへ、to_disk が真ならディスクの一時ファイルにも同時に書き出す。
+        一時ファイルは閉じておき (大量のシャードでもファイルハンドルを使い切らないように)、__exit__ で配置する。
+        """
+        disk_fh = None
+        tmp_name = None
+        if to_disk and self.disk_dir is not None:
+            dest = self.disk_dir / relpath
+            dest.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp_name = tempfile.mkstemp(prefix=f".{dest.name}.", suffix='.tmp', dir=dest.parent)
+            disk_fh = os.fdopen(fd, 'wb')
+        try:
+            with self._zip.open(f"{self.arc_prefix}/{relpath}", 'w') as zf:
+                for i, line in enumerate(lines):
+                    data = (line if i == 0 else "\n" + line).encode("utf-8")
+                    zf.write(data)
+                    if disk_fh is not None:
+                        disk_fh.write(data)
+            if disk_fh is not None:
+                disk_fh.flush()
+                os.fsync(disk_fh.fileno())
+        except BaseException:
+            if disk_fh is not None:
+                disk_fh.close()
+                os.unlink(tmp_name)
+            raise
+        if disk_fh is not None:
+            disk_fh.close()
+            self._staged.append((tmp_name, dest))
+
+def _body_digest(lines) -> str:
+    """GeneratedAt 行を除いた INI 本文のハッシュを返す。"""
+    h = hashlib.sha256()
+    for line in lines:
+        if line.startswith(_GENERATED_AT_PREFIX):
+            continue
+        h.update(line.encode("utf-8"))
+        h.update(b"\n")
+    return h.hexdigest()
+
+OUTPUT_MODE_MONOLITHIC = "monolithic"
+OUTPUT_MODE_SHARDED = "sharded"
+
+_INVALID_FILENAME_CHARS = str.maketrans({c: "_" for c in '<>:"/\\|?*'})
+_PLUGIN_EXTENSIONS = ('esp', 'esm', 'esl')
+
+def _shard_name(plugin: str) -> str:
+    """
+    プラグイン名だけから決まるシャードのファイル名。.esp は拡張子を除き (Foo.esp -> Foo)、
+    それ以外は拡張子を付ける (Foo.esm -> Foo_esm)。.esp でも拡張子を除いた名前が _esp / _esm / _esl で
+    終わる場合は拡張子を付け (Foo_esm.esp -> Foo_esm_esp)、ほかのプラグインの名前と重ならないようにする。
+    """
+    if not plugin:
+        return "UnknownPlugin"
+    path = Path(plugin)
+    stem, ext = path.stem, path.suffix.lstrip('.').lower()
+    if ext != 'esp' or stem.lower().endswith(tuple(f"_{e}" for e in _PLUGIN_EXTENSIONS)):
+        stem = f"{stem}_{ext or 'noext'}"
+    return stem.translate(_INVALID_FILENAME_CHARS)
+
+def _shard_names(plugins) -> dict[str, str]:
+    """
+    プラグイン名 -> シャードのファイル名。名前は各プラグイン名だけから決まるので、
+    ほかのプラグインが増減しても変わらない。.esp/.esm/.esl 以外の名前などで重なった場合だけ、
+    警告して連番を付ける (ファイルシステムに合わせて大文字小文字は区別しない)。
+    """
+    names: dict[str, str] = {}
+    used: set[str] = set()
+    for plugin in sorted(set(plugins)):
+        name = candidate = _shard_name(plugin)
+        n = 2
+        while candidate.lower() in used:
+            candidate, n = f"{name}_{n}", n + 1
+        if candidate != name:
+            logging.warning(f"[Robco] シャード名が重なるため {plugin} は {candidate} として出力します。")
+        used.add(candidate.lower())
+        names[plugin] = candidate
+    return names
+
+def _omod_line(key: str, val: dict) -> str:
+    return f"filterByOMod={key}:changeOModPropertiesForm=Ammo={val['target_plugin']}|{val['target_ammo']}"
+
+def _render_ini_documents(processed: ProcessedData, timestamp: str, output_mode: str = OUTPUT_MODE_MONOLITHIC) -> list[IniDocument]:
+    """
+    処理済みデータからヘッダー付きの INI ドキュメントを組み立てる。
+    output_mode が sharded の場合、Weapon/OMOD の SetAmmo をソースプラグインごとのファイルに分割する。
+    """
+    outputs = [
+        # INIファイル1: FormList Remove
+        ("formlist/Munitions_FormList_RemoveCustomAmmo.ini", "Remove Custom Ammo from FormLists", processed.formlist_remove_lines),
+    ]
+    if output_mode == OUTPUT_MODE_SHARDED:
+        # INIファイル2/3: プラグイン別 Weapon / OMOD SetAmmo (同じプラグインは両方で同じ名前にする)
+        shard_names = _shard_names([*processed.weapon_lines_by_plugin, *processed.omod_keys_by_plugin])
+        for plugin, lines in sorted(processed.weapon_lines_by_plugin.items()):
+            outputs.append((f"weapon/Munitions_{shard_names[plugin]}_SetAmmo.ini", f"Set Weapon Ammo [{plugin}]", lines))
+        for plugin, keys in sorted(processed.omod_keys_by_plugin.items()):
+            lines = [_omod_line(key, processed.omod_set_ammo_map[key]) for key in sorted(keys)]
+            outputs.append((f"omod/Munitions_{shard_names[plugin]}_SetAmmo.ini", f"OMOD Ammo Conversion [{plugin}]", lines))
+    else:
+        omod_lines = [_omod_line(key, val) for key, val in sorted(processed.omod_set_ammo_map.items())]
+        # INIファイル2: Weapon SetAmmo
+        outputs.append(("weapon/Munitions_Weapon_SetAmmo.ini", "Set Weapon Ammo", processed.weapon_set_ammo_lines))
+        # INIファイル3: OMOD SetAmmo
+        outputs.append(("omod/Munitions_OMOD_SetAmmo.ini", "OMOD Ammo Conversion", omod_lines))
     # INIファイル4: Leveled List Add
-    if processed.ll_add_weapon_lines:
-        header = [f"; Munitions Auto-Patcher: Add Patched Weapons to Leveled Lists\n; GeneratedAt={timestamp}"]
-        path = formlist_dir / "Munitions_FormList_AddWeaponsToLL.ini"
-        path.write_text("\n".join(header + processed.ll_add_weapon_lines), encoding="utf-8")
-        logging.info(f"[Robco] 生成: {path.name} ({len(processed.ll_add_weapon_lines)}件)")
-
-def _create_zip_archive(robco_patcher_dir: Path):
-    """最終的なZIPアーカイブを作成する。"""
-    zip_output_path = robco_patcher_dir.parent / f"{robco_patcher_dir.name}.zip"
-    logging.info(f"[Robco] ZIPアーカイブを作成します: {zip_output_path}")
-    if zip_output_path.exists():
-        zip_output_path.unlink()
-    
-    shutil.make_archive(
-        base_name=str(zip_output_path.with_suffix('')),
-        format='zip',
-        root_dir=robco_patcher_dir.parent,
-        base_dir=robco_patcher_dir.name
-    )
-    logging.info(f"[Robco] {zip_output_path.name} の作成が完了しました。")
+    outputs.append(("formlist/Munitions_FormList_AddWeaponsToLL.ini", "Add Patched Weapons to Leveled Lists", processed.ll_add_weapon_lines))
+
+    documents = []
+    for relpath, title, lines in outputs:
+        if not lines:
+            continue
+        header = [f"; Munitions Auto-Patcher: {title}", f"{_GENERATED_AT_PREFIX}{timestamp}"]
+        documents.append(IniDocument(relpath=relpath, lines=header + lines, entry_count=len(lines)))
+    return documents
+
+def _existing_digests(robco_base_dir: Path, zip_path: Path, arc_prefix: str, from_disk: bool) -> dict[str, str]:
+    """
+    前回出力の本文ハッシュを返す。ディスク出力が有効ならディスク上の INI を、
+    無効なら既存 ZIP のエントリを比較元とする。
+    """
+    digests: dict[str, str] = {}
+    try:
+        if from_disk:
+            for path in robco_base_dir.rglob("*.ini"):
+                digests[path.relative_to(robco_base_dir).as_posix()] = _body_digest(read_text_auto(path).split("\n"))
+        elif zip_path.is_file():
+            prefix = f"{arc_prefix}/"
+            with zipfile.ZipFile(zip_path) as zf:
+                for name in zf.namelist():
+                    if name.startswith(prefix) and name.endswith(".ini"):
+                        text = zf.read(name).decode("utf-8", errors="replace")
+                        digests[name[len(prefix):]] = _body_digest(text.split("\n"))
+    except Exception as e:
+        logging.debug(f"[Robco] 既存INIの比較に失敗したため全ファイルを再生成します: {e}")
+        return {}
+    return digests
+
+@profiled("robco.render")
+def _plan_ini_outputs(processed: ProcessedData, robco_base_dir: Path, zip_path: Path, arc_prefix: str,
+                      write_loose: bool = True, output_mode: str = OUTPUT_MODE_MONOLITHIC) -> tuple[list[IniDocument], dict[str, bool], list[str]]:
+    """
+    INI ドキュメントを組み立て、前回出力との差分を求める。
+    戻り値は (ドキュメント一覧, 相対パス -> 変更有無, 今回生成されなかった過去の生成ファイル)。
+    """
+    timestamp = time.strftime('%Y-%m-%d %H:%M:%S')
+    documents = _render_ini_documents(processed, timestamp, output_mode)
+    previous = _existing_digests(robco_base_dir, zip_path, arc_prefix, from_disk=write_loose)
+    current_paths = {doc.relpath for doc in documents}
+    stale_paths = sorted(p for p in previous if p not in current_paths and Path(p).name.startswith("Munitions_"))
+    changes = {doc.relpath: previous.get(doc.relpath) != _body_digest(doc.lines) for doc in documents}
+    return documents, changes, stale_paths
+
+def _remove_loose_outputs(robco_base_dir: Path) -> list[str]:
+    """
+    ディスク出力が無効な場合に、以前の実行でディスクに書いた生成 INI を削除する。
+    残しておくと ZIP と内容が食い違うため。戻り値は削除した相対パス。
+    """
+    removed = []
+    if not robco_base_dir.is_dir():
+        return removed
+    for path in sorted(robco_base_dir.rglob("Munitions_*.ini")):
+        try:
+            path.unlink()
+            removed.append(path.relative_to(robco_base_dir).as_posix())
+        except OSError as e:
+            logging.warning(f"[Robco] 古いINIを削除できません: {path} ({e})")
+    return removed
+
+@profiled("robco.write")
+def _write_ini_outputs(documents: list[IniDocument], changes: dict[str, bool], stale_paths: list[str],
+                       robco_base_dir: Path, zip_path: Path, arc_prefix: str,
+                       write_loose: bool = True, compresslevel: int = 6):
+    """差分に基づき、出力シンク経由で ZIP (と必要ならディスク) に書き出す。"""
+    for doc in documents:
+        if changes[doc.relpath]:
+            logging.info(f"[Robco] 生成: {doc.relpath} ({doc.entry_count}件)")
+        else:
+            logging.info(f"[Robco] 変更なし: {doc.relpath} ({doc.entry_count}件、書き出しをスキップ)")
+    for relpath in stale_paths:
+        # ディスクからの削除は ZIP の作り直しが成功してから (IniOutputSink が行う)
+        logging.info(f"[Robco] 削除: {relpath} (今回の生成対象に含まれません)")
+    if not write_loose:
+        for relpath in _remove_loose_outputs(robco_base_dir):
+            logging.info(f"[Robco] 削除: {relpath} (ディスク出力が無効なため、以前の実行で書いたファイルを削除)")
+    changed_count = sum(changes.values())
+    logging.info(f"[Robco] INI差分サマリ: 変更 {changed_count}件 / 変更なし {len(changes) - changed_count}件 / 削除 {len(stale_paths)}件")
+
+    if not changed_count and not stale_paths and zip_path.is_file():
+        logging.info(f"[Robco] INIに変更がないため、ZIPアーカイブの再作成をスキップします: {zip_path.name}")
+        return
+
+    logging.info(f"[Robco] ZIPアーカイブを作成します: {zip_path}")
+    with IniOutputSink(zip_path, arc_prefix, disk_dir=robco_base_dir if write_loose else None, compresslevel=compresslevel,
+                       delete_paths=stale_paths) as sink:
+        for doc in documents:
+            sink.write(doc.relpath, doc.lines, to_disk=changes[doc.relpath])
+    logging.info(f"[Robco] {zip_path.name} の作成が完了しました。")
+
+def _generate_ini_files(processed: ProcessedData, robco_base_dir: Path, zip_path: Path, arc_prefix: str,
+                        write_loose: bool = True, compresslevel: int = 6,
+                        output_mode: str = OUTPUT_MODE_MONOLITHIC) -> dict[str, bool]:
+    """
+    処理済みデータから各INIファイルを生成し、出力シンク経由で ZIP (と必要ならディスク) に書き出す。
+    本文に変更がなければ何も書き出さない。戻り値は相対パス -> 変更有無 の辞書。
+    今回生成されなかった過去の生成ファイル (削除されたプラグインのシャード等) も変更として扱い、ディスクから削除する。
+    write_loose が偽なら、以前の実行でディスクに書いた生成ファイルもすべて削除する。
+    """
+    documents, changes, stale_paths = _plan_ini_outputs(processed, robco_base_dir, zip_path, arc_prefix, write_loose, output_mode)
+    _write_ini_outputs(documents, changes, stale_paths, robco_base_dir, zip_path, arc_prefix, write_loose, compresslevel)
+    return changes
+
+def _get_int_parameter(config, key: str, default: int) -> int:
+    try:
+        return int(config.get_string('Parameters', key, str(default)))
+    except (TypeError, ValueError):
+        return default
+
+def _get_output_mode(config) -> str:
+    """検証済みの robco_output_mode。不正な値はスナップショットの作成時に ConfigError になる。"""
+    return config.snapshot.parameters.robco_output_mode
 
 def _get_target_ll_editorids() -> dict:
     # SuperMutants は除外
@@ -277,12 +601,17 @@ def run(config) -> bool:
         processed_data = _process_weapon_records(data)
 
         # 3. INIファイルを生成・書き出し
+        #    ZIP へは生成した行を直接ストリーミングする (INIに変更があった場合のみ)
         robco_patcher_dir = config.get_path('Paths', 'robco_patcher_dir')
         robco_base_dir = robco_patcher_dir / "F4SE" / "Plugins" / "RobCo_Patcher"
-        _generate_ini_files(processed_data, robco_base_dir)
-
-        # 4. ZIPアーカイブを作成
-        _create_zip_archive(robco_patcher_dir)
+        zip_path = robco_patcher_dir.parent / f"{robco_patcher_dir.name}.zip"
+        arc_prefix = f"{robco_patcher_dir.name}/F4SE/Plugins/RobCo_Patcher"
+        _generate_ini_files(
+            processed_data, robco_base_dir, zip_path, arc_prefix,
+            write_loose=config.get_boolean('Parameters', 'robco_write_loose_files', fallback=True),
+            compresslevel=_get_int_parameter(config, 'robco_zip_compresslevel', 6),
+            output_mode=_get_output_mode(config),
+        )
 
         logging.info("[Robco] Robco INI 生成完了")
         return True
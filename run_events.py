@@ -0,0 +1,170 @@
+# -*- coding: utf-8 -*-
+# run_events.py — 実行状況の構造化イベント
+#
+# Orchestrator は処理の開始/終了、各ステージの開始/終了、警告・エラーを RunEvent として
+# キューに流す。GUI はログの文字列を走査せず、このイベントでステータス表示や成否判定を行う。
+
+from __future__ import annotations
+import logging
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from enum import Enum
+from typing import Iterator, Optional
+
+class RunEventKind(str, Enum):
+    RUN_START = "run_start"
+    STAGE_START = "stage_start"
+    STAGE_END = "stage_end"
+    WARNING = "warning"
+    ERROR = "error"
+    RUN_END = "run_end"
+
+@dataclass(frozen=True)
+class RunEvent:
+    """実行イベント 1 件。"""
+    kind: RunEventKind
+    name: str
+    message: str = ""
+    ok: Optional[bool] = None
+    elapsed: Optional[float] = None
+    index: Optional[int] = None
+    total: Optional[int] = None
+    level: int = logging.INFO
+    timestamp: float = field(default_factory=time.time)
+
+@dataclass
+class Outcome:
+    """run() / stage() の with ブロック内で成否を書き込むための入れ物。既定は失敗。"""
+    ok: bool = False
+
+class _LogRecordForwarder(logging.Handler):
+    """実行中に出力された WARNING 以上のログを WARNING / ERROR イベントとして転送する。"""
+
+    def __init__(self, bus: "RunEventBus"):
+        super().__init__(level=logging.WARNING)
+        self.bus = bus
+
+    def emit(self, record):
+        kind = RunEventKind.WARNING if record.levelno < logging.ERROR else RunEventKind.ERROR
+        self.bus._on_log_record(kind, record)
+
+class RunEventBus:
+    """
+    RunEvent の発行口。sink (queue.Queue) を渡さなければイベントは捨てられる。
+    run() は入れ子にでき、最も外側の run() だけが RUN_START / RUN_END を発行する。
+    """
+
+    def __init__(self, sink: Optional[queue.Queue] = None):
+        self.sink = sink
+        self._lock = threading.Lock()
+        self._depth = 0
+        self._run_name = ""
+        self._critical_count = 0
+
+    def emit(self, event: RunEvent):
+        if self.sink is not None:
+            self.sink.put(event)
+
+    @property
+    def active(self) -> bool:
+        return self._depth > 0
+
+    def _on_log_record(self, kind: RunEventKind, record: logging.LogRecord):
+        if record.levelno >= logging.CRITICAL:
+            with self._lock:
+                self._critical_count += 1
+        self.emit(RunEvent(kind, self._run_name, message=record.getMessage(), level=record.levelno))
+
+    @contextmanager
+    def run(self, name: str, total_stages: Optional[int] = None) -> Iterator[Outcome]:
+        """
+        処理全体を囲む。with ブロック内で outcome.ok に結果を設定する。
+        CRITICAL ログが 1 件でも出た場合は outcome.ok に関わらず失敗として RUN_END を発行する。
+        """
+        outcome = Outcome()
+        with self._lock:
+            outermost = self._depth == 0
+            self._depth += 1
+        if not outermost:
+            try:
+                yield outcome
+            finally:
+                with self._lock:
+                    self._depth -= 1
+            return
+
+        self._run_name = name
+        self._critical_count = 0
+        forwarder = _LogRecordForwarder(self)
+        logging.getLogger().addHandler(forwarder)
+        self.emit(RunEvent(RunEventKind.RUN_START, name, total=total_stages))
+        start = time.perf_counter()
+        try:
+            yield outcome
+        finally:
+            logging.getLogger().removeHandler(forwarder)
+            ok = outcome.ok and self._critical_count == 0
+            with self._lock:
+                self._depth -= 1
+            self.emit(RunEvent(RunEventKind.RUN_END, name, ok=ok, elapsed=time.perf_counter() - start, total=total_stages))
+
+    @contextmanager
+    def stage(self, name: str, index: Optional[int] = None, total: Optional[int] = None) -> Iterator[Outcome]:
+        """ステージ 1 つを囲む。with ブロック内で outcome.ok に結果を設定する。"""
+        outcome = Outcome()
+        self.emit(RunEvent(RunEventKind.STAGE_START, name, index=index, total=total))
+        start = time.perf_counter()
+        try:
+            yield outcome
+        finally:
+            self.emit(RunEvent(RunEventKind.STAGE_END, name, ok=outcome.ok,
+                               elapsed=time.perf_counter() - start, index=index, total=total))
+
+class RunStatus:
+    """受け取った RunEvent を集計し、現在の状態を O(1) で参照できるようにする。"""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.name = ""
+        self.running = False
+        self.ok: Optional[bool] = None
+        self.elapsed: Optional[float] = None
+        self.total_stages: Optional[int] = None
+        self.current_stage: Optional[str] = None
+        self.completed_stages = 0
+        self.stage_timings: list[tuple[str, float, bool]] = []
+        self.warning_count = 0
+        self.error_count = 0
+        self.last_error = ""
+
+    def apply(self, event: RunEvent):
+        kind = event.kind
+        if kind is RunEventKind.RUN_START:
+            self.reset()
+            self.name = event.name
+            self.running = True
+            self.total_stages = event.total
+        elif kind is RunEventKind.STAGE_START:
+            self.current_stage = event.name
+        elif kind is RunEventKind.STAGE_END:
+            self.current_stage = None
+            self.completed_stages = event.index or self.completed_stages + 1
+            self.stage_timings.append((event.name, event.elapsed or 0.0, bool(event.ok)))
+        elif kind is RunEventKind.WARNING:
+            self.warning_count += 1
+        elif kind is RunEventKind.ERROR:
+            self.error_count += 1
+            self.last_error = event.message
+        elif kind is RunEventKind.RUN_END:
+            self.running = False
+            self.ok = bool(event.ok)
+            self.elapsed = event.elapsed
+
+    @property
+    def succeeded(self) -> bool:
+        return self.ok is True
@@ -1,20 +1,56 @@
-import re
+#!/usr/bin/env python3
+"""
+List marker lines ([PROBE_*] / [STAGE] / [ERROR] / Exception / [AutoPatcher-Test]) found in
+the logs under Output (and optionally other log files), using log_index.LogIndex.
+
+The index is kept in <root>/.log_index.json and only new or appended logs are re-read,
+so repeated runs over large log folders return almost immediately.
+
+Usage:
+  python scripts/scan_output_logs.py [ROOT] [--file LOG ...] [--marker NAME ...]
+                                     [--since TIME] [--until TIME] [--limit N] [--counts]
+  TIME is ISO format ('2025-10-14 21:40') or relative ('-30m', '-2h', '-1d').
+"""
+import argparse
+import sys
+import time
+from datetime import datetime
 from pathlib import Path
-p = Path(r'E:/Munition_AutoPatcher_v1.1/Output')
-patterns = [re.compile(x, re.I) for x in [r'Exception', r'Access Violation', r'EAccessViolation', r'\[EARLY_PROBE\]', r'\[AutoPatcher-Test\]']]
-found = []
-for f in p.rglob('*'):
-    if not f.is_file():
-        continue
-    try:
-        txt = f.read_text(encoding='utf-8', errors='ignore')
-    except Exception:
-        continue
-    for i, line in enumerate(txt.splitlines(), start=1):
-        for pat in patterns:
-            if pat.search(line):
-                found.append((f, i, line.strip()))
-                break
-print('Matches:', len(found))
-for path, ln, line in found:
-    print(f'{path} @ {ln}: {line}')
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from log_index import LogIndex, parse_time
+
+
+def main():
+    root_default = Path(__file__).resolve().parents[1] / 'Output'
+    parser = argparse.ArgumentParser(description='Search marker lines in Output / xEdit logs.')
+    parser.add_argument('root', nargs='?', type=Path, default=root_default)
+    parser.add_argument('--file', type=Path, nargs='*', default=[], help='extra log files (e.g. xEditException.log)')
+    parser.add_argument('--marker', nargs='*', default=['EXCEPTION', 'EARLY_PROBE', 'AutoPatcher-Test', 'ERROR'],
+                        help='marker kinds (PROBE, STAGE, ERROR, EXCEPTION, TEST) or tags (PROBE_WEAPON, ...)')
+    parser.add_argument('--since', type=parse_time)
+    parser.add_argument('--until', type=parse_time)
+    parser.add_argument('--limit', type=int)
+    parser.add_argument('--counts', action='store_true', help='print the number of lines per tag and exit')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    index = LogIndex([args.root], files=args.file)
+    stats = index.refresh()
+    print(f"Index: {stats['unchanged']} unchanged, {stats['appended']} appended, {stats['rescanned']} rescanned, "
+          f"{stats['removed']} removed, {stats['bytes']:,} bytes read in {time.perf_counter() - start:.3f}s")
+
+    if args.counts:
+        for tag, count in sorted(index.counts().items(), key=lambda kv: -kv[1]):
+            print(f'{count:8}  {tag}')
+        return
+
+    hits = list(index.query(args.marker, since=args.since, until=args.until, limit=args.limit))
+    print('Matches:', len(hits))
+    for hit in hits:
+        stamp = datetime.fromtimestamp(hit.timestamp).strftime('%Y-%m-%d %H:%M:%S')
+        print(f'{hit.path} @ {hit.offset} [{stamp}]: {hit.text.strip()}')
+
+
+if __name__ == '__main__':
+    main()
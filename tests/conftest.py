@@ -0,0 +1,9 @@
+# -*- coding: utf-8 -*-
+# テストからルート直下のモジュールと tools/ のスクリプトを import できるようにする
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+for path in (ROOT, ROOT / 'tools'):
+    if str(path) not in sys.path:
+        sys.path.insert(0, str(path))
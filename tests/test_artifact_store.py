@@ -0,0 +1,28 @@
+# -*- coding: utf-8 -*-
+# artifact_store.py の保存と保持ポリシーのテスト
+
+import os
+
+from artifact_store import ArtifactStore, link_file
+
+def test_profile_runs_do_not_push_out_kept_runs(tmp_path):
+    store = ArtifactStore(tmp_path, max_bytes=0, keep_runs=1)
+    xedit = store.begin_run('xedit')
+    xedit.put_text('log.txt', 'xedit')
+    for i in range(3):
+        store.begin_run(f'profile_{i}', retain=False).put_text('profile.json', str(i))
+
+    store.enforce_retention()
+
+    assert [m['run_id'] for m in store.runs()] == [xedit.run_id]
+
+def test_link_file_replaces_a_read_only_link(tmp_path):
+    store = ArtifactStore(tmp_path / 'store')
+    dest = tmp_path / 'out.ini'
+    first = store.begin_run('a').put_text('out.ini', 'first')
+    link_file(first, dest)
+    second = store.begin_run('b').put_text('out.ini', 'second')
+    link_file(second, dest)
+
+    assert dest.read_text(encoding='utf-8') == 'second'
+    assert os.path.samefile(dest, second)
@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+# consistency_check.py の読み込みと検査のテスト
+
+import json
+
+import consistency_check as cc
+from record_store import open_store, write_store
+
+def _weapons():
+    """大文字小文字だけが違うプラグイン名で同じ武器が 2 回現れるデータ。"""
+    return [
+        {'plugin': 'Mod.esp', 'weap_formid': '01000ABC', 'ammo_formid': '0001AAAA'},
+        {'plugin': 'MOD.ESP', 'weap_formid': '01000ABC', 'ammo_formid': '0001aaaa'},
+        {'plugin': 'Other.esp', 'weap_formid': '01000ABC', 'ammo_formid': '0001BBBB'},
+    ]
+
+def test_weapon_keys_match_between_json_and_container(tmp_path):
+    records = _weapons()
+    path = write_store(tmp_path / 'extraction.mrec', {'weapons': records})
+    with open_store(path) as store:
+        from_container = cc._weapon_keys(store.tables['weapons'])
+    from_json = cc._weapon_keys(records)
+
+    assert from_json == (3, {'0001AAAA', '0001BBBB'}, [('mod.esp', '01000ABC')])
+    assert from_container == from_json
+
+def test_weapon_keys_container_handles_missing_plugin_and_string_formids(tmp_path):
+    # plugin のない行は ABSENT として格納される
+    missing_plugin = _weapons() + [{'weap_formid': '01000ABC', 'ammo_formid': '0001AAAA'}]
+    # 小文字の FormID があると weap_formid は str 列になる
+    string_formids = [
+        {'plugin': 'a.esp', 'weap_formid': '01000abc', 'ammo_formid': '0001AAAA'},
+        {'plugin': 'A.esp', 'weap_formid': '01000ABC', 'ammo_formid': '0001AAAA'},
+        {'plugin': 'B.esp', 'weap_formid': '', 'ammo_formid': '0001AAAA'},
+        {'plugin': 'B.esp', 'weap_formid': '', 'ammo_formid': '0001AAAA'},
+    ]
+    for name, records in (('missing_plugin', missing_plugin), ('string_formids', string_formids)):
+        path = write_store(tmp_path / f'{name}.mrec', {'weapons': records})
+        with open_store(path) as store:
+            assert cc._weapon_keys(store.tables['weapons']) == cc._weapon_keys(records), name
+    assert cc._weapon_keys(string_formids)[2] == [('a.esp', '01000ABC')]
+
+def _sets(**kwargs):
+    defaults = dict(weapon_count=1, weapon_ammo={'0001AAAA'}, mapping={'0001AAAA': '0A000001'},
+                    leveled_lists={'LLI_Raider'}, faction_leveled_lists={'Raider': 'LLI_Raider'})
+    return cc.ArtifactSets(**{**defaults, **kwargs})
+
+def test_missing_optional_artifact_is_a_warning():
+    findings = cc.check(_sets(missing_optional=['Output/intermediate/unique_ammo_for_mapping.ini']))
+    by_code = {f.code: f for f in findings}
+    assert by_code['OPTIONAL_ARTIFACT_MISSING'].severity == cc.WARNING
+    assert not any(f.severity == cc.ERROR for f in findings)
+
+def test_missing_required_artifact_is_an_error():
+    findings = cc.check(_sets(missing=['ammo_map.json']))
+    assert {f.code: f.severity for f in findings}['ARTIFACT_MISSING'] == cc.ERROR
+
+class _Config:
+    def __init__(self, root):
+        self._paths = {'output_dir': root, 'ammo_map_file': root / 'ammo_map.json',
+                       'strategy_file': root / 'strategy.json', 'leveled_lists_csv': root / 'leveled_lists.csv'}
+
+    def get_path(self, section, key):
+        if key not in self._paths:
+            raise KeyError(key)
+        return self._paths[key]
+
+def test_load_artifacts_does_not_write_the_container(tmp_path):
+    (tmp_path / 'weapon_omod_map.json').write_text(json.dumps(_weapons()), encoding='utf-8')
+    sets = cc.load_artifacts(_Config(tmp_path))
+    assert sets.weapon_count == 3
+    assert not (tmp_path / 'extraction.mrec').exists()
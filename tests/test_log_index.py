@@ -0,0 +1,26 @@
+# -*- coding: utf-8 -*-
+# log_index.py のマーカー索引のテスト
+
+from log_index import LogIndex
+
+def test_exception_markers_are_case_insensitive(tmp_path):
+    log = tmp_path / 'xEdit_session.log'
+    log.write_text(
+        "[2026-10-19 10:00:00] Background Loader: finished\n"
+        "[2026-10-19 10:00:01] exception in unit userscript line 12\n"
+        "[2026-10-19 10:00:02] ACCESS VIOLATION at address 00000000\n"
+        "[2026-10-19 10:00:03] EAccessViolation raised\n"
+        "[2026-10-19 10:00:04] [autopatcher-test] done\n"
+        "[2026-10-19 10:00:05] no marker here\n",
+        encoding='utf-8',
+    )
+    index = LogIndex(roots=[tmp_path])
+    index.refresh()
+
+    hits = list(index.query(['EXCEPTION']))
+    assert [h.text.split('] ', 1)[1] for h in hits] == [
+        'exception in unit userscript line 12',
+        'ACCESS VIOLATION at address 00000000',
+        'EAccessViolation raised',
+    ]
+    assert [h.text for h in index.query(['TEST'])] == ['[2026-10-19 10:00:04] [autopatcher-test] done']
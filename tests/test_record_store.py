@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+# record_store.py のコンテナと、それを使う武器レコードの読み込みのテスト
+
+import json
+
+import robco_ini_generate as rig
+from record_store import EXTRACTION_FILE, is_table_fresh, open_store, pack_extraction
+
+class _Config:
+    """_read_weapon_records が参照する設定だけを持つ。"""
+
+    def get_path(self, section, key):
+        raise KeyError(key)
+
+def _weapon(i):
+    return {'plugin': 'Mod.esp', 'weap_formid': f'{0x01000000 + i:08X}', 'ammo_formid': '0001AAAA'}
+
+def test_missing_source_is_not_fresh(tmp_path):
+    source = tmp_path / 'weapon_omod_map.json'
+    source.write_text(json.dumps([_weapon(0)]), encoding='utf-8')
+    path = pack_extraction(tmp_path)
+    source.unlink()
+    with open_store(path) as store:
+        assert not is_table_fresh(store, 'weapons', source)
+
+def test_stale_container_is_not_used_when_json_is_elsewhere(tmp_path):
+    output_dir = tmp_path / 'Output'
+    output_dir.mkdir()
+    (output_dir / 'weapon_omod_map.json').write_text(json.dumps([_weapon(0)]), encoding='utf-8')
+    pack_extraction(output_dir)
+    (output_dir / 'weapon_omod_map.json').unlink()
+    (tmp_path / 'weapon_omod_map.json').write_text(json.dumps([_weapon(1), _weapon(2)]), encoding='utf-8')
+
+    records = rig._read_weapon_records(output_dir, _Config())
+    assert [r['weap_formid'] for r in records] == ['01000001', '01000002']
+
+def test_repaired_json_is_not_packed(tmp_path):
+    text = json.dumps([_weapon(0), _weapon(1)], indent=2)
+    (tmp_path / 'weapon_omod_map.json').write_text(text[:text.rindex('}')], encoding='utf-8')  # 末尾が途切れた JSON
+
+    records = rig._read_weapon_records(tmp_path, _Config())
+    assert [r['weap_formid'] for r in records] == ['01000000']
+    assert not (tmp_path / EXTRACTION_FILE).exists()
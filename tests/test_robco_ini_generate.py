@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+# robco_ini_generate.py の INI 出力のテスト
+
+import robco_ini_generate as rig
+
+def _processed(plugins):
+    """plugins の各プラグインに武器 1 件・OMOD 1 件ずつの処理済みデータ。"""
+    processed = rig.ProcessedData(formlist_remove_lines=['formsToRemove=0001AAAA'])
+    for i, plugin in enumerate(plugins):
+        processed.weapon_lines_by_plugin[plugin] = [f'filterByWeapons={plugin}|0100000{i}:setNewAmmo=M.esl|0A000001']
+        key = f'{plugin}|0200000{i}'
+        processed.omod_keys_by_plugin[plugin] = [key]
+        processed.omod_set_ammo_map[key] = {'target_ammo': '0A000001', 'target_plugin': 'M.esl'}
+    return processed
+
+def test_shard_names_drop_only_the_esp_extension():
+    documents = rig._render_ini_documents(_processed(['Foo.esp', 'My Mod.esl']), 'test', rig.OUTPUT_MODE_SHARDED)
+    assert sorted(doc.relpath for doc in documents if doc.relpath.startswith(('weapon/', 'omod/'))) == [
+        'omod/Munitions_Foo_SetAmmo.ini', 'omod/Munitions_My Mod_esl_SetAmmo.ini',
+        'weapon/Munitions_Foo_SetAmmo.ini', 'weapon/Munitions_My Mod_esl_SetAmmo.ini',
+    ]
+
+def test_shard_names_depend_only_on_the_plugin():
+    plugins = ['Foo.esp', 'FOO.esm', 'Foo_esm.esp', 'Foo_esm_esp.esp', 'My Mod.esp', 'My_Mod.esp']
+    names = rig._shard_names(plugins)
+    assert names == {'Foo.esp': 'Foo', 'FOO.esm': 'FOO_esm', 'Foo_esm.esp': 'Foo_esm_esp',
+                     'Foo_esm_esp.esp': 'Foo_esm_esp_esp', 'My Mod.esp': 'My Mod', 'My_Mod.esp': 'My_Mod'}
+    # ほかのプラグインが増えても名前は変わらない
+    assert all(rig._shard_names([plugin])[plugin] == name for plugin, name in names.items())
+
+def test_plugins_differing_only_in_case_share_a_shard():
+    records = [
+        {'plugin': 'Mod.esp', 'weap_formid': '01000001', 'ammo_formid': '0001AAAA',
+         'omods': [{'plugin': 'Mod.esp', 'formid': '02000001'}]},
+        {'plugin': 'MOD.ESP', 'weap_formid': '01000002', 'ammo_formid': '0001AAAA',
+         'omods': [{'plugin': 'mod.esp', 'formid': '02000002'}]},
+    ]
+    data = rig.DataSource(strategy={}, ammo_map={'0001aaaa': '0A000001'}, weapon_records=records,
+                          leveled_list_map={}, npc_list_map={}, munitions_id_map={})
+    processed = rig._process_weapon_records(data)
+    assert list(processed.weapon_lines_by_plugin) == ['Mod.esp']
+    assert list(processed.omod_keys_by_plugin) == ['Mod.esp']
+    assert len(processed.omod_keys_by_plugin['Mod.esp']) == 2
+
+def _write(processed, tmp_path, write_loose, output_mode=rig.OUTPUT_MODE_MONOLITHIC):
+    robco_base_dir = tmp_path / 'RobCo_Auto_Patcher' / 'F4SE' / 'Plugins' / 'RobCo_Patcher'
+    zip_path = tmp_path / 'RobCo_Auto_Patcher.zip'
+    rig._generate_ini_files(processed, robco_base_dir, zip_path, 'RobCo_Auto_Patcher/F4SE/Plugins/RobCo_Patcher',
+                            write_loose=write_loose, output_mode=output_mode)
+    return robco_base_dir, zip_path
+
+def test_disabling_loose_files_removes_previous_loose_output(tmp_path):
+    processed = _processed(['Foo.esp'])
+    robco_base_dir, _ = _write(processed, tmp_path, write_loose=True, output_mode=rig.OUTPUT_MODE_SHARDED)
+    (robco_base_dir / 'weapon' / 'user_notes.ini').write_text('; not generated', encoding='utf-8')
+    assert (robco_base_dir / 'weapon' / 'Munitions_Foo_SetAmmo.ini').is_file()
+
+    _, zip_path = _write(processed, tmp_path, write_loose=False)
+    assert sorted(p.name for p in robco_base_dir.rglob('*.ini')) == ['user_notes.ini']
+    assert zip_path.is_file()
+
+def _zip_text(zip_path, relpath):
+    import zipfile
+    with zipfile.ZipFile(zip_path) as zf:
+        return zf.read(f'RobCo_Auto_Patcher/F4SE/Plugins/RobCo_Patcher/{relpath}').decode('utf-8')
+
+def test_failed_write_leaves_disk_and_zip_in_sync(tmp_path, monkeypatch):
+    robco_base_dir, zip_path = _write(_processed(['Foo.esp', 'Bar.esp']), tmp_path, write_loose=True,
+                                      output_mode=rig.OUTPUT_MODE_SHARDED)
+    relpath = 'weapon/Munitions_Bar_SetAmmo.ini'
+    old_text = (robco_base_dir / relpath).read_text(encoding='utf-8')
+
+    changed = _processed(['Foo.esp', 'Bar.esp'])
+    changed.weapon_lines_by_plugin['Bar.esp'].append('; changed')
+    original_write = rig.IniOutputSink.write
+    calls = []
+
+    def failing_write(self, *args, **kwargs):
+        calls.append(args[0])
+        if len(calls) == 3:  # 変更した weapon/Munitions_Bar_SetAmmo.ini の次で失敗させる
+            raise OSError('injected')
+        return original_write(self, *args, **kwargs)
+
+    monkeypatch.setattr(rig.IniOutputSink, 'write', failing_write)
+    try:
+        _write(changed, tmp_path, write_loose=True, output_mode=rig.OUTPUT_MODE_SHARDED)
+    except OSError:
+        pass
+    monkeypatch.setattr(rig.IniOutputSink, 'write', original_write)
+    assert (robco_base_dir / relpath).read_text(encoding='utf-8') == old_text
+    assert _zip_text(zip_path, relpath) == old_text
+    assert not list(robco_base_dir.rglob('*.tmp'))
+
+    _write(changed, tmp_path, write_loose=True, output_mode=rig.OUTPUT_MODE_SHARDED)
+    new_text = (robco_base_dir / relpath).read_text(encoding='utf-8')
+    assert new_text.endswith('; changed')
+    assert _zip_text(zip_path, relpath) == new_text
+
+def test_stale_shards_are_removed_only_after_the_zip_is_rebuilt(tmp_path, monkeypatch):
+    robco_base_dir, zip_path = _write(_processed(['Foo.esp', 'Bar.esp']), tmp_path, write_loose=True,
+                                      output_mode=rig.OUTPUT_MODE_SHARDED)
+
+    def failing_write(self, *args, **kwargs):
+        raise OSError('injected')
+
+    monkeypatch.setattr(rig.IniOutputSink, 'write', failing_write)
+    try:
+        _write(_processed(['Foo.esp']), tmp_path, write_loose=True, output_mode=rig.OUTPUT_MODE_SHARDED)
+    except OSError:
+        pass
+    assert (robco_base_dir / 'weapon' / 'Munitions_Bar_SetAmmo.ini').is_file()
+    monkeypatch.undo()
+
+    _write(_processed(['Foo.esp']), tmp_path, write_loose=True, output_mode=rig.OUTPUT_MODE_SHARDED)
+    assert not (robco_base_dir / 'weapon' / 'Munitions_Bar_SetAmmo.ini').exists()
+
+def test_output_mode_comes_from_the_validated_snapshot():
+    from types import SimpleNamespace
+    from config_manager import ParameterSettings
+    config = SimpleNamespace(snapshot=SimpleNamespace(parameters=ParameterSettings(robco_output_mode=rig.OUTPUT_MODE_SHARDED)),
+                             get_string=lambda *args, **kwargs: 'not-a-mode')
+    assert rig._get_output_mode(config) == rig.OUTPUT_MODE_SHARDED
@@ -0,0 +1,16 @@
+# -*- coding: utf-8 -*-
+# utils.py の文字コード判定のテスト
+
+import pytest
+
+from utils import decode_bytes_auto, sniff_encoding
+
+@pytest.mark.parametrize('text', ['武器 テスト abc', '武器　テスト abc', '[Section]\r\nkey=値\r\n'])
+@pytest.mark.parametrize('encoding', ['utf-16-le', 'utf-16-be'])
+def test_mostly_japanese_utf16_without_bom_is_detected(text, encoding):
+    assert sniff_encoding(text.encode(encoding)) == encoding
+    assert decode_bytes_auto(text.encode(encoding)) == (text, encoding)
+
+@pytest.mark.parametrize('encoding', ['utf-8', 'cp932'])
+def test_text_without_nul_is_not_utf16(encoding):
+    assert sniff_encoding('武器 テスト abc'.encode(encoding)) == encoding
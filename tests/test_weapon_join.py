@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+# tools/weapon_join.py の結合処理のテスト
+
+import robco_ini_generate as rig
+import weapon_join as wj
+
+MUNITIONS_PLUGIN = 'Munitions - An Ammo Expansion.esl'
+
+def _robco_weapon():
+    """robco_ini_generate が読むスキーマ (plugin/weap_formid/..., OMOD は plugin/formid) の武器レコード。"""
+    return {
+        'plugin': 'Target.esp', 'weap_formid': '01000ABC', 'weap_editor_id': 'TargetWeapon',
+        'ammo_formid': '0001AAAA',
+        'omods': [{'plugin': 'Target.esp', 'formid': '02000001'}],
+    }
+
+def _exporter_record():
+    """Pascal のエクスポーターが書くスキーマ (OMOD は omod_plugin/omod_form_id) の同じ武器。"""
+    return {
+        'weapon_plugin': 'Target.esp', 'weapon_form_id': '01000abc', 'weapon_editor_id': 'TargetWeapon',
+        'ammo_plugin': 'Target.esp', 'ammo_form_id': '0001AAAA', 'ammo_editor_id': 'TargetAmmo',
+        'omods': [
+            {'omod_plugin': 'target.esp', 'omod_form_id': '02000001', 'omod_editor_id': 'Dup'},
+            {'omod_plugin': 'Donor.esp', 'omod_form_id': '03000abc', 'omod_editor_id': 'DonorMod'},
+        ],
+    }
+
+def _records_index(records):
+    """--records で渡したファイルと同じ形のインデックスを作る (load_records 相当)。"""
+    rows = []
+    for record in records:
+        row = wj.canonical(record)
+        row['source'] = record
+        rows.append(row)
+    return wj.SourceIndex('records', rows)
+
+def test_cross_schema_omod_merge_renders_valid_omod_lines():
+    weapon = _robco_weapon()
+    strategies = wj.build_strategies(None, _records_index([_exporter_record()]), None)
+    wj.join([weapon], strategies)
+
+    assert weapon['omods'] == [
+        {'plugin': 'Target.esp', 'formid': '02000001'},
+        {'plugin': 'Donor.esp', 'formid': '03000ABC', 'editor_id': 'DonorMod'},
+    ]
+
+    data = rig.DataSource(
+        strategy={'munitions_plugin_name': MUNITIONS_PLUGIN, 'faction_leveled_lists': {'Raider': 'LLI_Raider'}},
+        ammo_map={'0001aaaa': '00bbbbbb'},
+        weapon_records=[weapon],
+        leveled_list_map={},
+        npc_list_map={},
+        munitions_id_map={},
+    )
+    documents = rig._render_ini_documents(rig._process_weapon_records(data), 'test')
+    omod_doc = next(doc for doc in documents if doc.relpath == 'omod/Munitions_OMOD_SetAmmo.ini')
+    omod_lines = [line for line in omod_doc.lines if line.startswith('filterByOMod=')]
+    assert omod_lines == [
+        f'filterByOMod=Donor.esp|03000ABC:changeOModPropertiesForm=Ammo={MUNITIONS_PLUGIN}|00BBBBBB',
+        f'filterByOMod=Target.esp|02000001:changeOModPropertiesForm=Ammo={MUNITIONS_PLUGIN}|00BBBBBB',
+    ]
+
+def test_exporter_schema_record_keeps_exporter_omod_keys():
+    weapon = _exporter_record()
+    weapon['omods'] = []
+    donor = _robco_weapon()
+    wj.join([weapon], wj.build_strategies(None, _records_index([donor]), None))
+    assert weapon['omods'] == [{'omod_plugin': 'Target.esp', 'omod_form_id': '02000001'}]
+
+def test_overwrite_replaces_differing_ammo_fields_only_when_enabled():
+    donor = _exporter_record()
+    donor['ammo_form_id'] = '0001BBBB'
+
+    kept = _exporter_record()
+    wj.join([kept], wj.build_strategies(None, _records_index([donor]), None))
+    assert kept['ammo_form_id'] == '0001AAAA'
+
+    replaced = _exporter_record()
+    wj.join([replaced], wj.build_strategies(None, _records_index([donor]), None, overwrite_records=True))
+    assert replaced['ammo_form_id'] == '0001BBBB'
+    assert replaced['weapon_form_id'] == '01000abc'
+    assert replaced['_provenance']['ammo_form_id'] == 'records:weapon_key'
+
+def test_unmatched_records_are_reported_once():
+    weapon = _exporter_record()
+    other = dict(_exporter_record(), weapon_form_id='01000DEF', weapon_editor_id='OtherWeapon')
+    records = _records_index([_exporter_record(), other, dict(other)])
+    assert wj.unmatched_records([weapon], records) == [other]
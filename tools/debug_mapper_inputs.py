@@ -8,7 +8,7 @@ out = root / 'Output'
 
 ammo_file = out / 'unique_ammo_for_mapping.ini'
 munitions_file = out / 'munitions_ammo_ids.ini'
-weapon_candidates = [out / 'weapon_omod_map.ammofilled.details.json', out / 'weapon_omod_map.json', Path.cwd() / 'Output' / 'weapon_omod_map.json']
+weapon_candidates = [out / 'weapon_omod_map.joined.json', out / 'weapon_omod_map.json', Path.cwd() / 'Output' / 'weapon_omod_map.json']
 
 print('Ammo file:', ammo_file, 'exists=', ammo_file.exists())
 print('Munitions file:', munitions_file, 'exists=', munitions_file.exists())
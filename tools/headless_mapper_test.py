@@ -1,6 +1,6 @@
 #!/usr/bin/env python3
 """
-Headless test for AmmoMapperApp: instantiate the app with a Tk root, call load_data() and build_ui_rows(), and print diagnostics.
+Headless test for AmmoMapperApp: instantiate the app with a Tk root, call load_data() and refresh_rows(), and print diagnostics.
 """
 import sys
 from pathlib import Path
@@ -15,15 +15,15 @@ def run_test(ammo_file, munitions_file, output_file):
     # keep the window hidden
     root.withdraw()
     app = AmmoMapperApp(root, ammo_file, munitions_file, output_file)
-    # call reload which calls load_data + build_ui_rows
+    # call reload which calls load_data + refresh_rows
     app.reload_data_and_build_ui()
     print('[headless-test] ammo_to_map len:', len(app.ammo_to_map))
     print('[headless-test] munitions_ammo_list len:', len(app.munitions_ammo_list))
     total_with_omods = sum(1 for r in app.ammo_to_map if r.get('omods_info'))
     print('[headless-test] rows with omods:', total_with_omods)
-    # count widgets
-    children = [c for c in app.content_frame.winfo_children() if int(c.grid_info().get('row', 0)) > 0]
-    print('[headless-test] content_frame child widgets count:', len(children))
+    # rows are virtualised: only the pooled (visible) rows own widgets
+    root.update_idletasks()
+    print('[headless-test] pooled row widgets count:', len(app.row_pool))
     # destroy root
     root.destroy()
 
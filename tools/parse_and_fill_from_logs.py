@@ -4,13 +4,16 @@ Parse xEdit/FO4Edit logs for [PROBE_WEAPON], [PROBE_FORMID_RAW], [PROBE_FORMID_H
 produce a mapping editor_id -> full_form_hex, then fill `weapon_omod_map.repaired.json` accordingly.
 
 Usage: python parse_and_fill_from_logs.py <repaired.json> <out.json>
-It will scan common log locations under E:\fo4mod\xedit for lines.
+It looks the lines up in the log index of the common log locations under E:\fo4mod\xedit.
 """
 import re
 import json
 import sys
 from pathlib import Path
 
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from log_index import LogIndex, INDEX_FILE_NAME
+
 LOG_DIR = Path('E:/fo4mod/xedit')
 LOG_PATTERNS = ['xEdit64Exception.log', 'xEdit64Exception1.log', 'xEdit64Exception2.log', 'FO4Script_log.txt', 'FO4Edit_log.txt']
 
@@ -31,29 +34,23 @@ def raw_to_hex(raw_int: int):
 
 
 def scan_logs():
+    # Only the [PROBE_FORMID_*] lines are read back, located through the shared log index
+    index = LogIndex(files=[LOG_DIR / name for name in LOG_PATTERNS], index_path=LOG_DIR / INDEX_FILE_NAME)
+    index.refresh()
     mappings = {}
-    for name in LOG_PATTERNS:
-        path = LOG_DIR / name
-        if not path.exists():
+    for hit in index.query(['PROBE_FORMID_RAW', 'PROBE_FORMID_HEX']):
+        m = probe_raw_re.search(hit.text)
+        if m:
+            editor = m.group(1).strip()
+            raw = int(m.group(2))
+            mappings[editor] = raw_to_hex(raw)
             continue
-        try:
-            with path.open('r', errors='ignore', encoding='utf-8', newline='') as fh:
-                for line in fh:
-                    m = probe_raw_re.search(line)
-                    if m:
-                        editor = m.group(1).strip()
-                        raw = int(m.group(2))
-                        mappings[editor] = raw_to_hex(raw)
-                        continue
-                    m2 = probe_hex_re.search(line)
-                    if m2:
-                        editor = m2.group(1).strip()
-                        hexv = m2.group(2).strip()
-                        if hexv:
-                            mappings[editor] = hexv.upper()
-                        continue
-        except Exception as e:
-            print('Failed to read', path, e)
+        m2 = probe_hex_re.search(hit.text)
+        if m2:
+            editor = m2.group(1).strip()
+            hexv = m2.group(2).strip()
+            if hexv:
+                mappings[editor] = hexv.upper()
     return mappings
 
 
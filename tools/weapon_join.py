@@ -0,0 +1,401 @@
+#!/usr/bin/env python3
+"""
+Fill missing fields of weapon_omod_map.json from the other xEdit exports in one pass.
+
+Replaces the former fill_weapon_* / merge_ammofilled_* scripts, which each reloaded the
+weapon JSON, built their own dict and wrote another full copy. Here every source is loaded
+and indexed once (by EditorID, by normalised EditorID and by plugin+FormID), then an ordered
+list of fill strategies is applied to each weapon record in a single pass:
+
+  details:weapon_key      weapon_ammo_details.txt, same plugin+FormID
+  records:weapon_key      another weapon record JSON (--records), same plugin+FormID
+  details:weapon_editor   weapon_ammo_details.txt, same weapon EditorID
+  records:weapon_editor   --records, same weapon EditorID
+  ammo_map:weapon_editor  weapon_ammo_map.json, same weapon EditorID
+  ammo_map:weapon_norm    weapon_ammo_map.json, same normalised weapon EditorID
+  details:ammo_editor     ammo FormID of the same ammo EditorID in weapon_ammo_details.txt
+  details:ammo_norm       same, by normalised ammo EditorID
+
+Only empty fields are filled; the first strategy that supplies a value wins. OMODs from
+--records are merged by (plugin, FormID). Every filled field is recorded in the record's
+"_provenance" dict as field -> strategy name.
+
+Both record schemas are understood (weapon_plugin/weapon_form_id/... written by the
+normalisation tools and plugin/weap_formid/... read by robco_ini_generate); filled values
+are written back under whichever key the record already uses. The same goes for OMODs
+(omod_plugin/omod_form_id/omod_editor_id vs plugin/formid/editor_id): merged OMODs are
+renamed to the keys the record's OMODs already use.
+
+Differences from the old merge_ammofilled_into_weapon_map.py, which this replaces:
+--records rows that match no weapon are dropped (and counted) unless --append-unmatched
+is given, and ammo fields that already have a value are kept unless --overwrite lets
+--records replace them.
+
+Usage:
+  python tools/weapon_join.py [--weapons FILE] [--ammo-map FILE] [--details FILE]
+                              [--records FILE ...] [--output FILE | --in-place]
+                              [--strategies NAME,NAME,...] [--overwrite] [--append-unmatched]
+"""
+
+import argparse
+import json
+import re
+import sys
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from utils import read_text_auto, atomic_write_text
+from json_repair import loads_tolerant
+from munitions_lookup import normalize_ammo_name
+from artifact_store import ArtifactStore
+
+# Canonical field name -> keys it may appear under (first one is used for new fields)
+FIELD_ALIASES = {
+    'weapon_plugin': ('weapon_plugin', 'plugin'),
+    'weapon_form_id': ('weapon_form_id', 'weap_formid'),
+    'weapon_editor_id': ('weapon_editor_id', 'weap_editor_id'),
+    'ammo_plugin': ('ammo_plugin',),
+    'ammo_form_id': ('ammo_form_id', 'ammo_formid'),
+    'ammo_editor_id': ('ammo_editor_id',),
+}
+# OMOD entries: exporter schema (index 0) and robco_ini_generate schema (index 1)
+OMOD_FIELD_ALIASES = {
+    'plugin': ('omod_plugin', 'plugin'),
+    'form_id': ('omod_form_id', 'formid'),
+    'editor_id': ('omod_editor_id', 'editor_id'),
+}
+WEAPON_FIELDS = ('weapon_plugin', 'weapon_form_id')
+AMMO_FIELDS = ('ammo_plugin', 'ammo_form_id', 'ammo_editor_id')
+FORMID_FIELDS = ('weapon_form_id', 'ammo_form_id')
+
+_NON_ALNUM = re.compile(r'[^0-9a-z]+')
+
+
+def get_field(record: dict, field: str) -> str:
+    for key in FIELD_ALIASES[field]:
+        value = record.get(key)
+        if value:
+            return str(value).strip()
+    return ''
+
+
+def set_field(record: dict, field: str, value: str) -> None:
+    aliases = FIELD_ALIASES[field]
+    key = next((k for k in aliases if k in record), aliases[0])
+    record[key] = value
+
+
+def canonical(record: dict) -> dict:
+    """Return the record's join fields under canonical names (FormIDs upper-cased)."""
+    out = {field: get_field(record, field) for field in FIELD_ALIASES}
+    for field in FORMID_FIELDS:
+        out[field] = out[field].upper()
+    out['omods'] = record.get('omods') or []
+    return out
+
+
+def norm_editor_id(editor_id: str) -> str:
+    return _NON_ALNUM.sub('', editor_id.lower())
+
+
+def record_key(plugin: str, form_id: str) -> Optional[tuple[str, str]]:
+    if not plugin or not form_id:
+        return None
+    return plugin.lower(), form_id.upper()
+
+
+class SourceIndex:
+    """One fill source, indexed once by weapon key, weapon EditorID and ammo EditorID."""
+
+    def __init__(self, name: str, rows: list[dict]):
+        self.name = name
+        self.rows = rows
+        self.by_weapon_key: dict[tuple[str, str], dict] = {}
+        self.by_weapon_editor: dict[str, dict] = {}
+        self.by_weapon_norm: dict[str, dict] = {}
+        self.by_ammo_editor: dict[str, dict] = {}
+        self.by_ammo_norm: dict[str, dict] = {}
+        for row in rows:
+            key = record_key(row['weapon_plugin'], row['weapon_form_id'])
+            if key:
+                self.by_weapon_key.setdefault(key, row)
+            weapon_editor = row['weapon_editor_id']
+            if weapon_editor:
+                self.by_weapon_editor.setdefault(weapon_editor, row)
+                self.by_weapon_norm.setdefault(norm_editor_id(weapon_editor), row)
+            ammo_editor = row['ammo_editor_id']
+            if ammo_editor and row['ammo_form_id']:
+                self.by_ammo_editor.setdefault(ammo_editor, row)
+                self.by_ammo_norm.setdefault(normalize_ammo_name(ammo_editor), row)
+
+
+@dataclass
+class Strategy:
+    """Looks a weapon record up in one index and may supply the listed fields."""
+    name: str
+    lookup: Callable[[dict], Optional[dict]]
+    fields: tuple[str, ...]
+    merge_omods: bool = False
+    overwrite: bool = False  # also replace ammo fields that already hold a different value
+
+
+def load_weapon_ammo_map(path: Path) -> SourceIndex:
+    """weapon_ammo_map.json: [{editor_id (weapon), full_name, ammo_form_id}, ...]"""
+    data, _ = loads_tolerant(read_text_auto(path))
+    rows = []
+    for entry in data if isinstance(data, list) else []:
+        row = canonical({})
+        row['weapon_editor_id'] = (entry.get('editor_id') or '').strip()
+        row['ammo_form_id'] = (entry.get('ammo_form_id') or '').strip().upper()
+        if row['weapon_editor_id'] and row['ammo_form_id']:
+            rows.append(row)
+    return SourceIndex('ammo_map', rows)
+
+
+def load_details(path: Path) -> SourceIndex:
+    """weapon_ammo_details.txt: weapon_plugin|weapon_form_id|weapon_editor|ammo_plugin|ammo_form_id|ammo_editor"""
+    rows = []
+    for line in read_text_auto(path).splitlines():
+        parts = [p.strip() for p in line.split('|')]
+        if len(parts) < 6:
+            continue
+        rows.append(canonical(dict(zip(
+            ('weapon_plugin', 'weapon_form_id', 'weapon_editor_id', 'ammo_plugin', 'ammo_form_id', 'ammo_editor_id'),
+            parts[:6]))))
+    return SourceIndex('details', rows)
+
+
+def load_records(paths: list[Path]) -> SourceIndex:
+    rows = []
+    for path in paths:
+        data, _ = loads_tolerant(read_text_auto(path))
+        for record in data if isinstance(data, list) else []:
+            if isinstance(record, dict):
+                row = canonical(record)
+                row['source'] = record
+                rows.append(row)
+    return SourceIndex('records', rows)
+
+
+def build_strategies(details: Optional[SourceIndex], records: Optional[SourceIndex],
+                     ammo_map: Optional[SourceIndex], overwrite_records: bool = False) -> list[Strategy]:
+    """
+    Default strategy order: exact record key first, then EditorID, then normalised EditorID.
+    With overwrite_records the --records strategies also replace ammo fields that differ.
+    """
+    strategies = []
+    weapon_and_ammo = WEAPON_FIELDS + AMMO_FIELDS
+    if details:
+        strategies.append(Strategy('details:weapon_key', lambda r, ix=details: ix.by_weapon_key.get(
+            record_key(r['weapon_plugin'], r['weapon_form_id'])), AMMO_FIELDS))
+    if records:
+        strategies.append(Strategy('records:weapon_key', lambda r, ix=records: ix.by_weapon_key.get(
+            record_key(r['weapon_plugin'], r['weapon_form_id'])), AMMO_FIELDS, merge_omods=True,
+            overwrite=overwrite_records))
+    if details:
+        strategies.append(Strategy('details:weapon_editor', lambda r, ix=details: ix.by_weapon_editor.get(
+            r['weapon_editor_id']), weapon_and_ammo))
+    if records:
+        strategies.append(Strategy('records:weapon_editor', lambda r, ix=records: ix.by_weapon_editor.get(
+            r['weapon_editor_id']), weapon_and_ammo, merge_omods=True, overwrite=overwrite_records))
+    if ammo_map:
+        strategies.append(Strategy('ammo_map:weapon_editor', lambda r, ix=ammo_map: ix.by_weapon_editor.get(
+            r['weapon_editor_id']), ('ammo_form_id',)))
+        strategies.append(Strategy('ammo_map:weapon_norm', lambda r, ix=ammo_map: ix.by_weapon_norm.get(
+            norm_editor_id(r['weapon_editor_id'])), ('ammo_form_id',)))
+    if details:
+        strategies.append(Strategy('details:ammo_editor', lambda r, ix=details: ix.by_ammo_editor.get(
+            r['ammo_editor_id']), ('ammo_plugin', 'ammo_form_id')))
+        strategies.append(Strategy('details:ammo_norm', lambda r, ix=details: ix.by_ammo_norm.get(
+            normalize_ammo_name(r['ammo_editor_id'])), ('ammo_plugin', 'ammo_form_id')))
+    return strategies
+
+
+def _omod_field(omod: dict, field: str) -> str:
+    for key in OMOD_FIELD_ALIASES[field]:
+        value = omod.get(key)
+        if value:
+            return str(value).strip()
+    return ''
+
+
+def _omod_key(omod: dict) -> tuple[str, str]:
+    return _omod_field(omod, 'plugin').lower(), _omod_field(omod, 'form_id').upper()
+
+
+def omod_schema(record: dict) -> int:
+    """
+    Index into OMOD_FIELD_ALIASES of the keys this record's OMODs use: taken from the
+    existing OMODs, or from the record schema if it has none yet.
+    """
+    robco_keys = {aliases[1] for aliases in OMOD_FIELD_ALIASES.values()}
+    exporter_keys = {aliases[0] for aliases in OMOD_FIELD_ALIASES.values()}
+    for omod in record.get('omods') or []:
+        if robco_keys & omod.keys():
+            return 1
+        if exporter_keys & omod.keys():
+            return 0
+    return 1 if 'weap_formid' in record or 'plugin' in record else 0
+
+
+def convert_omod(omod: dict, schema: int) -> dict:
+    """Copy of omod with its plugin/FormID/EditorID under the keys of the given schema."""
+    alias_keys = {key for aliases in OMOD_FIELD_ALIASES.values() for key in aliases}
+    out = {k: v for k, v in omod.items() if k not in alias_keys}
+    for field, aliases in OMOD_FIELD_ALIASES.items():
+        if any(key in omod for key in aliases):
+            value = _omod_field(omod, field)
+            out[aliases[schema]] = value.upper() if field == 'form_id' else value
+    return out
+
+
+def merge_omods(record: dict, donor_omods: list[dict]) -> int:
+    schema = omod_schema(record)
+    omods = record.setdefault('omods', [])
+    seen = {_omod_key(o) for o in omods}
+    added = 0
+    for omod in donor_omods:
+        key = _omod_key(omod)
+        if key not in seen:
+            omods.append(convert_omod(omod, schema))
+            seen.add(key)
+            added += 1
+    return added
+
+
+def join(weapons: list[dict], strategies: list[Strategy]) -> dict[str, int]:
+    """Fill the weapon records in place. Returns the number of fields filled per strategy."""
+    stats = {s.name: 0 for s in strategies}
+    for record in weapons:
+        view = canonical(record)
+        provenance = record.get('_provenance') or {}
+        filled = set()  # fields set in this pass; later strategies never replace them
+        for strategy in strategies:
+            wanted = [f for f in strategy.fields
+                      if f not in filled and (not view[f] or (strategy.overwrite and f in AMMO_FIELDS))]
+            if not wanted and not strategy.merge_omods:
+                continue
+            donor = strategy.lookup(view)
+            if donor is None:
+                continue
+            for field in wanted:
+                value = donor[field]
+                if value and value != view[field]:
+                    set_field(record, field, value)
+                    view[field] = value
+                    filled.add(field)
+                    provenance[field] = strategy.name
+                    stats[strategy.name] += 1
+            if strategy.merge_omods and donor['omods'] and merge_omods(record, donor['omods']):
+                provenance['omods'] = strategy.name
+                stats[strategy.name] += 1
+        if provenance:
+            record['_provenance'] = provenance
+    return stats
+
+
+def unmatched_records(weapons: list[dict], records: SourceIndex) -> list[dict]:
+    """--records rows whose weapon matches no weapon record by plugin+FormID or EditorID (first of each key)."""
+    views = [canonical(w) for w in weapons]
+    keys = {record_key(v['weapon_plugin'], v['weapon_form_id']) for v in views} - {None}
+    editors = {v['weapon_editor_id'] for v in views if v['weapon_editor_id']}
+    out = []
+    for row in records.rows:
+        key = record_key(row['weapon_plugin'], row['weapon_form_id'])
+        if key in keys or row['weapon_editor_id'] in editors:
+            continue
+        if key:
+            keys.add(key)
+        if row['weapon_editor_id']:
+            editors.add(row['weapon_editor_id'])
+        out.append(row['source'])
+    return out
+
+
+def main():
+    root = Path(__file__).resolve().parents[1]
+    out_dir = root / 'Output'
+    parser = argparse.ArgumentParser(description='Fill weapon_omod_map.json from the other xEdit exports in one pass.')
+    parser.add_argument('--weapons', type=Path, default=out_dir / 'weapon_omod_map.json')
+    parser.add_argument('--ammo-map', type=Path, default=out_dir / 'weapon_ammo_map.json')
+    parser.add_argument('--details', type=Path, default=root / 'xedit_edit_scripts_output' / 'weapon_ammo_details.txt')
+    parser.add_argument('--records', type=Path, nargs='*', default=[],
+                        help='other weapon record JSON files to merge (e.g. an older export)')
+    parser.add_argument('--output', type=Path, help='default: <weapons>.joined.json')
+    parser.add_argument('--in-place', action='store_true',
+                        help='overwrite --weapons (the previous version is kept in Output/artifacts)')
+    parser.add_argument('--strategies', help='comma-separated strategy names, in order (default: all available)')
+    parser.add_argument('--overwrite', action='store_true',
+                        help='let --records replace ammo fields that already have a different value')
+    parser.add_argument('--append-unmatched', action='store_true',
+                        help='append --records rows that match no weapon (default: drop them)')
+    args = parser.parse_args()
+
+    if not args.weapons.is_file():
+        print('Weapon JSON not found:', args.weapons)
+        sys.exit(2)
+
+    start = time.perf_counter()
+    weapons, repair = loads_tolerant(read_text_auto(args.weapons))
+    if repair is not None:
+        print(f'{args.weapons.name} is not valid JSON; recovered {len(repair.records)} records '
+              f'({len(repair.errors)} unreadable fragments).')
+    if isinstance(weapons, dict):
+        weapons = [weapons]
+
+    ammo_map = load_weapon_ammo_map(args.ammo_map) if args.ammo_map.is_file() else None
+    details = load_details(args.details) if args.details.is_file() else None
+    missing = [p for p in args.records if not p.is_file()]
+    if missing:
+        print('Record file not found:', ', '.join(map(str, missing)))
+        sys.exit(2)
+    records = load_records(args.records) if args.records else None
+    for source, path in ((ammo_map, args.ammo_map), (details, args.details)):
+        print(f'  {path.name}: ' + (f'{len(source.rows)} rows' if source else 'not found, skipped'))
+    if records:
+        print(f'  --records: {len(records.rows)} rows')
+
+    strategies = build_strategies(details, records, ammo_map, overwrite_records=args.overwrite)
+    if args.strategies:
+        by_name = {s.name: s for s in strategies}
+        names = [n.strip() for n in args.strategies.split(',') if n.strip()]
+        unknown = [n for n in names if n not in by_name]
+        if unknown:
+            print('Unknown or unavailable strategies:', ', '.join(unknown))
+            print('Available:', ', '.join(by_name))
+            sys.exit(2)
+        strategies = [by_name[n] for n in names]
+    if not strategies:
+        print('No fill sources found; nothing to do.')
+        sys.exit(1)
+
+    stats = join(weapons, strategies)
+    unmatched = unmatched_records(weapons, records) if records else []
+    if args.append_unmatched:
+        weapons.extend(unmatched)
+
+    if args.in_place:
+        out = args.weapons
+        backup = ArtifactStore(out.parent / 'artifacts').begin_run('weapon_join').put_file(out.name, out)
+        print('Backup:', backup)
+    else:
+        out = args.output or args.weapons.with_suffix('.joined.json')
+    atomic_write_text(out, json.dumps(weapons, ensure_ascii=False, indent=2))
+
+    print(f'Wrote {len(weapons)} records to {out} in {time.perf_counter() - start:.2f}s')
+    for name, count in stats.items():
+        print(f'  {name:<24} {count} fields filled')
+    if unmatched:
+        if args.append_unmatched:
+            print(f'  --records rows matching no weapon: {len(unmatched)} appended')
+        else:
+            print(f'  --records rows matching no weapon: {len(unmatched)} dropped (use --append-unmatched to keep them)')
+    unfilled = sum(1 for w in weapons if not get_field(w, 'ammo_form_id'))
+    print(f'  records still without ammo FormID: {unfilled}')
+
+
+if __name__ == '__main__':
+    main()
@@ -1,13 +1,124 @@
+import codecs
 import locale
+import os
+import tempfile
+from contextlib import contextmanager
 from pathlib import Path
 
-def read_text_utf8_fallback(path: Path) -> str:
+# 文字コード判定に使う先頭部分の最大サイズ
+SNIFF_BYTES = 64 * 1024
+# パスごとの判定結果: path -> (size, mtime_ns, encoding)
+_encoding_cache: dict[str, tuple[int, int, str]] = {}
+
+def _is_text(head: bytes, encoding: str) -> bool:
+    """head が encoding で制御文字を含まないテキストとして読めるか (末尾で切れた文字は問わない)。"""
+    try:
+        text = codecs.getincrementaldecoder(encoding)().decode(head, final=False)
+    except UnicodeDecodeError:
+        return False
+    return all(c.isprintable() or c.isspace() for c in text)
+
+def sniff_encoding(head: bytes) -> str:
+    """
+    BOM と先頭部分のバイト列から文字コードを推定する (utf-8-sig / utf-16 / utf-8 / cp932)。
+    先頭部分の末尾で切れたマルチバイト文字は判定の失敗とみなさない。
+    """
+    if head.startswith(codecs.BOM_UTF8):
+        return 'utf-8-sig'
+    if head.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+        return 'utf-16'
+    # BOM なしの UTF-16 は NUL バイトの偏りで見分ける。UTF-8 / cp932 のテキストには NUL が現れないので、
+    # 日本語が大半で ASCII 部分の NUL が少なくても、片側に偏っていて UTF-16 として読めれば採用する
+    # (U+3000 などで反対側にも NUL は出るので、偏りは比率で見る)
+    odd, even = head[1::2].count(0), head[0::2].count(0)
+    if max(odd, even) >= 2 and min(odd, even) * 4 <= max(odd, even):
+        encoding = 'utf-16-le' if odd > even else 'utf-16-be'
+        if _is_text(head, encoding):
+            return encoding
+    for encoding in ('utf-8', 'cp932'):
+        try:
+            codecs.getincrementaldecoder(encoding)().decode(head, final=False)
+            return encoding
+        except UnicodeDecodeError:
+            continue
+    return locale.getpreferredencoding()
+
+def decode_bytes_auto(data: bytes) -> tuple[str, str]:
+    """
+    バイト列を推定した文字コードで 1 回だけデコードし、(テキスト, 文字コード) を返す。
+    先頭部分では UTF-8 に見えても後半で失敗した場合は、同じバイト列を cp932 で読み直す。
+    """
+    encoding = sniff_encoding(data[:SNIFF_BYTES])
+    candidates = [encoding] + [e for e in ('utf-8', 'cp932') if e != encoding and encoding in ('utf-8', 'cp932')]
+    for candidate in candidates:
+        try:
+            return data.decode(candidate), candidate
+        except UnicodeDecodeError:
+            continue
+    return data.decode(encoding, errors='replace'), encoding
+
+def detect_encoding(path: Path) -> str:
     """
-    UTF-8 でファイルを読み込み、失敗した場合はシステムのデフォルトエンコーディングで再試行する。
+    ファイルの文字コードを先頭部分だけ読んで推定する。
+    結果はファイルのサイズと更新時刻が変わるまでパスごとにキャッシュする。
     """
+    key = os.fspath(path)
+    st = os.stat(key)
+    cached = _encoding_cache.get(key)
+    if cached and cached[0] == st.st_size and cached[1] == st.st_mtime_ns:
+        return cached[2]
+    with open(key, 'rb') as f:
+        encoding = sniff_encoding(f.read(SNIFF_BYTES))
+    _encoding_cache[key] = (st.st_size, st.st_mtime_ns, encoding)
+    return encoding
+
+def read_text_auto(path: Path) -> str:
+    """ファイルを 1 回だけ読み込み、文字コードを自動判定してデコードする。"""
+    key = os.fspath(path)
+    with open(key, 'rb') as f:
+        st = os.fstat(f.fileno())
+        data = f.read()
+    cached = _encoding_cache.get(key)
+    if cached and cached[0] == st.st_size and cached[1] == st.st_mtime_ns:
+        try:
+            return data.decode(cached[2])
+        except UnicodeDecodeError:
+            pass
+    text, encoding = decode_bytes_auto(data)
+    _encoding_cache[key] = (st.st_size, st.st_mtime_ns, encoding)
+    return text
+
+def open_text_auto(path: Path, newline: str | None = None):
+    """
+    文字コードを先頭部分から判定し、テキストモードで開いたファイルを返す (逐次デコード)。
+    大きなファイルを行単位・チャンク単位で処理する場合に使う。先頭で判定できなかった
+    不正なバイト列は置換文字になる。
+    """
+    return open(path, 'r', encoding=detect_encoding(path), errors='replace', newline=newline)
+
+@contextmanager
+def atomic_output(path: Path, mode: str = 'wb', encoding: str | None = None):
+    """
+    同じディレクトリの一時ファイルに書き込み、正常終了時に rename で置き換える。
+    例外が発生した場合は一時ファイルを削除し、既存ファイルには触れない。
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(prefix=f".{path.name}.", suffix='.tmp', dir=path.parent)
     try:
-        return path.read_text(encoding='utf-8')
-    except UnicodeDecodeError:
-        # UTF-8で失敗した場合、ロケール依存のエンコーディングでフォールバック
-        fallback_encoding = locale.getpreferredencoding()
-        return path.read_text(encoding=fallback_encoding, errors='replace')
+        with os.fdopen(fd, mode, encoding=encoding) as f:
+            yield f
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_name, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_name)
+        except OSError:
+            pass
+        raise
+
+def atomic_write_text(path: Path, text: str, encoding: str = 'utf-8') -> None:
+    """テキストを一時ファイル経由でアトミックに書き出す。"""
+    with atomic_output(path, 'w', encoding=encoding) as f:
+        f.write(text)